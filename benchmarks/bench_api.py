@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+"""
+Cost of the public helpers ``Config.is_type`` / ``Config.name_type``, and of
+the error path: building the error message (including ``fuzzycheck`` of
+unions) and raising the exception from a decorated function.
+"""
+from __future__ import division, print_function
+
+import typesentry
+from typesentry import U
+from run import Case
+
+
+def collect(opts):
+    tc = typesentry.Config(soft_exceptions=False)
+    is_type = tc.is_type
+    name_type = tc.name_type
+
+    yield Case("api", "is_type", lambda: is_type(1, int))
+    yield Case("api", "is_type", lambda: is_type(1, int, str, None),
+               {"types": 3})
+    yield Case("api", "is_type", lambda: is_type([1, 2], [int]),
+               {"types": "list"})
+    record = {"id": 1, "name": "x", "tags": ["a"], "pos": (1.5, 2.5)}
+    schema = {"id": int, "name": str, "tags": [str], "pos": (float, float)}
+    yield Case("api", "is_type", lambda: is_type(record, schema),
+               {"types": "dict"})
+    yield Case("api", "name_type", lambda: name_type(int))
+    yield Case("api", "name_type",
+               lambda: name_type({str: [U(int, (str, float))]}),
+               {"types": "nested"})
+
+    @tc.typed(x=int)
+    def foo(x):
+        return x
+
+    def call_bad():
+        try:
+            foo("x")
+        except TypeError:
+            pass
+
+    yield Case("errors", "raise_scalar", call_bad)
+
+    lst = typesentry.checker_for_type([int])
+    union = typesentry.checker_for_type(U([int], [str], {int: str}))
+    for n in opts.sizes:
+        if n > 100000:
+            continue  # the error path is linear anyway
+        bad = list(range(n)) + ["x"]
+        yield Case("errors", "get_error_msg",
+                   lambda v=bad: lst.get_error_msg("Parameter `x`", v),
+                   {"n": n})
+        yield Case("errors", "fuzzycheck", lambda v=bad: union.fuzzycheck(v),
+                   {"n": n})
+        yield Case("errors", "union_error_msg",
+                   lambda v=bad: union.get_error_msg("Parameter `x`", v),
+                   {"n": n})
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+"""
+Cost of the ``.check()`` method (and of the compiled predicate) for each of
+the checkers in ``typesentry.checks``, with containers of various sizes.
+"""
+from __future__ import division, print_function
+import sys
+
+from typesentry import (I, Not, U, Deep, NDArray, Frame, Sampled, Series,
+                        checker_for_type)
+from typesentry.checks import MtCached, VerdictCache
+from run import Case
+
+try:
+    import typing
+except ImportError:  # pragma: no cover
+    typing = None
+
+
+class Foo(object):
+    pass
+
+
+def _scalar_cases():
+    """Yield ``(name, type, value)`` for the checkers of single values."""
+    yield "Any", typing.Any if typing else object, 1
+    yield "Class", Foo, Foo()
+    yield "None", None, None
+    yield "bool", bool, True
+    yield "int", int, 1
+    yield "float", float, 1
+    yield "str", str, "hello"
+    yield "Literal", "ham", "ham"
+    yield "Type", typing.Type[int] if typing else type, bool
+    yield "Callable", typing.Callable if typing else callable, len
+    yield "Union", U(int, str, None), None
+    events = [type("Event%d" % i, (object, ), {}) for i in range(30)]
+    yield "Union_wide", U(*events), events[-1]()
+    yield "Union_wide_miss", U(*events), 1.5
+    tuples = [(int, ) * i for i in range(1, 9)]
+    yield "Union_tuples", U(*tuples), (1, ) * 8
+    yield "Union_tuples_adaptive", U(*tuples, adaptive=True), (1, ) * 8
+    yield "Intersection", I(int, Not(bool)), 1
+    yield "Not", Not(int, str), 1.5
+    yield "Dict1", {"a": int, "b": str, "c": [int]}, {"a": 1, "b": "b",
+                                                      "c": [1, 2]}
+    yield "Tuple1", (int, str, float), (1, "a", 1.5)
+    if getattr(typing, "TypedDict", None):
+        record = typing.TypedDict("Record", {"a": int, "b": str, "c": float})
+        yield "TypedDict", record, {"a": 1, "b": "b", "c": 1.5}
+    if typing and sys.version_info >= (3, 7):
+        import dataclasses
+        point = dataclasses.make_dataclass("Point", [("x", int), ("y", float),
+                                                     ("tag", str)])
+        yield "Deep", Deep(point), point(1, 1.5, "a")
+    if typing:
+        yield "Iterator", typing.Iterator[int], iter([])
+
+
+def _container_cases(n):
+    """Yield ``(name, type, value)`` for containers of `n` elements."""
+    ints = list(range(n))
+    yield "List", [int], ints
+    yield "List_mixed", [int], [1.5] + ints[1:]
+    yield "List_union", [U(int, str)], ints
+    yield "Set", {int}, set(ints)
+    yield "Tuple0", (int, Ellipsis), tuple(ints)
+    yield "Dict0", {int: int}, dict.fromkeys(ints, 0)
+    if typing:
+        yield "Sequence", typing.Sequence[int], ints
+        yield "Iterable", typing.Iterable[int], ints
+        yield ("List_nested", typing.List[typing.Tuple[int, str]],
+               [(i, "x") for i in range(n)])
+    yield "Sampled_list", Sampled([int]), ints
+    np = sys.modules.get("numpy")
+    if np is not None:
+        arr = np.arange(n)
+        yield "NDArray", NDArray[int, (None, )], arr
+        if typing:
+            yield "Sequence_ndarray", typing.Sequence[int], arr
+    pd = sys.modules.get("pandas")
+    if pd is not None:
+        df = pd.DataFrame({"a": range(n), "b": 1.5})
+        yield "Frame", Frame({"a": int, "b": float}), df
+        yield "Frame_nonnull", Frame({"a": int, "b": float},
+                                     nullable=False), df
+        yield "Series", Series(int), df["a"]
+
+
+def _import_optional(name):
+    try:
+        __import__(name)
+    except ImportError:
+        pass
+
+
+def collect(opts):
+    _import_optional("numpy")
+    _import_optional("pandas")
+
+    for name, t, value in _scalar_cases():
+        checker = checker_for_type(t)
+        yield Case("checkers", name, lambda c=checker, v=value: c.check(v))
+        pred = checker.compile()
+        yield Case("checkers", name, lambda p=pred, v=value: p(v),
+                   params={"compiled": True})
+
+    cache = VerdictCache(16)
+    for n in opts.sizes:
+        for name, t, value in _container_cases(n):
+            checker = checker_for_type(t)
+            params = {"n": n}
+            yield Case("checkers", name,
+                       lambda c=checker, v=value: c.check(v), params)
+            pred = checker.compile()
+            yield Case("checkers", name, lambda p=pred, v=value: p(v),
+                       dict(params, compiled=True))
+        cached = MtCached(checker_for_type((int, Ellipsis)), cache)
+        value = tuple(range(n))
+        yield Case("checkers", "Cached", lambda v=value: cached.check(v),
+                   {"n": n})
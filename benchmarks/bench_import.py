@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+"""
+Cost of importing the module, of creating a ``Config``, and of decorating a
+function with ``typed``. Case ``import_module`` measures the time to import a
+module with many decorated functions (with and without ``Config(lazy=True)``),
+together with ``typesentry`` itself.
+"""
+from __future__ import division, print_function
+import os
+import subprocess
+import sys
+
+import typesentry
+from run import Case
+
+_IMPORT_SCRIPT = """
+import time
+t0 = time.perf_counter() if hasattr(time, "perf_counter") else time.time()
+import typesentry
+t1 = time.perf_counter() if hasattr(time, "perf_counter") else time.time()
+print(t1 - t0)
+"""
+
+# Imports typesentry and then "imports" a module with `n` decorated functions
+_MODULE_SCRIPT = """
+import time
+t0 = time.perf_counter() if hasattr(time, "perf_counter") else time.time()
+import typesentry
+typed = typesentry.Config(lazy=%(lazy)r).typed
+src = "".join(
+    "@typed(a=int, b=[str], c={str: float}, _return=bool)\\n"
+    "def f%%d(a, b=None, c=None):\\n"
+    "    return True\\n" %% i
+    for i in range(%(n)d))
+exec(compile(src, "module", "exec"), {"typed": typed})
+t1 = time.perf_counter() if hasattr(time, "perf_counter") else time.time()
+print(t1 - t0)
+"""
+
+
+def _subprocess_timer(script):
+    """Return timer that runs `script` in fresh interpreters."""
+    return lambda repeat: _run_script(script, repeat)
+
+
+def _import_timer(repeat):
+    """Measure the import time in fresh interpreters."""
+    return _run_script(_IMPORT_SCRIPT, repeat)
+
+
+def _run_script(script, repeat):
+    """Run `script` in fresh interpreters, and collect the times it prints."""
+    rootdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [rootdir] + [p for p in env.get("PYTHONPATH", "").split(os.pathsep)
+                     if p])
+    times = []
+    for _ in range(max(repeat, 5)):
+        out = subprocess.check_output([sys.executable, "-c", script],
+                                      env=env)
+        times.append(float(out.decode().strip()))
+    return times
+
+
+def collect(opts):
+    yield Case("import", "import_typesentry", timer=_import_timer)
+    n = 1000 if opts.quick else 5000
+    for lazy in (False, True):
+        script = _MODULE_SCRIPT % {"lazy": lazy, "n": n}
+        yield Case("import", "import_module", params={"n": n, "lazy": lazy},
+                   timer=_subprocess_timer(script))
+    yield Case("import", "config",
+               lambda: typesentry.Config(soft_exceptions=False))
+
+    tc = typesentry.Config(soft_exceptions=False)
+    ctc = typesentry.Config(soft_exceptions=False, compiled=True)
+
+    def foo(a, b, c=None, *args, **kws):
+        return a
+
+    types = dict(a=int, b=[str], c={str: float}, args=int, kws=str)
+    yield Case("import", "decorate", lambda: tc.typed(**types)(foo))
+    yield Case("import", "decorate", lambda: ctc.typed(**types)(foo),
+               {"mode": "compiled"})
+    ltc = typesentry.Config(soft_exceptions=False, lazy=True)
+    yield Case("import", "decorate", lambda: ltc.typed(**types)(foo),
+               {"mode": "lazy"})
+    if sys.version_info >= (3, 6):
+        # Class with 10 annotated methods, created anew for each decoration
+        ns = {}
+        exec("def make_class():\n"
+             "    class A(object):\n" +
+             "".join("        def m%d(self, x: int, y: str = '') -> int:\n"
+                     "            return x\n" % i for i in range(10)) +
+             "    return A\n", ns)
+        make_class = ns["make_class"]
+        yield Case("import", "decorate_class",
+                   lambda: tc.typed()(make_class()))
+    yield Case("import", "checker_for_type",
+               lambda: typesentry.checker_for_type({"a": [int], "b": str}))
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+"""
+Memory used per decorated function (the wrapper, its ``Signature`` with the
+``Parameter`` objects, and the closures), and per checker. The sizes are
+measured with ``tracemalloc``, and reported in bytes per object.
+"""
+from __future__ import division, print_function
+import gc
+
+import typesentry
+from typesentry import checker_for_type
+from run import Case
+
+try:
+    import tracemalloc
+except ImportError:  # pragma: no cover
+    tracemalloc = None
+
+# Number of objects created in each measurement
+N = 2000
+
+
+def _make_functions(n):
+    """Create `n` distinct (undecorated) functions."""
+    ns = {}
+    src = "".join("def f%d(a, b=None, c=None, *args, **kws):\n"
+                  "    return a\n" % i for i in range(n))
+    exec(compile(src, "bench_memory", "exec"), ns)
+    return [ns["f%d" % i] for i in range(n)]
+
+
+def _memory_timer(prepare, create, n=N):
+    """
+    Return timer measuring the memory per object produced by `create(arg)`,
+    for each of the `n` arguments returned by ``prepare(n)``. The objects are
+    kept alive until the measurement is complete.
+    """
+    def timer(repeat):
+        sizes = []
+        for _ in range(repeat):
+            args = prepare(n)
+            gc.collect()
+            tracemalloc.start()
+            try:
+                before = tracemalloc.get_traced_memory()[0]
+                objs = [create(arg) for arg in args]
+                gc.collect()
+                after = tracemalloc.get_traced_memory()[0]
+            finally:
+                tracemalloc.stop()
+            sizes.append((after - before) / n)
+            del objs
+        return sizes
+    return timer
+
+
+def _make_classes(n):
+    return [type("C%d" % i, (object, ), {}) for i in range(n)]
+
+
+def collect(opts):
+    if tracemalloc is None:  # pragma: no cover
+        return
+    types = dict(a=int, b=[str], c={str: float}, args=int, kws=str)
+    for mode, kwargs in [("default", {}), ("compiled", {"compiled": True}),
+                         ("lazy", {"lazy": True})]:
+        tc = typesentry.Config(soft_exceptions=False, **kwargs)
+        decorate = tc.typed(**types)
+        yield Case("memory", "decorated_function",
+                   params={"mode": mode}, unit="bytes",
+                   timer=_memory_timer(_make_functions, decorate))
+
+    tc = typesentry.Config(soft_exceptions=False)
+
+    def sig(f):
+        return typesentry.signature.Signature(f, dict(types), tc)
+
+    yield Case("memory", "signature", unit="bytes",
+               timer=_memory_timer(_make_functions, sig))
+    yield Case("memory", "checker", params={"type": "Class"}, unit="bytes",
+               timer=_memory_timer(_make_classes, checker_for_type))
+    yield Case("memory", "checker", params={"type": "List"}, unit="bytes",
+               timer=_memory_timer(_make_classes, lambda c: checker_for_type(
+                   [c])))
+    yield Case("memory", "checker", params={"type": "Dict1"}, unit="bytes",
+               timer=_memory_timer(_make_classes, lambda c: checker_for_type(
+                   {"a": c, "b": [int], "c": str})))
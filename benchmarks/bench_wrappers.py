@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+"""
+Overhead of the functions decorated with ``typed``, for various signature
+shapes and configuration modes.
+"""
+from __future__ import division, print_function
+
+import typesentry
+from typesentry import CallSampling
+from run import Case
+
+
+def _shapes(typed):
+    """
+    Yield ``(name, function, call)`` triples, where `call` invokes the
+    decorated `function` in a typical way.
+    """
+    def f0():
+        return None
+
+    def f1(x):
+        return x
+
+    def fmany(a, b, c, d, e, f):
+        return a
+
+    def fdefaults(a, b=1, c="c", d=None):
+        return a
+
+    def fvarargs(a, *args):
+        return a
+
+    def fvarkws(a, **kws):
+        return a
+
+    class A(object):
+        def method(self, x, y):
+            return x
+
+    yield "noargs", typed()(f0), lambda f: f()
+    yield "untyped", typed()(f1), lambda f: f(1)
+    yield "positional1", typed(x=int)(f1), lambda f: f(1)
+    yield ("positional6",
+           typed(a=int, b=int, c=str, d=float, e=bool, f=int)(fmany),
+           lambda f: f(1, 2, "3", 4.0, True, 6))
+    yield ("keywords6",
+           typed(a=int, b=int, c=str, d=float, e=bool, f=int)(fmany),
+           lambda f: f(a=1, b=2, c="3", d=4.0, e=True, f=6))
+    yield ("defaults", typed(a=int, b=int, c=str, d=float)(fdefaults),
+           lambda f: f(1))
+    yield ("kwonly", typed(a=int, b=int, _kwonly=1)(fdefaults),
+           lambda f: f(1, 2, c="c", d=1.0))
+    yield ("varargs", typed(a=int, args=str)(fvarargs),
+           lambda f: f(1, "a", "b", "c"))
+    yield ("varkws", typed(a=int, kws=str)(fvarkws),
+           lambda f: f(1, x="a", y="b", z="c"))
+    A.method = typed(x=int, y=str)(A.method)
+    obj = A()
+    yield "method", obj.method, lambda f: f(1, "y")
+    yield ("return", typed(x=int, _return=int)(f1), lambda f: f(1))
+
+
+def collect(opts):
+    def plain(x):
+        return x
+
+    yield Case("wrappers", "baseline", lambda: plain(1))
+
+    modes = [
+        ("default", {}),
+        ("compiled", {"compiled": True}),
+        ("call_sampling", {"call_sampling": CallSampling()}),
+        ("stats", {"stats": True}),
+        ("disabled", {"disabled": True}),
+    ]
+    for mode, kwargs in modes:
+        typed = typesentry.Config(soft_exceptions=False, **kwargs).typed
+        for shape, func, call in _shapes(typed):
+            yield Case("wrappers", shape, (lambda f=func, c=call: c(f)),
+                       params={"mode": mode})
+
+    # Container arguments, with and without sampling / verdict cache
+    typed = typesentry.Config(soft_exceptions=False).typed
+    sampled = typesentry.Config(soft_exceptions=False,
+                                sampling=typesentry.Sampling()).typed
+    cached = typesentry.Config(soft_exceptions=False,
+                               verdict_cache=1024).typed
+    for n in opts.sizes:
+        data = tuple(range(n))
+        for mode, tp in [("default", typed), ("sampling", sampled),
+                         ("verdict_cache", cached)]:
+            func = tp(x=(int, Ellipsis))(plain)
+            yield Case("wrappers", "tuple_arg", (lambda f=func: f(data)),
+                       params={"mode": mode, "n": n})
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+"""
+Benchmark suite for the `typesentry` module.
+
+    $ python benchmarks/run.py --output results.json
+    $ python benchmarks/run.py --quick --compare results.json
+
+Each benchmark measures the time of a single call of some operation (checking
+a value, calling a decorated function, etc). The timings are written as JSON,
+so that the results of different runs can be compared with ``--compare``.
+The benchmarks are collected from the modules ``bench_*.py`` in this
+directory; each such module defines a function ``collect(opts)`` producing a
+sequence of :class:`Case` objects.
+"""
+from __future__ import division, print_function
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                ".."))
+
+import typesentry  # noqa
+
+BENCH_MODULES = ["bench_wrappers", "bench_checkers", "bench_api",
+                 "bench_import", "bench_memory"]
+
+
+class Case(object):
+    """
+    Single benchmark.
+
+    :param group: name of the group of benchmarks (e.g. "wrappers").
+    :param name: name of the benchmark within the group.
+    :param func: function without arguments, whose execution time is measured.
+    :param params: dictionary of additional parameters describing the case
+        (such as the size of the container).
+    :param timer: optional function ``timer(repeat)`` returning a list of
+        measured times per call (in seconds), for the cases that cannot be
+        measured with ``timeit`` (e.g. those running a subprocess).
+    :param unit: ``"ns"`` for the benchmarks of time, or ``"bytes"`` for the
+        benchmarks of memory, whose `timer` returns a list of sizes in bytes.
+    """
+
+    def __init__(self, group, name, func=None, params=None, timer=None,
+                 unit="ns"):
+        self.group = group
+        self.name = name
+        self.func = func
+        self.params = params or {}
+        self.timer = timer
+        self.unit = unit
+
+    @property
+    def key(self):
+        """Identifier of the case, used for matching results across runs."""
+        extra = ",".join("%s=%s" % kv for kv in sorted(self.params.items()))
+        return "%s.%s%s" % (self.group, self.name,
+                            "[%s]" % extra if extra else "")
+
+
+def measure(case, min_time, repeat):
+    """Return list of times per single call of the `case`, in seconds."""
+    if case.timer:
+        return case.timer(repeat)
+    timer = timeit.Timer(case.func)
+    # Find the number of loops that takes at least `min_time` seconds
+    number = 1
+    while True:
+        t = timer.timeit(number)
+        if t >= min_time or number >= 10**7:
+            break
+        number *= 10 if t < min_time / 10 else 2
+    gcold = gc.isenabled()
+    gc.disable()
+    try:
+        times = [timer.timeit(number) / number for _ in range(repeat)]
+    finally:
+        if gcold:
+            gc.enable()
+    return times
+
+
+def run(opts):
+    benchdir = os.path.dirname(os.path.abspath(__file__))
+    if benchdir not in sys.path:
+        sys.path.insert(0, benchdir)
+    results = []
+    for modname in BENCH_MODULES:
+        module = __import__(modname)
+        for case in module.collect(opts):
+            if opts.filter and opts.filter not in case.key:
+                continue
+            times = sorted(measure(case, opts.min_time, opts.repeat))
+            scale = 1e9 if case.unit == "ns" else 1
+            res = {"name": case.key, "group": case.group,
+                   "params": case.params,
+                   "best_" + case.unit: times[0] * scale,
+                   "median_" + case.unit: times[len(times) // 2] * scale,
+                   "repeat": len(times)}
+            results.append(res)
+            if not opts.quiet:
+                print("%-60s %12s" % (case.key, _fmt_result(res)))
+                sys.stdout.flush()
+    return results
+
+
+def compare(results, baseline_file, threshold):
+    """
+    Print comparison of `results` with the results stored in `baseline_file`,
+    and return the number of benchmarks that became slower by more than the
+    factor `threshold`.
+    """
+    with open(baseline_file) as inp:
+        baseline = {r["name"]: r for r in json.load(inp)["results"]}
+    nslower = 0
+    print()
+    print("%-60s %12s %12s %7s" % ("benchmark", "baseline", "current",
+                                   "ratio"))
+    for res in results:
+        base = baseline.get(res["name"])
+        if base is None:
+            continue
+        unit = "ns" if "best_ns" in res else "bytes"
+        if "best_" + unit not in base:
+            continue
+        ratio = res["best_" + unit] / max(base["best_" + unit], 1e-3)
+        mark = ""
+        if ratio > threshold:
+            mark = "  << slower" if unit == "ns" else "  << larger"
+            nslower += 1
+        elif ratio < 1 / threshold:
+            mark = "  >> faster" if unit == "ns" else "  >> smaller"
+        print("%-60s %12s %12s %6.2fx%s"
+              % (res["name"], _fmt_result(base), _fmt_result(res), ratio,
+                 mark))
+    return nslower
+
+
+def _fmt_result(res):
+    if "best_bytes" in res:
+        return "%.0f B" % res["best_bytes"]
+    return _fmt_ns(res["best_ns"])
+
+
+def _fmt_ns(ns):
+    for unit, scale in (("s", 1e9), ("ms", 1e6), ("us", 1e3)):
+        if ns >= scale:
+            return "%.3g %s" % (ns / scale, unit)
+    return "%.3g ns" % ns
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-o", "--output", metavar="FILE",
+                        help="write the results as JSON into this file")
+    parser.add_argument("-c", "--compare", metavar="FILE",
+                        help="compare the results with a previous JSON file")
+    parser.add_argument("-k", "--filter", metavar="TEXT",
+                        help="run only benchmarks whose names contain TEXT")
+    parser.add_argument("--quick", action="store_true",
+                        help="use smaller container sizes and fewer repeats")
+    parser.add_argument("--sizes", metavar="N,N,...",
+                        help="sizes of containers (default: 10 to 10M, or 10 "
+                             "to 10K with --quick)")
+    parser.add_argument("--repeat", type=int,
+                        help="number of measurements per benchmark")
+    parser.add_argument("--min-time", type=float, default=0.02,
+                        help="minimal duration of each measurement, seconds")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="slowdown (or growth of memory) factor reported "
+                             "as a regression")
+    parser.add_argument("-q", "--quiet", action="store_true")
+    opts = parser.parse_args(argv)
+    if opts.sizes:
+        opts.sizes = [int(n) for n in opts.sizes.split(",")]
+    elif opts.quick:
+        opts.sizes = [10, 1000, 10000]
+    else:
+        opts.sizes = [10, 1000, 100000, 10000000]
+    if opts.repeat is None:
+        opts.repeat = 3 if opts.quick else 7
+
+    started = time.time()
+    results = run(opts)
+    out = {
+        "meta": {
+            "typesentry": typesentry.__version__,
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "started": started,
+            "duration": time.time() - started,
+            "argv": sys.argv[1:] if argv is None else argv,
+        },
+        "results": results,
+    }
+    if opts.output:
+        with open(opts.output, "w") as outp:
+            json.dump(out, outp, indent=2, sort_keys=True)
+    if opts.compare:
+        nslower = compare(results, opts.compare, opts.threshold)
+        return 1 if nslower else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
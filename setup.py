@@ -10,7 +10,7 @@ Build script for the `typesentry` module.
 from setuptools import find_packages, setup
 from typesentry.__version__ import version
 
-packages = find_packages(exclude=["tests*", "docs*"])
+packages = find_packages(exclude=["tests*", "docs*", "benchmarks*"])
 
 setup(
     name="typesentry",
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+import pytest
+from tests import typesentry, U, I, Not
+from typesentry import checker_for_type
+from typesentry.checks import BranchStats
+
+
+def test_branch_stats():
+    stats = BranchStats(["a", "b", "c"], [0, 1, 2], 4)
+    for _ in range(3):
+        stats.hit(2)
+    stats.hit(1)
+    assert [i for i, _ in stats.order] == [2, 1, 0]
+    assert stats.recent == [0, 0, 1] and stats.totals == [0, 1, 3]
+    for _ in range(4):
+        stats.hit(0)
+    assert [i for i, _ in stats.order] == [0, 2, 1]
+
+
+def test_adaptive_union():
+    u = U([int], {str: int}, (float, str), adaptive=10)
+    assert u != U([int], {str: int}, (float, str), adaptive=10)
+    assert checker_for_type(u) is u
+    assert u != U([int], {str: int}, (float, str))
+    assert u.name() == "Union[List[int], Dict[str, int], Tuple[float, str]]"
+    for _ in range(20):
+        assert u.check((1.5, "a"))
+        assert not u.check("a")
+    assert u._stats.order[0][1] is u._checkers[2]
+    assert u.branch_hits() == [("List[int]", 0), ("Dict[str, int]", 0),
+                               ("Tuple[float, str]", 20)]
+    assert u.check([1]) and u.check({"a": 1})
+    # The order of branches in the messages does not change
+    assert u._checkers[0].name() == "List[int]"
+
+
+def test_adaptive_union_fast_path():
+    u = U(int, str, None, [int], adaptive=True)
+    assert u.check(1) and u.check("a") and u.check(None) and u.check([1])
+    assert not u.check(1.5) and not u.check(True)
+    assert u.check_sampled("b", typesentry.Sampling())
+    assert [n for _, n in u.branch_hits()] == [1, 2, 1, 1]
+    assert u.exact_types() >= {str, type(None)}
+    lst = checker_for_type([u])
+    assert lst.check([1, "a", None, [2]])
+    # Elements of exact types are accepted by the list without calling the
+    # union, so only the last element is counted
+    assert [n for _, n in u.branch_hits()] == [1, 2, 1, 2]
+
+
+def test_adaptive_intersection_not():
+    i = I(Not(str), Not(int), adaptive=2)
+    assert not i.check(1) and not i.check(2) and not i.check(3)
+    assert i.check(1.5) and not i.check("a")
+    assert i._stats.order[0][0] == 1
+    assert i.branch_hits() == [("Not[str]", 1), ("Not[int]", 3)]
+    n = Not(str, int, adaptive=True)
+    assert not n.check(1) and n.check(1.5)
+    assert n.branch_hits() == [("str", 0), ("int", 1)]
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"compiled": True}])
+def test_adaptive_in_signature(kwargs):
+    conf = typesentry.Config(**kwargs)
+    u = U(int, [str], (int, int), adaptive=True)
+
+    @conf.typed(x=[u])
+    def foo(x):
+        return len(x)
+
+    assert foo([(1, 2), (3, 4), 5]) == 3
+    with pytest.raises(conf.TypeError):
+        foo([(1, 2, 3)])
+    # Whether the int is counted depends on the container's fast path
+    assert [n for _, n in u.branch_hits()][1:] == [0, 2]
+
+
+def test_adaptive_errors():
+    with pytest.raises(RuntimeError):
+        U(int, str, adaptive=-1)
+    with pytest.raises(RuntimeError):
+        U(int, str, order="fast")
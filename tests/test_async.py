@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+import inspect
+import sys
+import pytest
+from tests import typesentry, typed, TTypeError
+
+# The `async` syntax cannot be parsed by older Pythons, hence the code under
+# test is exec'd.
+py37only = pytest.mark.skipif(sys.version_info < (3, 7),
+                              reason="async generators require Python 3.7+")
+
+
+def run(src, **names):
+    import asyncio
+    ns = dict({"typed": typed}, **names)
+    exec(src, ns)
+    return ns, lambda coro: asyncio.run(coro)
+
+
+@py37only
+def test_coroutine():
+    ns, run_async = run(
+        "@typed(x=int, _return=str)\n"
+        "async def foo(x, result=None):\n"
+        "    return str(x) if result is None else result\n")
+    foo = ns["foo"]
+    assert inspect.iscoroutinefunction(foo)
+    assert run_async(foo(5)) == "5"
+    # As with any coroutine, the body of the wrapper starts running (and thus
+    # checks the arguments) only when awaited
+    coro = foo("5")
+    with pytest.raises(TTypeError) as e:
+        run_async(coro)
+    assert str(e.value) == ("Parameter `x` of type `int` received value '5' "
+                            "of type str")
+    with pytest.raises(TTypeError) as e:
+        run_async(foo(5, result=5))
+    assert str(e.value) == ("Incorrect return type in `foo()`: expected str "
+                            "got int")
+
+
+@py37only
+def test_coroutine_annotations():
+    ns, run_async = run(
+        "from typing import Iterator, List\n"
+        "@typed()\n"
+        "async def foo(xs: Iterator[int]) -> List[int]:\n"
+        "    return [x for x in xs]\n")
+    foo = ns["foo"]
+    assert run_async(foo(iter([1, 2]))) == [1, 2]
+    with pytest.raises(TTypeError) as e:
+        run_async(foo(iter([1, "2"])))
+    assert str(e.value) == ("Parameter `xs` of type `Iterator[int]` received "
+                            "an iterator where 2nd element is '2' of type str")
+
+
+@py37only
+def test_async_generator():
+    ns, run_async = run(
+        "from typing import AsyncGenerator, AsyncIterator\n"
+        "@typed(n=int, _return=AsyncIterator[int])\n"
+        "async def count(n, last=None):\n"
+        "    for i in range(n):\n"
+        "        yield i\n"
+        "    if last is not None:\n"
+        "        yield last\n"
+        "@typed(_return=AsyncGenerator[int, int])\n"
+        "async def echo():\n"
+        "    x = 0\n"
+        "    while True:\n"
+        "        try:\n"
+        "            x = yield x\n"
+        "        except ValueError:\n"
+        "            x = -1\n"
+        "async def collect(agen):\n"
+        "    return [x async for x in agen]\n"
+        "async def talk(agen):\n"
+        "    res = [await agen.__anext__(), await agen.asend(3),\n"
+        "           await agen.athrow(ValueError())]\n"
+        "    try:\n"
+        "        await agen.asend('oops')\n"
+        "    finally:\n"
+        "        await agen.aclose()\n"
+        "    return res\n")
+    count, collect = ns["count"], ns["collect"]
+    assert inspect.isasyncgenfunction(count)
+    assert run_async(collect(count(3))) == [0, 1, 2]
+    with pytest.raises(TTypeError) as e:
+        run_async(collect(count("3")))
+    with pytest.raises(TTypeError) as e:
+        run_async(collect(count(2, last="end")))
+    assert str(e.value) == ("Incorrect return type in `count()`: expected "
+                            "AsyncIterator[int] got an async iterator where "
+                            "3rd element is 'end' of type str")
+    with pytest.raises(TTypeError) as e:
+        run_async(ns["talk"](ns["echo"]()))
+    assert str(e.value) == ("Incorrect return type in `echo()`: expected "
+                            "AsyncGenerator[int, int] got an async generator "
+                            "where 4th element is 'oops' of type str")
+
+
+@py37only
+def test_async_generator_bad_declaration():
+    with pytest.raises(RuntimeError):
+        run("@typed(_return=int)\n"
+            "async def foo():\n"
+            "    yield 1\n")
+    ns, run_async = run("@typed(x=int)\n"
+                        "async def foo(x):\n"
+                        "    yield x\n"
+                        "async def main():\n"
+                        "    return [x async for x in foo(1)]\n")
+    assert run_async(ns["main"]()) == [1]
+
+
+@py37only
+def test_compiled_config():
+    ctc = typesentry.Config(compiled=True)
+    ns, run_async = run("@typed(_return=int)\n"
+                        "async def foo(x):\n"
+                        "    return x\n", typed=ctc.typed)
+    assert run_async(ns["foo"](1)) == 1
+    with pytest.raises(ctc.TypeError):
+        run_async(ns["foo"]("1"))
+
+
+@py37only
+@pytest.mark.parametrize("kwargs", [
+    {"call_sampling": typesentry.CallSampling(max_interval=8, streak=2)},
+    {"policy": "sample"}])
+def test_async_call_sampling(kwargs):
+    conf = typesentry.Config(**kwargs)
+    ns, run_async = run(
+        "from typing import AsyncIterator\n"
+        "@typed(x=int)\n"
+        "async def foo(x):\n"
+        "    return x\n"
+        "@typed(x=int, _return=AsyncIterator[int])\n"
+        "async def gen(x):\n"
+        "    yield x\n", typed=conf.typed)
+    foo, gen = ns["foo"], ns["gen"]
+    assert inspect.iscoroutinefunction(foo)
+    with pytest.raises(conf.TypeError):
+        run_async(foo("x"))
+    for i in range(300):
+        run_async(foo(i))
+    state = foo._call_sampling_state_
+    assert state[1] > 1
+    # An unchecked call lets a bad argument through
+    while not state[0]:
+        run_async(foo(0))
+    assert run_async(foo("skipped")) == "skipped"
+    # Once an error is detected, each call is checked again
+    with pytest.raises(conf.TypeError):
+        while True:
+            run_async(foo("bad"))
+    assert state == [0, 1, 0]
+
+    async def collect(agen):
+        return [item async for item in agen]
+
+    state = gen._call_sampling_state_
+    for i in range(300):
+        assert run_async(collect(gen(i))) == [i]
+    assert state[1] > 1
+    while not state[0]:
+        run_async(collect(gen(0)))
+    assert run_async(collect(gen("a"))) == ["a"]
+    with pytest.raises(conf.TypeError):
+        while True:
+            run_async(collect(gen("bad")))
+    assert state == [0, 1, 0]
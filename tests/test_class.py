@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+import sys
+import pytest
+from tests import typesentry
+
+py36 = pytest.mark.skipif(sys.version_info < (3, 6),
+                          reason="annotations and __init_subclass__ "
+                                 "require Python 3.6+")
+
+_SRC = """
+class Account(object):
+    rate = 0.5
+
+    def __init__(self, owner: str, balance: float = 0.0):
+        self.owner = owner
+        self._balance = balance
+
+    def deposit(self, amount: float) -> float:
+        self._balance += amount
+        return self._balance
+
+    def untyped(self, x):
+        return x
+
+    @classmethod
+    def create(cls, owner: str):
+        return cls(owner)
+
+    @staticmethod
+    def parse(text: str) -> float:
+        return float(text)
+
+    @property
+    def balance(self) -> float:
+        return self._balance
+
+    @balance.setter
+    def balance(self, value: float):
+        self._balance = value
+"""
+
+
+def _define(src=_SRC, base=None):
+    ns = {"Base": base}
+    exec(src, ns)
+    return ns
+
+
+@py36
+@pytest.mark.parametrize("kwargs", [{}, {"compiled": True}, {"lazy": True}])
+def test_class_decorator(kwargs):
+    conf = typesentry.Config(**kwargs)
+    Account = conf.typed()(_define()["Account"])
+    acc = Account("ann", 1.0)
+    assert acc.deposit(2.0) == 3.0
+    assert Account.create("bob").owner == "bob"
+    assert Account.parse("1.5") == 1.5
+    assert acc.untyped("x") == "x"
+    acc.balance = 4.0
+    assert acc.balance == 4.0
+    with pytest.raises(conf.TypeError):
+        Account(1)
+    with pytest.raises(conf.TypeError):
+        acc.deposit("2")
+    with pytest.raises(conf.TypeError):
+        Account.create(None)
+    with pytest.raises(conf.TypeError):
+        Account.parse(1.5)
+    with pytest.raises(conf.TypeError):
+        acc.balance = "5"
+    acc._balance = "x"
+    with pytest.raises(conf.TypeError):
+        acc.balance  # noqa
+    # Methods without annotations are not decorated
+    assert Account.untyped.__code__.co_filename == "<string>"
+    assert Account.deposit.__name__ == "deposit"
+
+
+@py36
+def test_self_and_cls():
+    conf = typesentry.Config()
+    Account = conf.typed()(_define()["Account"])
+    sig = Account.__dict__["create"].__func__._signature_
+    assert sig._num_self_args == 1
+    assert sig.params[0].name == "cls" and sig.params[0].checker is None
+    with pytest.raises(conf.TypeError) as e:
+        Account.create("a", "b")
+    assert "takes 1 positional argument" in str(e.value)
+
+
+@py36
+def test_inheritance():
+    conf = typesentry.Config()
+    ns = _define(_SRC + """
+class Savings(Account):
+    def withdraw(self, amount: float) -> float:
+        self._balance -= amount
+        return self._balance
+
+    def deposit(self, amount: int) -> float:
+        return Account.deposit(self, amount)
+""", base=conf.Typed)
+    conf.typed()(ns["Account"])
+    Savings = conf.typed()(ns["Savings"])
+    # Inherited methods reuse the wrappers (and signatures) of the base class
+    assert "parse" not in vars(Savings) and "create" not in vars(Savings)
+    assert Savings.create("y").owner == "y"
+    assert Savings("x").withdraw(1.0) == -1.0
+    with pytest.raises(conf.TypeError):
+        Savings("x").withdraw("1")
+    with pytest.raises(conf.TypeError):
+        Savings("x").deposit(1.5)
+    # Decorating the class again does not wrap the methods twice
+    wrapper = Savings.__dict__["withdraw"]
+    assert conf.typed()(Savings).__dict__["withdraw"] is wrapper
+    with pytest.raises(RuntimeError):
+        conf.typed(x=int)(Savings)
+
+
+@py36
+def test_typed_base():
+    conf = typesentry.Config()
+    ns = _define("""
+class Shape(Base):
+    def scale(self, k: float):
+        return self
+
+class Square(Shape):
+    def __init__(self, side: float):
+        self.side = side
+""", base=conf.Typed)
+    Square = ns["Square"]
+    sq = Square(1.0)
+    assert sq.scale(2.0) is sq
+    with pytest.raises(conf.TypeError):
+        Square("1")
+    with pytest.raises(conf.TypeError):
+        sq.scale("2")
+    assert sq.side == 1.0
+
+    off = typesentry.Config(policy="off")
+    ns = _define("class A(Base):\n"
+                 "    def f(self, x: int):\n"
+                 "        return x\n", base=off.Typed)
+    assert ns["A"]().f("x") == "x"
+
+
+@py36
+@pytest.mark.parametrize("kwargs", [{}, {"lazy": True}])
+def test_forward_references(kwargs):
+    conf = typesentry.Config(**kwargs)
+    # The class is decorated before its name is bound in the module
+    ns = _define("class C(Base):\n"
+                 "    def copy(self, other: 'C') -> 'C':\n"
+                 "        return C()\n", base=conf.Typed)
+    c = ns["C"]()
+    assert isinstance(c.copy(c), ns["C"])
+    with pytest.raises(conf.TypeError):
+        c.copy(1)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7),
+                    reason="postponed annotations require Python 3.7+")
+@pytest.mark.parametrize("kwargs", [{}, {"lazy": True}])
+def test_postponed_annotations(kwargs):
+    conf = typesentry.Config(**kwargs)
+    ns = _define("from __future__ import annotations\n"
+                 "import typing\n"
+                 "if typing.TYPE_CHECKING:\n"
+                 "    from decimal import Decimal\n"
+                 "class Acct(Base):\n"
+                 "    def deposit(self, amount: int) -> int:\n"
+                 "        return amount\n"
+                 "    def parent(self, other: typing.Optional[Acct]) -> Acct:\n"
+                 "        return other or self\n"
+                 "    def convert(self, amount: Decimal) -> Decimal:\n"
+                 "        return amount\n", base=conf.Typed)
+    acct = ns["Acct"]()
+    assert acct.deposit(5) == 5
+    with pytest.raises(conf.TypeError):
+        acct.deposit("5")
+    assert acct.parent(None) is acct
+    with pytest.raises(conf.TypeError):
+        acct.parent(1)
+    # `Decimal` cannot be resolved, so the parameter is not checked
+    assert acct.convert(1.5) == 1.5
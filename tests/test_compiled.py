@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+import inspect
+import sys
+import traceback
+import pytest
+from tests import typesentry, py3only, U, I, Not, MagicType
+from typesentry import checker_for_type
+
+_ctc = typesentry.Config(compiled=True)
+typed = _ctc.typed
+TTypeError = _ctc.TypeError
+
+
+def test_positional():
+    @typed(x=int, y=str)
+    def foo(x, y="ham"):
+        return (x, y)
+
+    assert foo(1) == (1, "ham")
+    assert foo(1, "spam") == (1, "spam")
+    assert foo(y="egg", x=3) == (3, "egg")
+    assert foo.__name__ == "foo"
+    assert foo._signature_.function.__name__ == "foo"
+    assert "_ts_c0(x)" in foo._source_
+
+    with pytest.raises(TTypeError) as e:
+        foo("bar")
+    assert str(e.value) == ("Parameter `x` of type `int` received value 'bar' "
+                            "of type str")
+
+    with pytest.raises(TTypeError) as e:
+        foo(1, y=[])
+    assert str(e.value) == ("Parameter `y` of type `str` received value [] "
+                            "of type list")
+
+    # Argument binding is done by Python itself
+    with pytest.raises(TypeError):
+        foo()
+    with pytest.raises(TypeError):
+        foo(1, 2, 3)
+
+
+def test_defaults():
+    @typed(x=int)
+    def foo(x=None):
+        return x
+
+    assert foo() is None
+    assert foo(None) is None
+    assert foo(5) == 5
+    with pytest.raises(TTypeError):
+        foo("")
+
+
+def test_varargs_varkws():
+    @typed(x=int, args=str, kws=float)
+    def foo(x, *args, **kws):
+        return (x, args, kws)
+
+    assert foo(1) == (1, (), {})
+    assert foo(1, "a", "b", z=3.5) == (1, ("a", "b"), {"z": 3.5})
+
+    with pytest.raises(TTypeError) as e:
+        foo(1, "a", 2)
+    assert str(e.value) == ("Vararg parameter of type `str` received value 2 "
+                            "of type int")
+
+    with pytest.raises(TTypeError) as e:
+        foo(1, w="what")
+    assert str(e.value) == ("Parameter `w` of type `float` received value "
+                            "'what' of type str")
+
+
+def test_untyped_and_method():
+    class A(object):
+        @typed(y=U(int, None))
+        def foo(self, x, y):
+            return (x, y)
+
+    assert A().foo("anything", None) == ("anything", None)
+    assert A().foo(x=[], y=7) == ([], 7)
+    with pytest.raises(TTypeError):
+        A().foo(1, 1.5)
+
+
+def test_return_value():
+    @typed(_return=int)
+    def foo(x):
+        return x
+
+    assert foo(3) == 3
+    with pytest.raises(TTypeError) as e:
+        foo("test")
+    assert str(e.value) == ("Incorrect return type in `foo()`: expected int "
+                            "got str")
+
+
+def test_kwonly_fallback():
+    # `_kwonly` parameters mixed with varargs cannot be mirrored, so the
+    # generic wrapper is used instead.
+    @typed(_kwonly=1)
+    def foo(a, b, *args):
+        return True
+
+    assert not hasattr(foo, "_source_")
+    with pytest.raises(TTypeError) as e:
+        foo(1, 2)
+    assert str(e.value) == "`foo()` missing 1 required keyword argument `b`"
+
+
+@py3only
+def test_signature_mirrored():
+    exec("@typed(x=int, z=str)\n"
+         "def foo(x, y=2, *args, w, z='a', **kws):\n"
+         "    return (x, y, args, z, w, kws)\n", globals())
+    wrapped = foo._signature_.function  # noqa
+    assert inspect.signature(foo) == inspect.signature(wrapped)  # noqa
+    assert (foo(1, w=0) == (1, 2, (), "a", 0, {}))  # noqa
+    assert (foo(1, 3, 4, z="b", w=None, q=1) ==  # noqa
+            (1, 3, (4,), "b", None, {"q": 1}))
+    with pytest.raises(TTypeError) as e:
+        foo(1, z=2, w=0)  # noqa
+    assert str(e.value) == ("Parameter `z` of type `str` received value 2 of "
+                            "type int")
+
+
+def test_traceback():
+    @typed(x=int)
+    def important(x):
+        return True
+
+    try:
+        important("bar")
+        assert False
+    except TTypeError as e:
+        assert "Parameter `x` of type `int`" in str(e)
+        tb = sys.exc_info()[2]
+        files = [frame[0] for frame in traceback.extract_tb(tb)]
+        assert "<typesentry:important>" in files
+
+
+#-------------------------------------------------------------------------------
+# Compiled checkers
+#-------------------------------------------------------------------------------
+
+class Odd(MagicType):
+    def check(self, x):
+        return isinstance(x, int) and x % 2 == 1
+
+
+@pytest.mark.parametrize("t, values", [
+    (int, [0, -1, 10**20, True, 1.0, "1", None]),
+    (float, [0, 1.5, float("nan"), False, "1.5"]),
+    (str, ["", u"x", b"x", 1]),
+    (bool, [True, False, 0, None]),
+    (None, [None, 0, False]),
+    ([int], [[], [1, 2], [1, "2"], (1, 2), [True]]),
+    ({str: [float]}, [{}, {"a": [1, 2.5]}, {"a": [None]}, {1: []}, []]),
+    ({"a": int, "b": str}, [{}, {"a": 1}, {"a": "1"}, {"c": 1}, None]),
+    ({"a": int, Ellipsis: str}, [{"a": 1, "q": "?"}, {"a": "1"}, {"q": 1}]),
+    ((int, str), [(1, "a"), (1, 2), (1, "a", 3), [1, "a"]]),
+    ((int, Ellipsis), [(), (1, 2, 3), (1, "2"), [1]]),
+    ({int}, [set(), {1, 2}, {1, "2"}, frozenset()]),
+    (U(int, [str], None), [1, None, ["a"], [1], "a"]),
+    (U(Odd, float, U(Exception, str), type), [1, 2, 2.5, "", ValueError(),
+                                              int, None, [1]]),
+    (I(int, Not(0, 1)), [5, 0, 1, "x"]),
+    ([Odd], [[1, 3], [1, 2], ["a"]]),
+    (type, [int, 1]),
+])
+def test_compile(t, values):
+    checker = checker_for_type(t)
+    pred = checker.compile()
+    assert pred is checker.compile()
+    for v in values:
+        assert pred(v) is checker.check(v), (t, v)
+
+
+@py3only
+def test_compile_typing():
+    from typing import Any, Dict, List, Tuple, Type
+    t = List[Dict[str, Tuple[int, float]]]
+    pred = checker_for_type(t, compiled=True)
+    assert "for " in pred.source
+    assert "type(v4) is int" in pred.source
+    assert pred([{"a": (1, 2.5)}, {}])
+    assert not pred([{"a": (1, "2.5")}])
+    assert not pred([{"a": (1, 2.5, 3)}])
+
+    # Elements of type Any are not iterated over
+    pred = checker_for_type(Dict[str, Any], compiled=True)
+    assert ".values()" not in pred.source
+    assert pred({"a": None})
+    assert not checker_for_type(List[Any], compiled=True)(())
+    assert checker_for_type(Type[int], compiled=True)(bool)
+
+
+def test_compile_type():
+    pred = _ctc.compile_type(int, [str])
+    assert pred(1) and pred(["x"]) and not pred([1])
+    assert _ctc.compile_type([int])([1, 2, 3])
@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+import sys
+import types
+import pytest
+from tests import typesentry
+from typesentry import Deep, checker_for_type
+from typesentry.checks import MtClass, _field_plan
+
+py36 = pytest.mark.skipif(sys.version_info < (3, 7),
+                          reason="dataclasses require Python 3.7+")
+
+
+def _define(src):
+    """Execute `src` as a module, so that its annotations can be resolved."""
+    mod = types.ModuleType("tests._records%d" % len(sys.modules))
+    sys.modules[mod.__name__] = mod
+    exec("from __future__ import annotations\n"
+         "import typing, dataclasses\n"
+         "from typing import List, Optional, NamedTuple\n" + src,
+         mod.__dict__)
+    return mod.__dict__
+
+
+@py36
+def test_dataclass():
+    ns = _define("@dataclasses.dataclass\n"
+                 "class Point:\n"
+                 "    x: float\n"
+                 "    y: float\n"
+                 "    tags: List[str] = "
+                 "dataclasses.field(default_factory=list)\n"
+                 "    z = 0\n"
+                 "@dataclasses.dataclass\n"
+                 "class Segment:\n"
+                 "    a: Point\n"
+                 "    b: Point\n"
+                 "    next: Optional[Segment] = None\n"
+                 "    rest: List[Segment] = "
+                 "dataclasses.field(default_factory=list)\n")
+    Point, Segment = ns["Point"], ns["Segment"]
+    assert isinstance(checker_for_type(Point), MtClass)
+    deep = Deep(Point)
+    assert deep.name() == "Deep[Point]"
+    assert checker_for_type(Deep(Point)) is checker_for_type(deep)
+    assert deep.check(Point(1.0, 2))
+    assert not deep.check(Point(1.0, "2"))
+    assert not deep.check(Point(1.0, 2.0, [1]))
+    assert not deep.check((1.0, 2.0))
+    assert [name for name, _, _ in _field_plan(Point)] == ["x", "y", "tags"]
+    assert _field_plan(Point) is _field_plan(Point)
+
+    seg = Deep(Segment)
+    assert seg.check(Segment(Point(0, 0), Point(1, 1)))
+    assert not seg.check(Segment(Point(0, 0), Point(1, "1")))
+    # Records within unions are checked deeply, but within containers they
+    # are only checked with isinstance()
+    good = Segment(Point(0, 0), Point(1, 1))
+    bad = Segment(Point(0, 0), Point(1, "1"))
+    assert seg.check(Segment(Point(0, 0), Point(1, 1), good))
+    assert not seg.check(Segment(Point(0, 0), Point(1, 1), bad))
+    assert not seg.check(Segment(Point(0, 0), Point(1, 1), 1))
+    assert seg.check(Segment(Point(0, 0), Point(1, 1), None, [bad]))
+    assert not seg.compile()(Segment(Point(0, 0), Point(1, 1), bad))
+
+
+@py36
+@pytest.mark.parametrize("kwargs", [{}, {"compiled": True}])
+def test_deep_in_signature(kwargs):
+    ns = _define("@dataclasses.dataclass\n"
+                 "class Point:\n"
+                 "    x: int\n"
+                 "    y: int\n"
+                 "@dataclasses.dataclass\n"
+                 "class Line:\n"
+                 "    a: Point\n"
+                 "    b: Point\n"
+                 "    next: typing.Union[Line, None] = None\n")
+    Point, Line = ns["Point"], ns["Line"]
+    conf = typesentry.Config(**kwargs)
+
+    @conf.typed(line=Deep(Line))
+    def start(line):
+        return line.a
+
+    assert start(Line(Point(1, 2), Point(3, 4))) == Point(1, 2)
+    with pytest.raises(conf.TypeError) as e:
+        start(Line(Point(1, 2), 3))
+    assert ("Parameter `line` of type `Deep[Line]` received an instance "
+            "whose field 'b' is 3" in str(e.value))
+    with pytest.raises(conf.TypeError):
+        start(Line(Point(1, 2), Point(3, "4")))
+    with pytest.raises(conf.TypeError):
+        start(Line(Point(1, 2), Point(3, 4), Line(Point(1, 2), Point(3, "4"))))
+    with pytest.raises(conf.TypeError):
+        start(Point(1, 2))
+
+
+@py36
+def test_unresolvable_annotation():
+    ns = _define("if typing.TYPE_CHECKING:\n"
+                 "    from decimal import Decimal\n"
+                 "@dataclasses.dataclass\n"
+                 "class Row:\n"
+                 "    id: int\n"
+                 "    name: str\n"
+                 "    price: Decimal\n")
+    Row = ns["Row"]
+    # The field whose type cannot be resolved is not checked
+    assert [name for name, _, _ in _field_plan(Row)] == ["id", "name"]
+    assert Deep(Row).check(Row(1, "a", 2))
+    assert not Deep(Row).check(Row("1", "a", 2))
+
+
+def test_recursive_record():
+    ns = _define("class Link(NamedTuple):\n"
+                 "    value: int\n"
+                 "    next: Link\n")
+    Link = ns["Link"]
+    pred = Deep(Link).compile()
+    assert not pred(Link(1, Link("2", None)))
+    assert not Deep(Link).check(Link(1, None))
+
+
+def test_namedtuple():
+    ns = _define("class Pair(NamedTuple):\n"
+                 "    key: str\n"
+                 "    value: List[int]\n")
+    Pair = ns["Pair"]
+    deep = Deep(Pair)
+    assert deep.check(Pair("a", [1, 2]))
+    assert not deep.check(Pair("a", [1, "2"]))
+    assert not deep.check(("a", [1]))
+    assert deep.fuzzycheck(Pair("a", [1, "2"])) == 0.75
+
+
+def test_attrs():
+    attr = pytest.importorskip("attr")
+
+    @attr.s
+    class Item(object):
+        name = attr.ib(type=str)
+        count = attr.ib(type=int, default=0)
+        extra = attr.ib(default=None)
+
+    deep = Deep(Item)
+    assert deep.check(Item("a", 1)) and deep.check(Item("a", 1, extra=[]))
+    assert not deep.check(Item("a", 1.5))
+    assert deep.compile()(Item("a")) and not deep.compile()(Item(1))
+
+
+def test_not_a_record():
+    with pytest.raises(RuntimeError):
+        Deep(int)
+    with pytest.raises(RuntimeError):
+        Deep([int])
+
+
+@py36
+def test_records_are_collected():
+    import dataclasses
+    import gc
+    import typing
+    import weakref
+    from typesentry.checks import memoized_type_checkers
+    refs = []
+    for i in range(20):
+        name = "Node%d" % i
+        Node = dataclasses.make_dataclass(
+            name, [("value", int), ("next", typing.Optional[name])])
+        assert Deep(Node).check(Node(1, Node(2, None)))
+        assert not Deep(Node).check(Node(1, Node("2", None)))
+        refs.append(weakref.ref(Node))
+    del Node
+    memoized_type_checkers.clear()
+    # The typing module caches the `Optional[...]` types in its own LRU caches
+    for cleanup in getattr(typing, "_cleanups", ()):
+        cleanup()
+    gc.collect()
+    assert all(ref() is None for ref in refs)
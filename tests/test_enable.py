@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+import sys
+import pytest
+from tests import typesentry, py3only
+from typesentry import CallSampling
+
+
+@pytest.mark.parametrize("kwargs", [
+    {}, {"compiled": True}, {"call_sampling": CallSampling(streak=1)},
+    {"stats": True}, {"sampling": typesentry.Sampling()},
+])
+def test_disable_enable(kwargs):
+    conf = typesentry.Config(**kwargs)
+
+    @conf.typed(x=int, y=str, args=float, kws=bool)
+    def foo(x, y="y", *args, **kws):
+        return (x, y, args, kws)
+
+    class A(object):
+        @conf.typed(x=[int])
+        def bar(self, x):
+            return len(x)
+
+    assert conf.enabled
+    with pytest.raises(conf.TypeError):
+        foo("x")
+    conf.disable()
+    assert not conf.enabled
+    assert foo("x") == ("x", "y", (), {})
+    assert foo("x", 1, "z", w=None) == ("x", 1, ("z", ), {"w": None})
+    assert A().bar(["a"]) == 1
+    with pytest.raises(TypeError):
+        foo()  # errors in the number of arguments are still detected
+    assert foo.__name__ == "foo"
+
+    # Functions decorated while disabled start disabled
+    @conf.typed(x=int)
+    def baz(x):
+        return x
+
+    assert baz("x") == "x"
+    conf.enable()
+    for fn, arg in [(foo, "x"), (A().bar, ["a"]), (baz, "x")]:
+        with pytest.raises(conf.TypeError):
+            fn(arg)
+    assert foo(1, "a", 2.5, z=True) == (1, "a", (2.5, ), {"z": True})
+
+
+def test_suspended():
+    conf = typesentry.Config()
+
+    @conf.typed(x=int)
+    def foo(x):
+        return x
+
+    with conf.suspended():
+        assert foo("x") == "x"
+        with conf.suspended():
+            assert foo("x") == "x"
+        assert foo("x") == "x"
+    with pytest.raises(conf.TypeError):
+        foo("x")
+
+    conf.disable()
+    with conf.suspended():
+        pass
+    assert not conf.enabled
+    assert foo("x") == "x"
+
+
+def test_passthrough_cost():
+    conf = typesentry.Config()
+
+    @conf.typed(x=[int])
+    def foo(x):
+        return x
+
+    conf.disable()
+    # The pass-through code does not call any of the checkers
+    assert "check_params" not in foo.__code__.co_names
+    assert foo.__code__.co_code != foo._checked_code_.co_code
+    big = ["x"] * 100000
+    assert foo(big) is big
+
+
+def test_passthrough_lazy(monkeypatch):
+    import typesentry.signature as ts_signature
+    made = []
+    make = ts_signature._make_passthrough_code
+    monkeypatch.setattr(ts_signature, "_passthrough_codes", {})
+    monkeypatch.setattr(ts_signature, "_make_passthrough_code",
+                        lambda code: made.append(code) or make(code))
+    conf = typesentry.Config()
+
+    @conf.typed(x=int)
+    def foo(x):
+        return x
+
+    @conf.typed(x=int)
+    def bar(x):
+        return -x
+
+    # Nothing is generated until the checks are disabled
+    assert made == []
+    conf.disable()
+    assert made == [foo._checked_code_]
+    # Wrappers created from the same code share the pass-through code
+    assert foo._checked_code_ is bar._checked_code_
+    assert foo.__code__ is bar.__code__
+    assert foo("a") == "a" and bar(1) == -1
+    conf.enable()
+    assert foo.__code__ is foo._checked_code_
+
+
+@py3only
+def test_kwonly_and_async():
+    if sys.version_info < (3, 7):
+        pytest.skip("asyncio.run() requires Python 3.7+")
+    import asyncio
+    conf = typesentry.Config(compiled=True)
+    ns = {"typed": conf.typed}
+    exec("@typed(x=int, z=str)\n"
+         "def foo(x, y=2, *args, w, z='a', **kws):\n"
+         "    return (x, y, args, w, z, kws)\n"
+         "@typed(x=int, _return=int)\n"
+         "async def coro(x):\n"
+         "    return x\n"
+         "@typed(_return=typing.AsyncIterator[int])\n"
+         "async def agen(n):\n"
+         "    for i in range(n):\n"
+         "        yield str(i)\n"
+         "async def collect(it):\n"
+         "    return [x async for x in it]\n",
+         dict(ns, typing=__import__("typing")), ns)
+    conf.disable()
+    assert ns["foo"]("x", w=1, z=0) == ("x", 2, (), 1, 0, {})
+    assert asyncio.run(ns["coro"]("x")) == "x"
+    assert asyncio.run(ns["collect"](ns["agen"](2))) == ["0", "1"]
+    conf.enable()
+    with pytest.raises(conf.TypeError):
+        ns["foo"]("x", w=1)
+    with pytest.raises(conf.TypeError):
+        asyncio.run(ns["coro"]("x"))
+    with pytest.raises(conf.TypeError):
+        asyncio.run(ns["collect"](ns["agen"](2)))
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+import typing
+from tests import typesentry, U, I, Not, MagicType
+from typesentry import checker_for_type, Sampled, NDArray
+from typesentry.checks import MtList, MtUnion, MtLiteral
+
+
+def test_structural_equality():
+    assert MtList(int) == MtList(int)
+    assert hash(MtList(int)) == hash(MtList(int))
+    assert MtList(int) != MtList(str)
+    assert U(int, str) == U(int, str)
+    assert U(int, str) != U(str, int)
+    assert U(int, str) != I(int, str)
+    assert Not(int) == Not(int)
+    assert MtLiteral(1) != MtLiteral(1.0)
+    assert MtLiteral(1) != MtLiteral(True)
+    assert NDArray[int, (None, 3)] == NDArray[int, (None, 3)]
+    assert NDArray[int] != NDArray[float]
+    sampling = typesentry.Sampling()
+    assert Sampled([int], sampling) == Sampled([int], sampling)
+    assert Sampled([int]) != Sampled([int])
+
+
+def test_custom_types_compare_by_identity():
+    class Matrix(MagicType):
+        def check(self, var):
+            return isinstance(var, list)
+
+    m1, m2 = Matrix(), Matrix()
+    assert m1 == m1 and m1 != m2
+    assert len({m1, m2}) == 2
+    assert checker_for_type(m1) is m1
+
+
+def test_shared_checkers():
+    c1 = checker_for_type({"id": int, "name": str})
+    c2 = checker_for_type({"id": int, "name": str})
+    assert c1 is c2
+    assert checker_for_type({"id": int, "name": [str]}) is not c1
+    assert checker_for_type([int, str]) is checker_for_type([int, str])
+    assert checker_for_type([int]) is checker_for_type(typing.List[int])
+    assert checker_for_type({"a": 1}) is not checker_for_type({"a": 1.0})
+    assert checker_for_type({"a": 1.0}).name() == "{'a': 1.0}"
+    assert checker_for_type(1.0).name() == "1.0"
+    assert checker_for_type((int, [str])) is checker_for_type((int, [str]))
+    assert checker_for_type(U(int, str)) is checker_for_type(U(int, str))
+    assert checker_for_type(MtUnion(int, [str])) is \
+        checker_for_type(typing.Union[int, typing.List[str]])
+
+
+def test_shared_checkers_work():
+    conf = typesentry.Config()
+    for _ in range(3):
+        assert conf.is_type({"id": 1, "name": "x"}, {"id": int, "name": str})
+        assert not conf.is_type({"id": "1"}, {"id": int, "name": str})
+        assert conf.is_type([1, "a"], [int, str])
+        assert not conf.is_type([1.5], [int, str])
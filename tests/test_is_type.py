@@ -177,6 +177,32 @@ def test_Union():
         assert not is_type(True, Union[bool, int])
 
 
+def test_wide_union():
+    from typesentry import checker_for_type
+    classes = [type("Event%d" % i, (object, ), {}) for i in range(30)]
+    Sub = type("Sub", (classes[7], ), {})
+    union = U(*classes)
+    assert is_type(classes[29](), union)
+    assert is_type(Sub(), union)
+    assert not is_type(1, union)
+    assert not is_type(classes[0], union)
+
+    # Nested unions are flattened (and equal to the flat unions), but keep
+    # their names
+    t = U(int, U(str, U(None, [int])))
+    assert t.name() == "Union[int, Union[str, Optional[List[int]]]]"
+    assert U(int, U(str, None)).name() == "Union[int, Optional[str]]"
+    assert U(int, U(str, None)) == U(int, str, None)
+    assert checker_for_type(U(int, U(str, None))) is \
+        checker_for_type(U(int, str, None))
+    for v, res in [(1, True), ("a", True), (None, True), ([1], True),
+                   ([1.5], False), (True, False), (1.5, False)]:
+        assert is_type(v, t) is res
+    assert is_type(True, U(classes[0], bool))
+    assert not is_type(0, U(classes[0], bool, None))
+    assert is_type(True, U(float, int, bool))
+
+
 @py3only
 def test_List():
     from typing import List, Any
@@ -268,3 +294,43 @@ def test_callable():
     assert not is_type("print", Callable)
     assert not is_type(lambda x: x, Callable[[int, int], None])
     assert not is_type(Bbb(), Callable)
+
+
+def test_homogeneous_containers():
+    from typesentry import checker_for_type
+
+    class A(object): pass
+
+    class B(A): pass
+
+    class Odd(MagicType):
+        def check(self, x):
+            return isinstance(x, int) and x % 2 == 1
+
+    class Int2(type(checker_for_type(int))):
+        # Overrides .check() but not .exact_types()
+        def check(self, x):
+            return x == 2
+
+    assert checker_for_type(int).exact_types() == {int}
+    assert checker_for_type(float).exact_types() == {int, float}
+    assert checker_for_type(U(str, None)).exact_types() == {str, type(None)}
+    assert checker_for_type(I(int, float)).exact_types() == {int}
+    assert checker_for_type(Odd).exact_types() == set()
+
+    n = 1000
+    assert is_type(list(range(n)), [int])
+    assert is_type(list(range(n)) + [None], [int, None])
+    assert is_type([0.5] * n + [1], [float])
+    assert is_type(set(range(n)), {int})
+    assert is_type(tuple(range(n)), (int, Ellipsis))
+    assert is_type({str(i): i for i in range(n)}, {str: int})
+    assert is_type([A()] * n + [B()], [A])
+    assert is_type([1, 3, 5], [Odd])
+    assert not is_type(list(range(n)) + [True], [int])
+    assert not is_type(list(range(n)) + ["1"], [float])
+    assert not is_type({str(i): i for i in range(n)}, {str: str})
+    assert not is_type([A()] * n + [1], [A])
+    assert not is_type([1, 3, 4], [Odd])
+    assert not is_type([1, 2, 3], [Int2])
+    assert is_type([2, 2], [Int2])
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+import pytest
+from tests import typesentry, typed, is_type, name_type, py3only, TTypeError
+from typesentry import Sampling
+
+
+@py3only
+def test_iterator_types():
+    from typing import Any, Generator, Iterable, Iterator
+    assert is_type(iter([1, 2]), Iterator[int])
+    assert is_type(iter(["a"]), Iterator[int])  # items are not consumed
+    assert is_type((x for x in ()), Iterator[str])
+    assert not is_type([1, 2], Iterator[int])
+    assert is_type([1, 2], Iterable[int])
+    assert is_type({1, 2}, Iterable[int])
+    assert is_type(range(5), Iterable[int])
+    assert is_type(iter([1]), Iterable[int])
+    assert not is_type([1, "a"], Iterable[int])
+    assert not is_type(5, Iterable[int])
+    assert is_type((x for x in ()), Generator[int, None, None])
+    assert not is_type(iter([]), Generator[int, None, None])
+    assert is_type(iter([]), Iterator)
+    assert is_type(iter([]), Iterator[Any])
+    assert name_type(Iterator[int]) == "Iterator[int]"
+    assert name_type(Iterable) == "Iterable"
+    assert (name_type(Generator[int, None, str]) ==
+            "Generator[int, None, str]")
+
+
+@py3only
+def test_lazy_arguments():
+    from typing import Iterator, Iterable, Optional
+
+    consumed = []
+
+    def source(items):
+        for x in items:
+            consumed.append(x)
+            yield x
+
+    @typed(xs=Iterator[int], ys=Optional[Iterable[str]])
+    def total(xs, ys=None):
+        return sum(xs)
+
+    assert total(source(range(10))) == 45
+    assert total(iter([]), ys=iter(["a"])) == 0
+
+    del consumed[:]
+    gen = source([1, 2, "three", 4])
+    with pytest.raises(TTypeError) as e:
+        total(gen)
+    assert str(e.value) == ("Parameter `xs` of type `Iterator[int]` received "
+                            "an iterator where 3rd element is 'three' of type "
+                            "str")
+    # The items are checked as they are consumed
+    assert consumed == [1, 2, "three"]
+
+    with pytest.raises(TTypeError) as e:
+        total([1, 2])
+    assert str(e.value) == ("Parameter `xs` of type `Iterator[int]` received "
+                            "value [1, 2] of type list")
+    with pytest.raises(TTypeError) as e:
+        total(iter([]), ["a", 2])
+    assert str(e.value) == ("Parameter `ys` expects type `Iterable[str]` but "
+                            "received a list where 2nd element is 2 of type "
+                            "int")
+
+
+@py3only
+def test_lazy_return():
+    from typing import Generator, Iterator
+
+    @typed(n=int, _return=Iterator[int])
+    def numbers(n):
+        for i in range(n):
+            yield i
+        yield "done"
+
+    it = numbers(3)
+    assert [next(it) for _ in range(3)] == [0, 1, 2]
+    with pytest.raises(TTypeError) as e:
+        next(it)
+    assert str(e.value) == ("Incorrect return type in `numbers()`: expected "
+                            "Iterator[int] got an iterator where 4th element "
+                            "is 'done' of type str")
+
+    @typed(_return=Generator[int, int, None])
+    def echo():
+        x = 0
+        while True:
+            x = yield x
+
+    gen = echo()
+    assert next(gen) == 0
+    assert gen.send(5) == 5
+    with pytest.raises(TTypeError) as e:
+        gen.send(None)
+    assert "where 3rd element is None" in str(e.value)
+    gen.close()
+
+
+@py3only
+def test_stream_sampling():
+    from typing import Iterator
+    s = Sampling(head=3, tail=100, samples=2)
+    it = s.stream_indices()
+    assert [next(it) for _ in range(9)] == [0, 1, 2, 3, 4, 5, 7, 9, 13]
+    assert list(Sampling(2, 0, 0).stream_indices()) == [0, 1]
+
+    conf = typesentry.Config(sampling=Sampling(head=3, tail=0, samples=2))
+
+    @conf.typed(xs=Iterator[int])
+    def consume(xs):
+        return list(xs)
+
+    items = list(range(20))
+    items[6] = "unchecked"
+    assert len(consume(iter(items))) == 20
+    items[7] = "checked"
+    with pytest.raises(conf.TypeError):
+        consume(iter(items))
+
+    ctc = typesentry.Config(compiled=True)
+
+    @ctc.typed(xs=Iterator[int], _return=Iterator[str])
+    def stringify(xs):
+        return (str(x) for x in xs)
+
+    assert "stream_arg" in stringify._source_
+    assert list(stringify(iter([1, 2]))) == ["1", "2"]
+    with pytest.raises(ctc.TypeError):
+        list(stringify(iter([1, None])))
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+import pytest
+from tests import typesentry
+
+
+def test_lazy():
+    conf = typesentry.Config(lazy=True)
+
+    @conf.typed(x=int, _return=str)
+    def foo(x, y=None):
+        """Doc."""
+        return str(x)
+
+    assert foo.__name__ == "foo" and foo.__doc__ == "Doc."
+    assert not hasattr(foo, "_signature_")
+    assert foo in conf._pending
+    assert foo(1) == "1"
+    assert foo._signature_.function is foo.__wrapped__
+    assert foo not in conf._pending
+    with pytest.raises(conf.TypeError):
+        foo("1")
+
+    class A(object):
+        @conf.typed(x=[int])
+        def bar(self, x):
+            return len(x)
+
+    assert A().bar([1, 2]) == 2
+    with pytest.raises(conf.TypeError):
+        A().bar(["a"])
+
+
+def test_lazy_declaration_errors():
+    conf = typesentry.Config(lazy=True)
+
+    @conf.typed(z=int)
+    def foo(x):
+        return x
+
+    # The error in the declaration is only detected when the function is
+    # called, or when the config is resolved
+    with pytest.raises(RuntimeError):
+        foo(1)
+    with pytest.raises(RuntimeError):
+        conf.resolve()
+    with pytest.raises(RuntimeError):
+        conf.resolve(foo)
+
+
+def test_resolve():
+    conf = typesentry.Config(lazy=True, stats=True)
+
+    @conf.typed(x=int)
+    def foo(x):
+        return x
+
+    @conf.typed(x=str)
+    def bar(x):
+        return x
+
+    assert len(conf._pending) == 2
+    conf.resolve()
+    assert not conf._pending
+    assert foo._signature_.params[0].checker.name() == "int"
+    wrapper = conf.resolve(foo)
+    assert wrapper is not foo and wrapper._signature_ is foo._signature_
+    assert conf.resolve(len) is len
+    assert bar("x") == "x"
+    assert conf.stats()["tests.test_lazy.test_resolve.<locals>.bar"][
+        "calls"] == 1
+
+
+def test_lazy_disable():
+    conf = typesentry.Config(lazy=True)
+
+    @conf.typed(x=int)
+    def foo(x):
+        return x
+
+    conf.disable()
+    assert foo("x") == "x"
+    conf.enable()
+    with pytest.raises(conf.TypeError):
+        foo("x")
+    with conf.suspended():
+        assert foo("y") == "y"
+
+
+@pytest.mark.skipif(not typesentry.checks.PY37,
+                    reason="closure cells are read-only before Python 3.7")
+def test_lazy_adopts_wrapper():
+    conf = typesentry.Config(lazy=True)
+
+    @conf.typed(x=int)
+    def foo(x):
+        return x
+
+    assert foo(1) == 1
+    # The stand-in now runs the wrapper's own code, without forwarding
+    wrapper = conf.resolve(foo)
+    assert foo.__code__ is wrapper.__code__
+    assert [c.cell_contents for c in foo.__closure__] == \
+        [c.cell_contents for c in wrapper.__closure__]
+    with pytest.raises(conf.TypeError):
+        foo("1")
+    conf.disable()
+    assert foo("1") == "1"
+    conf.enable()
+    with pytest.raises(conf.TypeError):
+        foo("1")
+
+
+@pytest.mark.skipif(not typesentry.checks.PY37,
+                    reason="closure cells are read-only before Python 3.7")
+def test_lazy_calls_wrapper():
+    conf = typesentry.Config(lazy=True, compiled=True)
+
+    @conf.typed(x=int)
+    def foo(x):
+        return x
+
+    conf.resolve()
+    # The compiled wrapper has different shape, so it's called directly
+    wrapper = conf.resolve(foo)
+    assert foo.__code__ is not wrapper.__code__
+    assert wrapper in [c.cell_contents for c in foo.__closure__]
+    assert foo(1) == 1
+    with pytest.raises(conf.TypeError):
+        foo("1")
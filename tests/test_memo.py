@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+import gc
+import weakref
+import pytest
+from typesentry import checker_for_type
+from typesentry.checks import CheckerMemo, MtInt, memoized_type_checkers
+
+
+@pytest.fixture
+def memo():
+    saved = memoized_type_checkers.maxsize
+    yield memoized_type_checkers
+    memoized_type_checkers.maxsize = saved
+
+
+def test_memo_lru():
+    m = CheckerMemo(maxsize=3, pinned={int: MtInt()})
+    assert len(m) == 1 and int in m
+    for i in range(3):
+        m[i] = i + 10
+    assert m.get(0) == 10  # now 1 is the least recently used
+    m[3] = 13
+    assert 1 not in m
+    assert m.get(1) is None
+    assert isinstance(m.get(int), MtInt)
+    for i in range(4, 10):
+        m[i] = i + 10
+    assert int in m and len(m) == 4
+    assert m.stats() == {"size": 4, "maxsize": 3, "hits": 2, "misses": 1,
+                         "evictions": 7}
+    assert m.setdefault(9, 0) == 19
+    assert m.setdefault(10, 20) == 20
+    m.clear()
+    assert len(m) == 1 and m.hits == m.misses == m.evictions == 0
+
+
+def test_memo_metrics(memo):
+    hits, misses = memo.hits, memo.misses
+    checker_for_type({"some": int, "unique": [str], "spec": float})
+    assert memo.misses > misses
+    hits = memo.hits
+    checker_for_type({"some": int, "unique": [str], "spec": float})
+    assert memo.hits == hits + 1
+
+
+def test_memo_literal_tuples():
+    # Equal literals of different types are distinct entries, also in tuples
+    c1 = checker_for_type((int, 1))
+    c2 = checker_for_type((int, True))
+    c3 = checker_for_type((int, (str, 1.0)))
+    assert c1 is not c2
+    assert c1.name() == "Tuple[int, 1]"
+    assert c2.name() == "Tuple[int, True]"
+    assert checker_for_type((int, (str, 1))) is not c3
+    assert checker_for_type((int, 1)) is c1
+
+
+def test_memo_holds_classes_weakly(memo):
+    memo.maxsize = 4
+
+    def evict():
+        for i in range(memo.maxsize):
+            checker_for_type((int, "evict%d" % i))
+
+    class A(object):
+        pass
+
+    class B(object):
+        pass
+
+    ca = checker_for_type(A)
+    checker_for_type(B)
+    assert A not in memo._entries and B not in memo._entries
+    evict()
+    # The checker for A is still in use, so it is found again
+    assert checker_for_type(A) is ca
+
+    refb = weakref.ref(B)
+    del B
+    gc.collect()
+    assert refb() is None
+
+
+def test_memo_temporary_class(memo):
+    class C(object):
+        pass
+
+    refc = weakref.ref(C)
+    checker = checker_for_type(C)
+    assert checker.check(C()) and checker_for_type(C) is checker
+    del C, checker
+    gc.collect()
+    assert refc() is None
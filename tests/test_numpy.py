@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+import pytest
+from tests import typed, is_type, name_type, py3only, TTypeError
+from typesentry import NDArray
+
+np = pytest.importorskip("numpy")
+
+
+def test_ndarray_dtype():
+    a = np.zeros((3, 4))
+    assert is_type(a, NDArray)
+    assert is_type(a, NDArray[float])
+    assert is_type(a, NDArray["float64"])
+    assert is_type(a, NDArray[np.float64])
+    assert is_type(np.arange(5), NDArray[int])
+    assert is_type(np.arange(5), NDArray[float])
+    assert is_type(np.arange(5, dtype=np.uint8), NDArray[int])
+    assert is_type(np.array([True]), NDArray[bool])
+    assert is_type(np.array(["a"]), NDArray[str])
+    assert is_type(np.array([b"a"]), NDArray[bytes])
+    assert not is_type(a, NDArray[int])
+    assert not is_type(a, NDArray["float32"])
+    assert not is_type(np.array([True]), NDArray[int])
+    assert not is_type([1.0, 2.0], NDArray)
+    assert not is_type(None, NDArray[float])
+
+
+def test_ndarray_shape():
+    a = np.zeros((3, 4))
+    assert is_type(a, NDArray[float, (3, 4)])
+    assert is_type(a, NDArray[float, (None, 4)])
+    assert is_type(a, NDArray[None, 2])
+    assert is_type(a, NDArray[float, ...])
+    assert is_type(a, NDArray[float, (..., 4)])
+    assert is_type(a, NDArray[float, (3, ...)])
+    assert is_type(a, NDArray[float, (3, ..., 4)])
+    assert is_type(np.zeros((3, 5, 4)), NDArray[float, (3, ..., 4)])
+    assert not is_type(a, NDArray[float, (4, 3)])
+    assert not is_type(a, NDArray[float, 1])
+    assert not is_type(a, NDArray[float, (None, None, None)])
+    assert not is_type(a, NDArray[float, (..., 3)])
+    assert not is_type(np.zeros(4), NDArray[float, (3, ..., 4)])
+    with pytest.raises(RuntimeError):
+        NDArray[float, "3x4"]
+    with pytest.raises(RuntimeError):
+        NDArray[float, (..., 1, ...)]
+    with pytest.raises(RuntimeError):
+        NDArray[float, 1, 2]
+
+
+def test_structured():
+    dt = np.dtype([("x", np.float32), ("n", np.int64)])
+    a = np.zeros(10, dtype=dt)
+    assert is_type(a, NDArray[{"x": float, "n": int}])
+    assert is_type(a, NDArray[{"x": "float32", "n": int}, 1])
+    assert is_type(a, NDArray[(float, int), ...])
+    assert not is_type(a, NDArray[{"x": float}])
+    assert not is_type(a, NDArray[{"x": int, "n": int}])
+    assert not is_type(a, NDArray[(int, float), ...])
+    assert not is_type(a, NDArray[float])
+    assert not is_type(np.zeros(3), NDArray[{"x": float}])
+
+
+def test_memmap(tmpdir):
+    fname = str(tmpdir.join("data.bin"))
+    mm = np.memmap(fname, dtype="int32", mode="w+", shape=(100, 2))
+    assert is_type(mm, NDArray["int32", (None, 2)])
+    assert not is_type(mm, NDArray["int64", (None, 2)])
+    del mm
+
+
+def test_names_and_errors():
+    assert name_type(NDArray) == "NDArray"
+    assert name_type(NDArray[float]) == "NDArray[float]"
+    assert (name_type(NDArray["int32", (None, 3)]) ==
+            "NDArray[int32, (None, 3)]")
+    assert name_type(NDArray[None, (5, ...)]) == "NDArray[Any, (5, ...)]"
+    assert name_type(NDArray[int, (5,)]) == "NDArray[int, (5,)]"
+    assert name_type(NDArray[{"x": float}]) == "NDArray[{'x': float}]"
+
+    @typed(x=NDArray[float, (None, 3)])
+    def foo(x):
+        return True
+
+    assert foo(np.ones((7, 3)))
+    with pytest.raises(TTypeError) as e:
+        foo(np.ones((3, 7), dtype=np.int8))
+    assert str(e.value) == ("Parameter `x` of type `NDArray[float, (None, "
+                            "3)]` received an array of dtype int8 and shape "
+                            "(3, 7)")
+    with pytest.raises(TTypeError) as e:
+        foo([1.0])
+    assert str(e.value) == ("Parameter `x` of type `NDArray[float, (None, "
+                            "3)]` received value [1.0] of type list")
+
+
+@py3only
+def test_sequence():
+    from typing import Any, Sequence
+    assert is_type([1, 2], Sequence[int])
+    assert is_type((1.5, 2), Sequence[float])
+    assert is_type(np.arange(10), Sequence[int])
+    assert is_type(np.arange(10, dtype=np.float32), Sequence[float])
+    assert is_type(np.zeros((2, 2)), Sequence[Sequence[float]])
+    assert is_type(np.zeros((2, 2)), Sequence[Any])
+    assert is_type(np.zeros((2, 2)), Sequence)
+    assert is_type(np.array([1, "a"], dtype=object), Sequence[Any])
+    assert is_type(np.array([1, 2], dtype=object), Sequence[int])
+    assert not is_type(np.array([1, "a"], dtype=object), Sequence[int])
+    assert not is_type(np.zeros(3), Sequence[int])
+    assert not is_type(np.zeros((2, 2)), Sequence[float])
+    assert not is_type(np.zeros(()), Sequence[float])
+    assert not is_type([1, "a"], Sequence[int])
+    assert not is_type({1, 2}, Sequence[int])
+    assert name_type(Sequence) == "Sequence"
+    assert name_type(Sequence[float]) == "Sequence[float]"
+
+    @typed(x=Sequence[float])
+    def foo(x):
+        return True
+
+    assert foo(np.zeros(3))
+    with pytest.raises(TTypeError) as e:
+        foo(np.zeros(3, dtype=complex))
+    assert str(e.value) == ("Parameter `x` of type `Sequence[float]` received "
+                            "an array of dtype complex128 and shape (3,)")
+    with pytest.raises(TTypeError) as e:
+        foo([1, None])
+    assert str(e.value) == ("Parameter `x` of type `Sequence[float]` received "
+                            "a sequence where 2nd element is None")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+import datetime
+import pytest
+from tests import typed, is_type, name_type, TTypeError
+from typesentry import Frame, Series
+
+pd = pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+
+
+def make_frame():
+    return pd.DataFrame({
+        "ts": pd.to_datetime(["2017-01-01", "2017-01-02"]),
+        "price": [1.5, 2.5],
+        "qty": [1, 2],
+        "sym": ["a", "b"],
+    })
+
+
+def test_frame_columns():
+    df = make_frame()
+    assert is_type(df, Frame())
+    assert is_type(df, Frame({"ts": datetime.datetime, "price": float,
+                              "qty": int, "sym": str}))
+    assert is_type(df, Frame({"price": float, Ellipsis: None}))
+    assert is_type(df, Frame({"price": "float64", "qty": np.int64,
+                              Ellipsis: None}))
+    assert is_type(df, Frame({"qty": float, Ellipsis: None}))
+    assert not is_type(df, Frame({"price": float}))
+    assert not is_type(df, Frame({"price": int, Ellipsis: None}))
+    assert not is_type(df, Frame({"sym": str, "vol": int, Ellipsis: None}))
+    assert not is_type(df, Frame({Ellipsis: float}))
+    assert not is_type(df["price"], Frame())
+    assert not is_type({"price": [1.5]}, Frame({"price": float}))
+    cat = pd.DataFrame({"c": pd.Categorical(["x", "y"])})
+    assert is_type(cat, Frame({"c": "category"}))
+    assert not is_type(cat, Frame({"c": str}))
+
+
+def test_frame_datetime_resolution():
+    df = pd.DataFrame({
+        "ts": pd.to_datetime(["2017-01-01"]).as_unit("us"),
+        "utc": pd.to_datetime(["2017-01-01"]).tz_localize("UTC"),
+        "dt": pd.to_timedelta([1], unit="s"),
+    })
+    assert is_type(df, Frame({"ts": "datetime64[ns]", Ellipsis: None}))
+    assert is_type(df, Frame({"ts": "datetime64", "dt": "timedelta64[ns]",
+                              "utc": "datetime64[ns, UTC]"}))
+    assert not is_type(df, Frame({"utc": "datetime64[ns]", Ellipsis: None}))
+    assert not is_type(df, Frame({"ts": "timedelta64", Ellipsis: None}))
+    assert not is_type(df, Frame({"utc": "datetime64[ns, Europe/Paris]",
+                                  Ellipsis: None}))
+    # A dtype object requires the exact resolution
+    assert not is_type(df, Frame({"ts": np.dtype("datetime64[ns]"),
+                                  Ellipsis: None}))
+    assert is_type(df, Frame({"ts": np.dtype("datetime64[us]"),
+                              Ellipsis: None}))
+
+
+def test_frame_index_and_nulls():
+    df = make_frame().set_index("ts")
+    assert is_type(df, Frame(index=pd.DatetimeIndex))
+    assert is_type(df, Frame(index=datetime.datetime))
+    assert not is_type(df, Frame(index=int))
+    assert is_type(make_frame(), Frame(index=int))
+    assert not is_type(make_frame(), Frame(index=pd.DatetimeIndex))
+
+    df = pd.DataFrame({"a": [1.0, None], "b": [1.0, 2.0]})
+    assert is_type(df, Frame({"a": float, "b": float}))
+    assert not is_type(df, Frame({"a": float, "b": float}, nullable=False))
+    assert is_type(df, Frame({"b": float, Ellipsis: None}, nullable=False))
+
+
+def test_series():
+    s = pd.Series([1.5, 2.5], index=["x", "y"])
+    assert is_type(s, Series())
+    assert is_type(s, Series(float))
+    assert is_type(s, Series(float, index=str))
+    assert not is_type(s, Series(float, index=int))
+    assert not is_type(s, Series(bool))
+    assert not is_type(s.to_frame(), Series())
+    assert is_type(pd.Series([True]), Series(bool))
+    assert not is_type(pd.Series([1.0, None]), Series(float, nullable=False))
+
+
+def test_names_and_errors():
+    assert name_type(Frame()) == "Frame"
+    assert name_type(Frame({"a": int})) == "Frame[{'a': int}]"
+    assert (name_type(Frame({"a": "float32", Ellipsis: None})) ==
+            "Frame[{'a': float32, ...: Any}]")
+    assert (name_type(Frame(index=int, nullable=False)) ==
+            "Frame[index=int, nullable=False]")
+    assert name_type(Series(float)) == "Series[float]"
+    assert name_type(Series()) == "Series"
+
+    @typed(df=Frame({"price": float, "qty": int, Ellipsis: None}),
+           s=Series(float, nullable=False))
+    def foo(df, s=None):
+        return True
+
+    assert foo(make_frame())
+    with pytest.raises(TTypeError) as e:
+        foo(make_frame().drop(columns="qty"))
+    assert str(e.value) == ("Parameter `df` of type `Frame[{'price': float, "
+                            "'qty': int, ...: Any}]` received a frame without "
+                            "column 'qty'")
+    with pytest.raises(TTypeError) as e:
+        foo(make_frame().astype({"qty": "float32"}))
+    assert str(e.value) == ("Parameter `df` of type `Frame[{'price': float, "
+                            "'qty': int, ...: Any}]` received a frame where "
+                            "column 'qty' has dtype float32")
+    with pytest.raises(TTypeError) as e:
+        foo(make_frame(), pd.Series([1.0, None]))
+    assert str(e.value) == ("Parameter `s` of type `Series[float, "
+                            "nullable=False]` received a series containing "
+                            "missing values")
+    with pytest.raises(TTypeError) as e:
+        foo([1])
+    assert str(e.value).endswith("received value [1] of type list")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+import pytest
+from tests import typesentry
+from typesentry import Policy
+
+
+def foo(x):
+    return x
+
+
+def test_policy_modes():
+    pol = Policy("shallow", [("tests.*", "sample"),
+                             ("tests.test_policy.foo", "off"),
+                             ("othermodule", "full")])
+    assert pol.mode_for(foo) == "off"
+    assert pol.mode_for(test_policy_modes) == "sample"
+    assert pol.mode_for(len) == "shallow"
+    assert Policy("full", {"tests.test_policy": "off"}).mode_for(foo) == "off"
+    assert Policy().mode_for(foo) == "full"
+    assert Policy("off").all_off
+    assert not Policy("off", {"x.*": "full"}).all_off
+    with pytest.raises(RuntimeError):
+        Policy("everything")
+    with pytest.raises(RuntimeError):
+        Policy("full", {"x.*": "none"})
+
+
+def test_policy_from_env(tmpdir):
+    pol = Policy.from_env({})
+    assert pol.mode == "full" and pol.overrides == []
+    pol = Policy.from_env({"TYPESENTRY_MODE": "sample",
+                           "TYPESENTRY_POLICY": "a.*=off, a.b.f = full,"})
+    assert pol.mode == "sample"
+    assert pol.overrides == [("a.*", "off"), ("a.b.f", "full")]
+    with pytest.raises(RuntimeError):
+        Policy.from_env({"TYPESENTRY_POLICY": "a.*"})
+
+    cfg = tmpdir.join("typesentry.cfg")
+    cfg.write("# Policy\n"
+              "* = off\n"
+              "\n"
+              "pkg.* = full\n"
+              "pkg.io.* = shallow\n")
+    pol = Policy.from_env({"TYPESENTRY_POLICY_FILE": str(cfg),
+                           "TYPESENTRY_POLICY": "pkg.io.read=sample"})
+    assert pol.mode == "off"
+    assert pol.overrides == [("pkg.*", "full"), ("pkg.io.*", "shallow"),
+                             ("pkg.io.read", "sample")]
+
+
+def test_config_policy(monkeypatch):
+    monkeypatch.setenv("TYPESENTRY_MODE", "off")
+    monkeypatch.setenv("TYPESENTRY_POLICY", "tests.test_policy.*.bar=full")
+    conf = typesentry.Config()
+    assert conf.policy.mode == "off"
+
+    @conf.typed(x=int)
+    def bar(x):
+        return x
+
+    @conf.typed(x=int)
+    def baz(x):
+        return x
+
+    with pytest.raises(conf.TypeError):
+        bar("x")
+    assert baz("x") == "x"
+    assert not hasattr(baz, "_signature_")
+
+    # Explicit policy takes precedence over the environment
+    conf = typesentry.Config(policy="full")
+    assert conf.typed(x=int)(foo) is not foo
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"compiled": True}])
+def test_shallow(kwargs):
+    conf = typesentry.Config(policy="shallow", **kwargs)
+
+    @conf.typed(x=[int], y={str: int}, _return=[str])
+    def foo(x, y=None):
+        return list(x)
+
+    assert foo(["a"], {1: "b"}) == ["a"]
+    with pytest.raises(conf.TypeError):
+        foo((1, 2))
+    with pytest.raises(conf.TypeError):
+        foo([1], [])
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"compiled": True}])
+def test_sample(kwargs):
+    conf = typesentry.Config(policy="sample", **kwargs)
+
+    @conf.typed(x=int)
+    def foo(x):
+        return x
+
+    assert hasattr(foo, "_call_sampling_state_")
+    with pytest.raises(conf.TypeError):
+        foo("x")
+    assert foo(1) == 1
+
+
+def test_disabled_is_off():
+    conf = typesentry.Config(disabled=True, policy="full")
+    assert conf.policy.mode == "off"
+    assert conf.typed(x=int)(foo) is foo
+
+
+def test_debug_only():
+    conf = typesentry.Config(debug_only=True, policy="full")
+    # Under `python -O` the decorator returns the functions unchanged
+    assert (conf.typed(x=int)(foo) is foo) == (not __debug__)
+
+
+def test_shallow_records():
+    dataclasses = pytest.importorskip("dataclasses")
+    conf = typesentry.Config(policy="shallow")
+    import typing
+    P = dataclasses.make_dataclass("P", [("x", int),
+                                         ("ys", typing.List[int])])
+
+    @conf.typed(p=typesentry.Deep(P), d={"a": [int], "b": str, Ellipsis: int})
+    def foo(p, d):
+        return p
+
+    # Elements of the containers inside records and dicts are not checked
+    assert foo(P(1, ["x"]), {"a": ["x"], "c": "?"})
+    with pytest.raises(conf.TypeError):
+        foo(P("1", []), {})
+    with pytest.raises(conf.TypeError):
+        foo(P(1, []), {"b": 1})
+    with pytest.raises(conf.TypeError):
+        foo(P(1, []), {"a": set()})
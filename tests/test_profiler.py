@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+import pytest
+from tests import typesentry
+from typesentry import CallSampling, Profiler
+
+
+def test_profiler():
+    profiler = Profiler(interval=10)
+    conf = typesentry.Config(profiler=profiler, compiled=True)
+
+    @conf.typed(rows=[{str: int}], tag=str, _return=int)
+    def ingest(rows, tag=""):
+        return len(rows)
+
+    @conf.typed(x=int)
+    def small(x):
+        return x
+
+    rows = [{"a": i, "b": i} for i in range(1000)]
+    for _ in range(100):
+        assert ingest(rows, tag="x") == 1000
+        assert small(1) == 1
+    # 400 checks in total, one in 10 on average is timed
+    assert 20 < profiler.samples < 70
+
+    report = profiler.report()
+    assert [(r["function"], r["param"]) for r in report[:1]] == \
+        [("ingest", "rows")]
+    assert report[0]["type"] == "List[Dict[str, int]]"
+    assert report[0]["share"] > 0.5
+    assert abs(sum(r["share"] for r in report) - 1) < 1e-9
+    assert {r["param"] for r in report} <= {"rows", "tag", "x", "_return"}
+    assert len(profiler.report(top=2)) == 2
+    assert "`List[Dict[str, int]]` on `ingest(rows)`" in \
+        profiler.format_report().split("\n")[0]
+
+    # Failed checks still raise errors, and are not sampled
+    with pytest.raises(conf.TypeError):
+        ingest([{"a": "b"}])
+
+    profiler.reset()
+    assert profiler.report() == []
+    with pytest.raises(RuntimeError):
+        Profiler(interval=0)
+
+
+def test_profiler_shared():
+    profiler = Profiler(interval=1)
+    conf1 = typesentry.Config(profiler=profiler)
+    conf2 = typesentry.Config(profiler=profiler,
+                              call_sampling=CallSampling(streak=1))
+
+    @conf1.typed(a=int, args=str)
+    def foo(a, *args):
+        return a
+
+    @conf2.typed(kws=float)
+    def bar(**kws):
+        return kws
+
+    # The first call of each shape is not timed, and the second call of `bar`
+    # is skipped by the call sampling
+    for _ in range(2):
+        foo(1, "x", "y")
+    for _ in range(3):
+        bar(z=1.5)
+    report = profiler.report()
+    assert sorted((r["function"], r["param"], r["samples"])
+                  for r in report) == [("bar", "**kws", 1),
+                                       ("foo", "*args", 2), ("foo", "a", 1)]
+
+
+def test_profiler_times_actual_checks():
+    import gc
+    import weakref
+    profiler = Profiler(interval=1, seed=1)
+    conf = typesentry.Config(profiler=profiler)
+    calls = []
+
+    @conf.typed(x=int, y=str)
+    def foo(x, y="a"):
+        calls.append(x)
+        return x
+
+    foo(1)
+    foo(2, y="b")
+    assert foo(3) == 3
+    with pytest.raises(conf.TypeError):
+        foo("4")
+    with pytest.raises(conf.TypeError):
+        foo(5, y=6)
+    # The failed checks were the actual checks of the calls
+    assert calls == [1, 2, 3]
+    assert [(r["param"], r["samples"]) for r in profiler.report()
+            if r["param"] == "x"] == [("x", 1)]
+
+    # The profiler does not keep the functions alive
+    ref = weakref.ref(foo._signature_)
+    del foo
+    gc.collect()
+    assert ref() is None
+    assert profiler.report() == []
+
+
+def test_profiler_random_gaps():
+    profiler = Profiler(interval=10, seed=0)
+    gaps = [profiler._next_gap() for _ in range(1000)]
+    assert min(gaps) >= 1 and max(gaps) <= 19
+    assert len(set(gaps)) > 10
+    assert 9 < sum(gaps) / len(gaps) < 11
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+import pytest
+from tests import typesentry, is_type, name_type, py3only
+from typesentry import Sampled, Sampling
+
+
+def test_indices():
+    s = Sampling(head=2, tail=3, samples=4)
+    assert s.size == 9
+    assert list(s.indices(0)) == []
+    assert list(s.indices(9)) == list(range(9))
+    idx = list(s.indices(1000))
+    assert idx[:2] == [0, 1]
+    assert idx[-3:] == [997, 998, 999]
+    assert 4 <= len(idx) - 5 <= 5
+    assert idx == sorted(set(idx))
+    assert list(Sampling(1, 1, 0).indices(100)) == [0, 99]
+
+    r = Sampling(head=0, tail=0, samples=10, random=True)
+    seen = set()
+    for _ in range(200):
+        idx = list(r.indices(100))
+        assert len(idx) == 10
+        seen.update(idx)
+    assert len(seen) > 10
+
+    with pytest.raises(RuntimeError):
+        Sampling(head=-1)
+
+
+def test_sampled_types():
+    n = 10000
+    ints = list(range(n))
+    assert is_type(ints, Sampled([int]))
+    assert is_type(tuple(ints), Sampled((int, Ellipsis)))
+    assert is_type(set(ints), Sampled({int}))
+    assert is_type({str(i): i for i in ints}, Sampled({str: int}))
+    assert is_type([ints, ints], Sampled([[int]]))
+    assert is_type(ints, Sampled(typesentry.U([int], [str])))
+    assert not is_type("abc", Sampled([int]))
+    assert not is_type(["a"] * n, Sampled([int]))
+    assert name_type(Sampled([int])) == "List[int]"
+
+    # An element that is not in the sample goes unnoticed
+    bad = ints[:]
+    bad[n // 2 + 1] = "x"
+    assert not is_type(bad, [int])
+    assert is_type(bad, Sampled([int], Sampling(5, 5, 0)))
+    bad[-1] = "x"
+    assert not is_type(bad, Sampled([int], Sampling(5, 5, 0)))
+
+
+def test_config_sampling():
+    conf = typesentry.Config(sampling=Sampling(head=3, tail=3, samples=0))
+    typed = conf.typed
+
+    @typed(x=[int], y=int, z=[str])
+    def foo(x, y=0, z=None):
+        return True
+
+    lst = [0] * 100
+    lst[50] = "oops"
+    assert foo(lst, 1)
+    lst[-1] = "oops"
+    with pytest.raises(conf.TypeError) as e:
+        foo(lst)
+    assert str(e.value) == ("Parameter `x` of type `List[int]` received a list "
+                            "where 51st element is 'oops' of type str")
+    with pytest.raises(conf.TypeError):
+        foo([], "1")
+
+    # Explicitly declared sampling takes precedence
+    @typed(x=Sampled([int], Sampling(0, 0, 0)))
+    def bar(x):
+        return True
+
+    assert bar(["a", "b", "c", "d"])
+    assert bar._signature_.params[0].checker._sampling.size == 0
+
+
+@py3only
+def test_sampled_typing():
+    from typing import Dict, List, Tuple
+    t = Sampled(Dict[str, List[Tuple[int, str]]], Sampling(2, 2, 2))
+    assert is_type({"a": [(i, "x") for i in range(1000)]}, t)
+    assert not is_type({"a": [(0, 0)] * 1000}, t)
+
+
+def test_call_sampling():
+    from typesentry import CallSampling, MagicType
+
+    class Counted(MagicType):
+        count = 0
+
+        def check(self, v):
+            Counted.count += 1
+            return isinstance(v, int)
+
+    conf = typesentry.Config(
+        call_sampling=CallSampling(max_interval=8, streak=2, growth=2))
+
+    @conf.typed(x=Counted)
+    def foo(x):
+        return x
+
+    for i in range(100):
+        assert foo(i) == i
+    # Checks happened on calls 1, 2, 3, 5, 7, 11, 15, 23, 31, 39, ...
+    assert 12 < Counted.count < 30
+    state = foo._call_sampling_state_
+    assert state[1] == 8
+
+    # An unchecked call lets a bad argument through
+    while not state[0]:
+        foo(0)
+    assert foo("skipped") == "skipped"
+
+    # Once an error is detected, the function goes back to checking each call
+    with pytest.raises(conf.TypeError):
+        while True:
+            foo("bad")
+    assert state == [0, 1, 0]
+    Counted.count = 0
+    for i in range(2):
+        foo(i)
+    assert Counted.count == 2
+
+    with pytest.raises(RuntimeError):
+        CallSampling(max_interval=0)
+
+
+def test_call_sampling_compiled():
+    from typesentry import CallSampling
+    conf = typesentry.Config(compiled=True,
+                             call_sampling=CallSampling(streak=1))
+
+    @conf.typed(x=int)
+    def foo(x):
+        return x
+
+    # Call sampling takes precedence over the compiled wrappers
+    assert hasattr(foo, "_call_sampling_state_")
+    with pytest.raises(conf.TypeError):
+        foo("x")
+    for i in range(20):
+        foo(i)
+    assert foo._call_sampling_state_[1] > 1
+
+
+def test_call_sampling_retval():
+    from typesentry import CallSampling
+    conf = typesentry.Config(call_sampling=CallSampling(streak=1))
+
+    @conf.typed(_return=int)
+    def foo(x):
+        return x
+
+    assert foo(1) == 1
+    foo._call_sampling_state_[0] = 0
+    with pytest.raises(conf.TypeError) as e:
+        foo("one")
+    assert str(e.value) == ("Incorrect return type in `foo()`: expected int "
+                            "got str")
+    assert foo._call_sampling_state_ == [0, 1, 0]
@@ -263,3 +263,53 @@ def test_defaults():
         foo(x="")
     assert str(e.value) == ("Parameter `x` of type `int` received value '' "
                             "of type str")
+
+
+def test_call_plans():
+    @typed(x=int, args=str, kws=float)
+    def foo(x, y=None, *args, **kws):
+        return True
+
+    plans = foo._signature_._call_plans
+    assert foo(1, 2, "a", "b", z=1.5)
+    assert foo(1, 2, "c", "d", z=0)
+    assert foo(x=1, q=1.5, y=None)
+    assert foo(y=[], q=1.5, x=1)
+    assert len(plans) == 3
+    posplan, kwplan = plans[(4, ("z", ))]
+    assert [i for i, _, _ in posplan] == [0, 2, 3]
+    assert [name for name, _, _ in kwplan] == ["z"]
+
+    with pytest.raises(TTypeError) as e:
+        foo(1, 2, "c", 3, z=0)
+    assert str(e.value) == ("Vararg parameter of type `str` received "
+                            "value 3 of type int")
+    with pytest.raises(TTypeError) as e:
+        foo(x=1, q="1.5", y=None)
+    assert str(e.value) == ("Parameter `q` of type `float` received value "
+                            "'1.5' of type str")
+
+    # Invalid call shapes are never cached
+    with pytest.raises(TTypeError):
+        foo(1, x=2)
+    with pytest.raises(TTypeError):
+        foo(1, x=2)
+    assert len(plans) == 3
+
+
+def test_compact_layout():
+    import weakref
+    from typesentry import checker_for_type
+
+    @typed(x=int, y=[str], _return=bool)
+    def foo(x, y=None):
+        return True
+
+    sig = foo._signature_
+    assert isinstance(sig.params, tuple)
+    for obj in (sig, sig.params[0], sig.retval, checker_for_type([str]),
+                checker_for_type({"a": int})):
+        assert not hasattr(obj, "__dict__")
+    assert sig.params[0].type is sig.params[0].checker
+    chk = checker_for_type((int, str))
+    assert weakref.ref(chk)() is chk
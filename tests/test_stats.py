@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+import time
+import pytest
+from tests import typesentry
+from typesentry import CallSampling
+
+
+def test_stats():
+    conf = typesentry.Config(stats=True)
+
+    @conf.typed(x=int, y=[str], _return=int)
+    def foo(x, y=None):
+        time.sleep(0.01)
+        return x if y is None else len(y)
+
+    @conf.typed()
+    def bar():
+        pass
+
+    assert conf.stats() == {
+        __name__ + ".test_stats.<locals>.foo": {
+            "calls": 0, "checks": 0, "check_time": 0.0, "call_time": 0.0,
+            "failures": {}},
+        __name__ + ".test_stats.<locals>.bar": {
+            "calls": 0, "checks": 0, "check_time": 0.0, "call_time": 0.0,
+            "failures": {}},
+    }
+
+    for i in range(5):
+        assert foo(i) == i
+    for args, kws in [(("1", ), {}), ((1, ), {"y": [1]}), ((1, 2, 3), {}),
+                      ((1.5, ), {"y": 1}), ((None, ), {})]:
+        with pytest.raises(conf.TypeError):
+            foo(*args, **kws)
+
+    st = conf.stats()[__name__ + ".test_stats.<locals>.foo"]
+    assert st["calls"] == 5
+    assert st["checks"] == 10
+    assert st["failures"] == {"x": 3, "y": 1, "<call>": 1}
+    assert st["call_time"] >= 0.05
+    assert 0 < st["check_time"] < st["call_time"]
+
+    assert typesentry.Config().stats() == {}
+
+
+def test_stats_return_and_sampling():
+    conf = typesentry.Config(
+        stats=True, compiled=True,
+        call_sampling=CallSampling(max_interval=4, streak=1, growth=2))
+
+    @conf.typed(_return=int)
+    def foo(x):
+        return x
+
+    for i in range(20):
+        foo(i)
+    st = list(conf.stats().values())[0]
+    assert st["calls"] == 20
+    assert 5 < st["checks"] < 20
+
+    while foo._call_sampling_state_[0]:
+        foo(0)
+    with pytest.raises(conf.TypeError):
+        foo("zero")
+    assert list(conf.stats().values())[0]["failures"] == {"_return": 1}
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+import sys
+import types
+import pytest
+from tests import typesentry, is_type
+from typesentry import checker_for_type
+
+typing = pytest.importorskip("typing")
+TypedDict = getattr(typing, "TypedDict", None)
+needs_typeddict = pytest.mark.skipif(TypedDict is None,
+                                     reason="TypedDict requires Python 3.8+")
+needs_required = pytest.mark.skipif(sys.version_info < (3, 11),
+                                    reason="Required requires Python 3.11+")
+
+
+def test_required_keys():
+    spec = {"id": int, "name": str, "tags": [str]}
+    chk = typesentry.checks.MtDict1(spec, required=["id", "name"])
+    assert chk.check({"id": 1, "name": "x"})
+    assert chk.check({"id": 1, "name": "x", "tags": ["a"]})
+    assert not chk.check({"id": 1})
+    assert not chk.check({"id": 1, "name": "x", "other": 0})
+    assert not chk.check({"id": 1, "name": 2})
+    assert chk.get_error_msg("x", {"name": "x"}) == (
+        "x of type `{'id': int, 'name': str, 'tags': List[str]}` received "
+        "a dict without the required key 'id'")
+    assert 0 < chk.fuzzycheck({"name": "x"}) < 1
+    pred = chk.compile()
+    for value in [{"id": 1, "name": "x"}, {"id": 1}, {"id": 1, "name": 2},
+                  {"id": 1, "name": "x", "other": 0}, {}, [], None]:
+        assert pred(value) == chk.check(value)
+    with pytest.raises(RuntimeError):
+        typesentry.checks.MtDict1({"a": int}, required=["b"])
+
+
+def test_dict_literal_keys_are_optional():
+    assert is_type({}, {"spam": int, "egg": int})
+    assert not is_type({"ham": 1}, {"spam": int, "egg": int})
+    assert is_type({"ham": "1"}, {"spam": int, Ellipsis: str})
+    assert not is_type({"ham": 1}, {"spam": int, Ellipsis: str})
+
+
+@needs_typeddict
+def test_typeddict():
+    ns = {"TypedDict": TypedDict, "typing": typing}
+    exec("class Movie(TypedDict):\n"
+         "    title: str\n"
+         "    year: int\n"
+         "    cast: typing.List[str]\n"
+         "class Partial(TypedDict, total=False):\n"
+         "    title: str\n"
+         "    year: int\n", ns)
+    movie = checker_for_type(ns["Movie"])
+    assert movie.name() == "Movie"
+    assert movie.check({"title": "Up", "year": 2009, "cast": []})
+    assert not movie.check({"title": "Up", "year": 2009})
+    assert not movie.check({"title": "Up", "year": "2009", "cast": []})
+    assert not movie.check({"title": "Up", "year": 2009, "cast": [],
+                            "rating": 5})
+    assert checker_for_type(ns["Movie"]) is movie
+    partial = checker_for_type(ns["Partial"])
+    assert partial.check({}) and partial.check({"year": 2009})
+    assert not partial.check({"year": "2009"})
+
+    conf = typesentry.Config()
+
+    @conf.typed(m=ns["Movie"])
+    def foo(m):
+        return m["title"]
+
+    assert foo({"title": "Up", "year": 2009, "cast": ["Ed"]}) == "Up"
+    with pytest.raises(conf.TypeError) as e:
+        foo({"title": "Up", "cast": []})
+    assert "without the required key 'year'" in str(e.value)
+
+
+@needs_typeddict
+def test_typeddict_forward_refs():
+    mod = types.ModuleType("tests._typeddict_refs")
+    sys.modules[mod.__name__] = mod
+    exec("from typing import List, Optional, TypedDict\n"
+         "class Movie(TypedDict):\n"
+         "    title: 'str'\n"
+         "    sequel: 'Optional[Title]'\n"
+         "    studio: 'Studio'\n"
+         "class Title(TypedDict):\n"
+         "    title: str\n", mod.__dict__)
+    movie = checker_for_type(mod.Movie)
+    # `Studio` is not defined, so the values of that key are not checked
+    assert movie.check({"title": "Up", "sequel": None, "studio": 1})
+    assert movie.check({"title": "Up", "sequel": {"title": "Up 2"},
+                        "studio": "Pixar"})
+    assert not movie.check({"title": "Up", "sequel": {"title": 2},
+                            "studio": None})
+    assert not movie.check({"title": 1, "sequel": None, "studio": None})
+
+
+@needs_required
+def test_required_qualifiers():
+    ns = {"typing": typing}
+    exec("class Movie(typing.TypedDict):\n"
+         "    title: typing.Required[str]\n"
+         "    year: typing.NotRequired[int]\n"
+         "class Movie2(typing.TypedDict, total=False):\n"
+         "    title: typing.Required[str]\n"
+         "    year: int\n", ns)
+    for cls in (ns["Movie"], ns["Movie2"]):
+        chk = checker_for_type(cls)
+        assert chk.check({"title": "Up"})
+        assert chk.check({"title": "Up", "year": 2009})
+        assert not chk.check({"year": 2009})
+        assert not chk.check({"title": "Up", "year": "2009"})
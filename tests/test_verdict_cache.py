@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+import gc
+import pytest
+from tests import typesentry, MagicType
+from typesentry import checker_for_type
+from typesentry.checks import VerdictCache
+
+
+class Counted(MagicType):
+    count = 0
+
+    def check(self, v):
+        Counted.count += 1
+        return type(v) is int
+
+    def name(self):
+        return "Counted"
+
+
+def test_value_keyed():
+    cache = VerdictCache(maxsize=10)
+    chk = checker_for_type((Counted, Ellipsis))
+    Counted.count = 0
+    assert cache.check(chk, (1, 2, 3))
+    assert cache.check(chk, tuple([1, 2, 3]))
+    assert Counted.count == 3
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Equal tuples with elements of different types are not confused
+    assert not cache.check(chk, (1.0, 2, 3))
+    assert not cache.check(chk, (True, 2, 3))
+    assert len(cache) == 1
+
+    # Mutable containers are never cached
+    lst = [1, 2, 3]
+    assert cache.check(checker_for_type([Counted]), lst)
+    lst.append("four")
+    assert not cache.check(checker_for_type([Counted]), lst)
+    assert len(cache) == 1
+
+
+def test_identity_keyed():
+    cache = VerdictCache(maxsize=10)
+    chk = checker_for_type(((Counted, Counted), Ellipsis))
+    Counted.count = 0
+    value = tuple((i, i) for i in range(5))
+    assert cache.check(chk, value)
+    assert cache.check(chk, value)
+    assert Counted.count == 10
+    # An equal but distinct object is checked again
+    assert cache.check(chk, tuple((i, i) for i in range(5)))
+    assert Counted.count == 20
+
+    fchk = checker_for_type(frozenset)
+    fs = frozenset([1, 2])
+    n = len(cache)
+    assert cache.check(fchk, fs)
+    assert len(cache) == n + 1
+    del fs
+    gc.collect()
+    assert len(cache) == n
+
+
+def test_mutable_elements():
+    cache = VerdictCache(maxsize=10)
+    chk = checker_for_type(([int], Ellipsis))
+    t = ([1, 2], )
+    assert cache.check(chk, t)
+    t[0].append("bad")
+    assert not cache.check(chk, t)
+    assert len(cache) == 0
+
+    conf = typesentry.Config(verdict_cache=100)
+
+    @conf.typed(x=(([int], int), Ellipsis))
+    def foo(x):
+        return True
+
+    t = (([1], 2), )
+    assert foo(t)
+    t[0][0].append("bad")
+    with pytest.raises(conf.TypeError):
+        foo(t)
+
+    # Nested immutable containers are still cached by identity
+    nested = ((1, (2, frozenset([3]))), )
+    assert cache.check(checker_for_type(tuple), nested)
+    assert len(cache) == 1
+
+
+def test_lru():
+    cache = VerdictCache(maxsize=3)
+    chk = checker_for_type((int, Ellipsis))
+    for i in range(5):
+        assert cache.check(chk, (i, ))
+    assert len(cache) == 3
+    assert cache.check(chk, (4, ))
+    assert cache.hits == 1
+    assert cache.check(chk, (0, ))
+    assert cache.misses == 6
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_config():
+    conf = typesentry.Config(verdict_cache=100)
+
+    @conf.typed(x=(Counted, Ellipsis), y=int)
+    def foo(x, y=0):
+        return True
+
+    Counted.count = 0
+    data = tuple(range(1000))
+    for _ in range(10):
+        assert foo(data)
+    assert Counted.count == 1000
+    assert conf.verdict_cache.hits == 9
+    with pytest.raises(conf.TypeError) as e:
+        foo((1, "2"))
+    assert str(e.value) == ("Parameter `x` of type `Tuple[Counted, ...]` "
+                            "received a tuple where 2nd element is '2' of "
+                            "type str")
+    assert typesentry.Config().verdict_cache is None
@@ -5,8 +5,17 @@ from .checks import MagicType, checker_for_type
 from .checks import MtNot as Not
 from .checks import MtUnion as U
 from .checks import MtIntersection as I
-from .config import Config
+from .checks import MtSampled as Sampled
+from .checks import MtDeep as Deep
+from .checks import NDArray
+from .checks import MtFrame as Frame
+from .checks import MtSeries as Series
+from .checks import Sampling
+from .config import Config, CallSampling
+from .policy import Policy
+from .profiler import Profiler
 from .__version__ import version as __version__
 
 __all__ = ("checker_for_type", "Config", "MagicType", "U", "I", "Not",
-           "__version__")
+           "Deep", "Sampled", "Sampling", "CallSampling", "NDArray", "Frame",
+           "Series", "Policy", "Profiler", "__version__")
@@ -3,7 +3,9 @@
 from __future__ import division, print_function
 
 import sys
-import re
+import weakref
+from collections import OrderedDict
+from itertools import chain, count, islice
 
 
 PY2 = sys.version_info[0] == 2
@@ -20,6 +22,10 @@ else:
     _num_type = (int, float)
     _primitive_type = (str, int, float, bool, bytes)
 
+# Types of values that compare equal only to values of the same type, and
+# which are never distinguished by any checker when they are equal.
+_atomic_types = frozenset(_primitive_type + (type(None), ))
+
 try:
     import typing
     need_to_fix_typing = hasattr(typing.Union[str, int], "__union_params__")
@@ -27,9 +33,37 @@ except ImportError:  # pragma: no cover
     typing = None
     need_to_fix_typing = False
 
+try:
+    from collections.abc import Sequence as _abc_Sequence
+    from collections.abc import Sized as _abc_Sized
+    from collections.abc import Iterable as _abc_Iterable
+    from collections.abc import Iterator as _abc_Iterator
+    from collections.abc import Generator as _abc_Generator
+except ImportError:  # pragma: no cover
+    from collections import Sequence as _abc_Sequence
+    from collections import Sized as _abc_Sized
+    from collections import Iterable as _abc_Iterable
+    from collections import Iterator as _abc_Iterator
+    _abc_Generator = None
+
+# Abstract base classes for the (sync and async) iterator types, by the name
+# of the corresponding `typing` type
+_iterator_abcs = OrderedDict([
+    ("Iterator", _abc_Iterator),
+    ("Iterable", _abc_Iterable),
+    ("Generator", _abc_Generator),
+])
+try:
+    import collections.abc as _abc
+    _iterator_abcs["AsyncIterator"] = _abc.AsyncIterator
+    _iterator_abcs["AsyncIterable"] = _abc.AsyncIterable
+    _iterator_abcs["AsyncGenerator"] = _abc.AsyncGenerator
+except (ImportError, AttributeError):  # pragma: no cover
+    pass
+
 
 
-def checker_for_type(t):
+def checker_for_type(t, compiled=False):
     """
     Return "checker" function for the given type `t`.
 
@@ -40,27 +74,122 @@ def checker_for_type(t):
         chkr = checker_for_type(int)
         assert chkr.check(123) is True
         assert chkr.check("5") is False
+
+    If `compiled` is True, then instead of the checker object a plain predicate
+    function is returned, as produced by :meth:`MagicType.compile`:
+
+        is_int = checker_for_type(int, compiled=True)
+        assert is_int(123) is True
     """
+    if compiled:
+        return checker_for_type(t).compile()
+    key = t
     try:
         if t is True:
             return true_checker
         if t is False:
             return false_checker
-        checker = memoized_type_checkers.get(t)
-        if checker is not None:
-            return checker
-        hashable = True
+        if type(t) in _atomic_types and t is not None or \
+                type(t) is tuple and _has_literals(t):
+            # Literals that compare equal (such as 1 and 1.0) are different
+            # types, so they are memoized under a key that includes the type
+            key = _spec_key(t)
+        checker = memoized_type_checkers.get(key)
     except TypeError:
-        # Exception may be raised if `t` is not hashable (e.g. a dict)
-        hashable = False
-
-    # The type checker needs to be created
+        # Exception may be raised if `t` is not hashable (e.g. a dict), in
+        # which case we look it up by its canonical key
+        try:
+            key = _spec_key(t)
+            checker = memoized_type_checkers.get(key)
+        except TypeError:
+            key = checker = None
+    if checker is not None:
+        return checker
+
+    # The type checker needs to be created. Checkers compare structurally, so
+    # if an equal checker already exists, it is reused instead. Class checkers
+    # are not interned, since the table would then hold their classes.
     checker = _create_checker_for_type(t)
-    if hashable:
-        memoized_type_checkers[t] = checker
+    if not isinstance(checker, MtClass):
+        try:
+            checker = memoized_type_checkers.setdefault(checker, checker)
+        except TypeError:  # pragma: no cover
+            pass
+    if key is not None:
+        memoized_type_checkers[key] = checker
     return checker
 
 
+# Markers of the kinds of specs in the keys produced by `_spec_key()`
+_LITERAL_KEY = object()
+_LIST_KEY = object()
+_SET_KEY = object()
+_TUPLE_KEY = object()
+_DICT_KEY = object()
+
+
+def _spec_key(t):
+    """
+    Return key for the type specification `t` (such as a dict or list literal,
+    which cannot be hashed itself), so that equal specifications have equal
+    keys. The key is hashable, unless `t` contains values that are neither
+    hashable nor containers.
+    """
+    tt = type(t)
+    if tt in _atomic_types:
+        return (_LITERAL_KEY, tt, t)
+    if isinstance(t, dict):
+        return (_DICT_KEY, ) + tuple([_spec_key(x) for kv in t.items()
+                                      for x in kv])
+    if isinstance(t, list):
+        return (_LIST_KEY, ) + tuple([_spec_key(x) for x in t])
+    if isinstance(t, tuple):
+        return (_TUPLE_KEY, ) + tuple([_spec_key(x) for x in t])
+    if isinstance(t, set):
+        return (_SET_KEY, frozenset([_spec_key(x) for x in t]))
+    return t
+
+
+def _resolve_annotation(t, globalns, localns=None):
+    """
+    Return the type annotation `t` with its forward references (i.e. types
+    given as strings, such as with ``from __future__ import annotations``)
+    resolved in the namespaces `globalns` / `localns`; or None if they cannot
+    be resolved. Annotations without forward references are returned as is.
+    """
+    if not _has_forward_refs(t):
+        return t
+    if typing is None:  # pragma: no cover
+        return None
+
+    def holder():
+        pass
+
+    holder.__annotations__ = {"t": t}
+    try:
+        return typing.get_type_hints(holder, globalns, localns)["t"]
+    except (NameError, TypeError, AttributeError, SyntaxError):
+        return None
+
+
+def _has_forward_refs(t):
+    if isinstance(t, str) or _ForwardRef and isinstance(t, _ForwardRef):
+        return True
+    args = getattr(t, "__args__", None)
+    return (isinstance(args, tuple) and not isinstance(t, MagicType) and
+            any(_has_forward_refs(a) for a in args))
+
+
+_ForwardRef = typing and (getattr(typing, "ForwardRef", None) or
+                          getattr(typing, "_ForwardRef", None))
+
+
+def _has_literals(t):
+    """Return True if tuple `t` contains literals, possibly in nested tuples."""
+    return any(type(x) in _atomic_types and x is not None or
+               type(x) is tuple and _has_literals(x) for x in t)
+
+
 def _create_checker_for_type(t):
     if need_to_fix_typing:
         if hasattr(t, "__union_params__"):
@@ -85,6 +214,8 @@ def _create_checker_for_type(t):
         if typing:
             if t is typing.Any:  # under Py3.5 only
                 return MtAny()
+            if _is_typeddict(t):
+                return _typeddict_checker(t)
             if type(t) is type(typing.Union):  # under Py3.5 only
                 return MtUnion(*t.__args__)
             if issubclass(t, typing.List) and t is not list:
@@ -113,6 +244,15 @@ def _create_checker_for_type(t):
                     return MtSet(itemtype)
                 else:
                     return MtClass(set, name="Set")
+            if t is typing.Sequence or \
+                    getattr(t, "__origin__", None) is typing.Sequence:
+                itemtype = t.__args__ and t.__args__[0]
+                return MtSequence(itemtype or typing.Any)
+            for kind in _iterator_abcs:
+                abc = getattr(typing, kind, None)
+                if abc and (t is abc or
+                            getattr(t, "__origin__", None) is abc):
+                    return MtIterator(*(t.__args__ or ()), kind=kind)
             if issubclass(t, typing.Callable) and \
                     str(t).startswith("typing.Callable"):
                 return MtCallable(t.__args__)
@@ -146,6 +286,11 @@ def _create_checker_for_type(t):
                 return MtClass(type, name="Type")
             if t is typing.Callable:
                 return MtCallable(None)
+            if t is typing.Sequence:
+                return MtSequence(typing.Any)
+            for kind in _iterator_abcs:
+                if t is getattr(typing, kind, None):
+                    return MtIterator(kind=kind)
             if t.__origin__ is typing.Union:
                 return MtUnion(*t.__args__)
             if t.__origin__ is list:
@@ -179,6 +324,11 @@ def _create_checker_for_type(t):
                     return MtType(itemtype)
             if t.__origin__ is typing.Callable.__origin__:
                 return MtCallable(t.__args__)
+            if t.__origin__ is _abc_Sequence:
+                return MtSequence(t.__args__[0])
+            for kind, abc in _iterator_abcs.items():
+                if t.__origin__ is abc:
+                    return MtIterator(*t.__args__, kind=kind)
     if isinstance(t, list):
         # `t` is a list literal, such as [int, str]
         assert len(t)
@@ -207,6 +357,7 @@ def _create_checker_for_type(t):
 
 class MagicType(object):
     """Base class for all "special" types."""
+    __slots__ = ("_compiled", "_hash", "__weakref__")
 
     def check(self, var):
         """
@@ -256,17 +407,155 @@ class MagicType(object):
         return ("%s of type `%s` received value %s"
                 % (paramname, self.name(), _prepare_value(value)))
 
+    def exact_types(self):
+        """
+        Return the set of types whose instances always match this type.
+
+        This allows the containers to verify their elements in bulk: if the
+        (exact) type of each element is in this set, then all elements match
+        without calling :meth:`check` on each of them. The default
+        implementation returns an empty set.
+        """
+        return frozenset()
+
+    def _structure(self):
+        """
+        Return a hashable value describing this type: two checkers of the same
+        class with equal structures are interchangeable. Checkers compare and
+        hash by this value, which allows equal types to share a single
+        checker instance (see :func:`checker_for_type`).
+
+        The default implementation returns None, meaning that the checker is
+        equal only to itself. Subclasses whose behavior is fully determined by
+        their constructor's arguments should override this method.
+        """
+        return None
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if type(self) is not type(other):
+            return False
+        s = self._structure()
+        return s is not None and s == other._structure()
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        # Checkers are immutable, so the hash is computed only once
+        h = getattr(self, "_hash", None)
+        if h is None:
+            s = self._structure()
+            if s is None:
+                h = object.__hash__(self)
+            else:
+                try:
+                    h = hash((type(self), s))
+                except TypeError:
+                    h = hash(type(self))
+            self._hash = h
+        return h
+
+    def check_sampled(self, var, sampling):
+        """
+        Similar to :meth:`check`, except that for containers only a subset of
+        elements selected by the `sampling` policy is verified (see
+        :class:`Sampling`). Thus this method may return True for a value that
+        does not actually match the type, but it never returns False for a
+        value that does.
+
+        The default implementation falls back to :meth:`check`.
+        """
+        return self.check(var)
+
+    def streams(self):
+        """
+        Return True if this type checks some values lazily, i.e. the values
+        passed to :meth:`check` need to be wrapped with :meth:`stream`.
+        """
+        return False
+
+    def stream(self, value, fail, sampling=None):
+        """
+        Return `value`, possibly wrapped into a proxy object that verifies the
+        parts of the value that :meth:`check` could not verify without
+        consuming it (such as the items produced by an iterator).
+
+        :param value: the value that has already passed :meth:`check`.
+        :param fail: function ``fail(checker, index, item)`` that will be
+            called (and is expected to raise an exception) when the `index`-th
+            item produced by the proxy does not match the `checker`'s type.
+        :param sampling: if given, then only the items selected by this
+            :class:`Sampling` policy will be checked.
+
+        The default implementation returns `value` unchanged.
+        """
+        return value
+
+    def compile(self):
+        """
+        Return a predicate function equivalent to :meth:`check`.
+
+        The predicate is generated from Python source which inlines the checks
+        for the entire tree of checkers rooted at this type: the loops over the
+        elements of the containers and the tests for the primitive types are
+        written out directly, instead of being dispatched through the
+        ``.check()`` methods of the child checkers. The generated source is
+        available as the ``.source`` attribute of the returned function.
+
+        The result is cached, so repeated calls return the same function.
+        """
+        fn = getattr(self, "_compiled", None)
+        if fn is None:
+            fn = _CheckerCompiler().compile(self)
+            self._compiled = fn
+        return fn
+
+    def _gen_expr(self, g, var):
+        """
+        Return Python expression (as a string) that evaluates to True iff
+        variable named `var` matches this type. This is used by
+        :meth:`compile`, and may be overridden in subclasses. The default
+        implementation calls method :meth:`check` of this object.
+
+        :param g: the :class:`_CheckerCompiler` object.
+        :param var: name of the variable being checked.
+        """
+        return "%s(%s)" % (g.ref(self.check), var)
+
+    def _gen_stmts(self, g, var):
+        """
+        Emit (via ``g.emit()``) statements that ``return False`` if the
+        variable named `var` does not match this type. The default
+        implementation tests the expression from :meth:`_gen_expr`.
+        """
+        g.emit("if not %s: return False" % g.expr(self, var))
+
 
 
 class MtAny(MagicType):
+    __slots__ = ()
+
     def check(self, v):
         return True
 
+    def _structure(self):
+        return ()
+
     def name(self):
         return "Any"
 
+    def _gen_expr(self, g, var):
+        return "True"
+
+    def _gen_stmts(self, g, var):
+        pass
+
 
 class MtClass(MagicType):
+    __slots__ = ("_cls", "_name")
+
     def __init__(self, cls, name=None):
         self._cls = cls
         self._name = name or cls.__name__
@@ -274,9 +563,18 @@ class MtClass(MagicType):
     def check(self, v):
         return isinstance(v, self._cls)
 
+    def _structure(self):
+        return (self._cls, self._name)
+
     def name(self):
         return self._name
 
+    def exact_types(self):
+        return frozenset([self._cls])
+
+    def _gen_expr(self, g, var):
+        return "isinstance(%s, %s)" % (var, g.ref(self._cls))
+
 
 # ------------------------------------------------------------------------------
 #
@@ -284,60 +582,128 @@ class MtClass(MagicType):
 # ------------------------------------------------------------------------------
 
 class MtNone(MagicType):
+    __slots__ = ()
+
     def check(self, v):
         return v is None
 
+    def _structure(self):
+        return ()
+
     def name(self):
         return "None"
 
+    def exact_types(self):
+        return frozenset([type(None)])
+
+    def _gen_expr(self, g, var):
+        return "(%s is None)" % var
+
 
 class MtBool(MagicType):
+    __slots__ = ()
+
     def check(self, v):
         return v is True or v is False
 
+    def _structure(self):
+        return ()
+
     def name(self):
         return "bool"
 
+    def exact_types(self):
+        return frozenset([bool])
+
+    def _gen_expr(self, g, var):
+        return "(%s is True or %s is False)" % (var, var)
+
 
 class MtInt(MagicType):
+    __slots__ = ()
+
     def check(self, v):
         return isinstance(v, _int_type) and v is not True and v is not False
 
+    def _structure(self):
+        return ()
+
     def name(self):
         return "int"
 
+    def exact_types(self):
+        return frozenset(_int_type if PY2 else [int])
+
+    def _gen_expr(self, g, var):
+        return ("(type({0}) is int or isinstance({0}, {1}) and "
+                "{0} is not True and {0} is not False)"
+                .format(var, g.ref(_int_type)))
+
 
 class MtFloat(MagicType):
     """
     Float type has the semantic of "numeric", i.e. it maches both floats and
     integers (see PEP-0484).
     """
+    __slots__ = ()
+
     def check(self, v):
         return isinstance(v, _num_type) and not isinstance(v, bool)
 
+    def _structure(self):
+        return ()
+
     def name(self):
         return "float"
 
+    def exact_types(self):
+        return frozenset(_num_type)
+
+    def _gen_expr(self, g, var):
+        return ("(type({0}) is float or type({0}) is int or "
+                "isinstance({0}, {1}) and not isinstance({0}, bool))"
+                .format(var, g.ref(_num_type)))
+
 
 class MtStr(MagicType):
     """
     On Python2 we treat both `str` and `unicode` as matching this type; on
     Python3 only `str` (not `bytes`) match this type.
     """
+    __slots__ = ()
+
     def check(self, v):
         return isinstance(v, _str_type)
 
+    def _structure(self):
+        return ()
+
     def name(self):
         return "str"
 
+    def exact_types(self):
+        return frozenset(_str_type if PY2 else [str])
+
+    def _gen_expr(self, g, var):
+        return ("(type({0}) is str or isinstance({0}, {1}))"
+                .format(var, g.ref(_str_type)))
+
 
 class MtLiteral(MagicType):
+    __slots__ = ("literal", )
+
     def __init__(self, literal):
         self.literal = literal
 
     def check(self, v):
         return v == self.literal
 
+    def _gen_expr(self, g, var):
+        return "(%s == %s)" % (var, g.ref(self.literal))
+
+    def _structure(self):
+        return (type(self.literal), self.literal)
+
     def name(self):
         if isinstance(self.literal, _str_type):
             s = repr(self.literal)
@@ -363,17 +729,34 @@ class MtList(MagicType):
     This type constructs special error message in the case it is matched against
     a list where some of the elements are `T` while others are not `T`.
     """
+    __slots__ = ("_elem", "_elem_types")
 
     def __init__(self, elem_type):
         self._elem = checker_for_type(elem_type)
+        self._elem_types = _exact_types(self._elem)
 
     def check(self, v):
-        c = self._elem
-        return isinstance(v, list) and all(c.check(x) for x in v)
+        return isinstance(v, list) and \
+            _all_match(self._elem, self._elem_types, v)
+
+    def check_sampled(self, v, sampling):
+        chk = self._elem.check_sampled
+        return isinstance(v, list) and all(chk(v[i], sampling)
+                                           for i in sampling.indices(len(v)))
+
+    def _structure(self):
+        return (self._elem, )
 
     def name(self):
         return "List[%s]" % self._elem.name()
 
+    def _gen_expr(self, g, var):
+        return g.call(self, var)
+
+    def _gen_stmts(self, g, var):
+        g.emit("if not isinstance(%s, list): return False" % var)
+        g.loop(self._elem, var)
+
     def fuzzycheck(self, value):
         if not isinstance(value, list):
             return 0
@@ -383,8 +766,9 @@ class MtList(MagicType):
     def get_error_msg(self, paramname, value):
         if isinstance(value, list):
             elemchecker = self._elem.check
+            exact = self._elem_types
             for i, x in enumerate(value):
-                if not elemchecker(x):
+                if type(x) not in exact and not elemchecker(x):
                     nth = _nth_str(i + 1)
                     sval = _prepare_value(x)
                     return ("%s of type `%s` received a list where %s element "
@@ -394,16 +778,34 @@ class MtList(MagicType):
 
 
 class MtSet(MagicType):
+    __slots__ = ("_elem", "_elem_types")
+
     def __init__(self, elem_type):
         self._elem = checker_for_type(elem_type)
+        self._elem_types = _exact_types(self._elem)
 
     def check(self, v):
-        chk = self._elem.check
-        return isinstance(v, set) and all(chk(x) for x in v)
+        return isinstance(v, set) and \
+            _all_match(self._elem, self._elem_types, v)
+
+    def check_sampled(self, v, sampling):
+        chk = self._elem.check_sampled
+        return isinstance(v, set) and all(chk(x, sampling)
+                                          for x in islice(v, sampling.size))
+
+    def _structure(self):
+        return (self._elem, )
 
     def name(self):
         return "Set[%s]" % self._elem.name()
 
+    def _gen_expr(self, g, var):
+        return g.call(self, var)
+
+    def _gen_stmts(self, g, var):
+        g.emit("if not isinstance(%s, set): return False" % var)
+        g.loop(self._elem, var)
+
     def fuzzycheck(self, value):
         if not isinstance(value, set):
             return 0
@@ -413,8 +815,9 @@ class MtSet(MagicType):
     def get_error_msg(self, paramname, value):
         if isinstance(value, set):
             elemchecker = self._elem.check
+            exact = self._elem_types
             for x in value:
-                if not elemchecker(x):
+                if type(x) not in exact and not elemchecker(x):
                     sval = _prepare_value(x)
                     return ("%s of type `%s` received set containing an "
                             "element %s" % (paramname, self.name(), sval))
@@ -428,6 +831,7 @@ class MtTuple1(MagicType):
     number of entries). For a tuple with variable number of entries, see
     :class:`MtTuple0`.
     """
+    __slots__ = ("_checks", )
 
     def __init__(self, *items):
         self._checks = [checker_for_type(t) for t in items]
@@ -437,6 +841,12 @@ class MtTuple1(MagicType):
                 len(v) == len(self._checks) and
                 all(c.check(v[i]) for i, c in enumerate(self._checks)))
 
+    def check_sampled(self, v, sampling):
+        return (isinstance(v, tuple) and
+                len(v) == len(self._checks) and
+                all(c.check_sampled(v[i], sampling)
+                    for i, c in enumerate(self._checks)))
+
     def fuzzycheck(self, value):
         if not isinstance(value, tuple):
             return 0
@@ -445,9 +855,24 @@ class MtTuple1(MagicType):
         return sum(self._checks[i].fuzzycheck(value[i])
                    for i in range(minlen)) / maxlen
 
+    def _structure(self):
+        return tuple(self._checks)
+
     def name(self):
         return "Tuple[%s]" % ", ".join(ch.name() for ch in self._checks)
 
+    def _gen_expr(self, g, var):
+        return g.call(self, var)
+
+    def _gen_stmts(self, g, var):
+        g.emit("if not isinstance(%s, tuple) or len(%s) != %d: return False"
+               % (var, var, len(self._checks)))
+        for i, chk in enumerate(self._checks):
+            if not isinstance(chk, MtAny):
+                x = g.newvar()
+                g.emit("%s = %s[%d]" % (x, var, i))
+                g.stmts(chk, x)
+
     def get_error_msg(self, paramname, value):
         if isinstance(value, tuple):
             if len(value) != len(self._checks):
@@ -472,17 +897,34 @@ class MtTuple0(MagicType):
     This type constructs special error message in the case it is matched against
     a tuple where some of the elements are `T` while others are not `T`.
     """
+    __slots__ = ("_elem", "_elem_types")
 
     def __init__(self, elem_type):
         self._elem = checker_for_type(elem_type)
+        self._elem_types = _exact_types(self._elem)
 
     def check(self, v):
-        c = self._elem
-        return isinstance(v, tuple) and all(c.check(x) for x in v)
+        return isinstance(v, tuple) and \
+            _all_match(self._elem, self._elem_types, v)
+
+    def check_sampled(self, v, sampling):
+        chk = self._elem.check_sampled
+        return isinstance(v, tuple) and all(chk(v[i], sampling)
+                                            for i in sampling.indices(len(v)))
+
+    def _structure(self):
+        return (self._elem, )
 
     def name(self):
         return "Tuple[%s, ...]" % self._elem.name()
 
+    def _gen_expr(self, g, var):
+        return g.call(self, var)
+
+    def _gen_stmts(self, g, var):
+        g.emit("if not isinstance(%s, tuple): return False" % var)
+        g.loop(self._elem, var)
+
     def fuzzycheck(self, value):
         if not isinstance(value, tuple):
             return 0
@@ -492,9 +934,10 @@ class MtTuple0(MagicType):
     def get_error_msg(self, paramname, value):
         if isinstance(value, tuple):
             elemchecker = self._elem.check
+            exact = self._elem_types
             ibad = -1
             for i, x in enumerate(value):
-                if not elemchecker(x):
+                if type(x) not in exact and not elemchecker(x):
                     ibad = i + 1
                     break
             nth = _nth_str(ibad)
@@ -511,11 +954,24 @@ class MtDict1(MagicType):
     MagicType corresponding to type declaration `{k1: v1, ..., kn: vn}`. Here
     keys must be string literals (additionally, key `...` is also accepted,
     which matches any key other than those given explicitly).
+
+    The keys listed in `required` must be present in the dict; the other keys
+    are optional. This class is also used for the ``TypedDict`` classes from
+    the typing module (see :func:`_typeddict_checker`), in which case `name`
+    is the name of the class.
+
+    The set of keys of a dict is validated with a single set operation, after
+    which the values are checked with the checkers of their keys. The sampled
+    check verifies the values of all declared keys (with the sampled checks of
+    their types), but only the first ``sampling.size`` items for key ``...``.
     """
+    __slots__ = ("_checks", "_anycheck", "_required", "_keys", "_plan",
+                 "_name")
 
-    def __init__(self, kvs):
+    def __init__(self, kvs, required=(), name=None):
         self._checks = {}
         self._anycheck = None
+        self._name = name
         for k, v in kvs.items():
             if k is Ellipsis:
                 self._anycheck = checker_for_type(v)
@@ -524,12 +980,51 @@ class MtDict1(MagicType):
                 raise RuntimeError("Keys in the dict literal must be string "
                                    "constants: %r" % kvs)
             self._checks[k] = checker_for_type(v)
+        self._keys = frozenset(self._checks)
+        self._required = frozenset(required)
+        if not self._required <= self._keys:
+            raise RuntimeError("Required keys %r are not declared"
+                               % sorted(self._required - self._keys))
+        # For each key: the exact types of its values, and the check method
+        self._plan = {k: (_exact_types(c), c.check)
+                      for k, c in self._checks.items()}
 
     def check(self, value):
-        return (isinstance(value, dict) and
-                all(k in self._checks and self._checks[k].check(v) or
-                    self._anycheck and self._anycheck.check(v)
-                    for k, v in value.items()))
+        if not isinstance(value, dict):
+            return False
+        if self._required and not self._required.issubset(value):
+            return False
+        plan = self._plan
+        if self._anycheck is None:
+            if not self._keys.issuperset(value):
+                return False
+            for k, v in value.items():
+                exact, check = plan[k]
+                if type(v) not in exact and not check(v):
+                    return False
+            return True
+        anycheck = self._anycheck.check
+        for k, v in value.items():
+            p = plan.get(k)
+            if p is None or type(v) not in p[0] and not p[1](v):
+                if not anycheck(v):
+                    return False
+        return True
+
+    def check_sampled(self, value, sampling):
+        if not isinstance(value, dict):
+            return False
+        if self._required and not self._required.issubset(value):
+            return False
+        checks = self._checks
+        for k, checker in checks.items():
+            if k in value and not checker.check_sampled(value[k], sampling):
+                return False
+        if self._anycheck is None:
+            return self._keys.issuperset(value)
+        anycheck = self._anycheck.check_sampled
+        return all(k in checks or anycheck(v, sampling)
+                   for k, v in islice(value.items(), sampling.size))
 
     def fuzzycheck(self, value):
         if not isinstance(value, dict):
@@ -539,17 +1034,53 @@ class MtDict1(MagicType):
             checker = self._checks.get(k, self._anycheck)
             if checker:
                 total += checker.fuzzycheck(v)
-        return total / len(value)
+        # Each missing required key counts as a mismatching item
+        n = len(value) + len(self._required.difference(value))
+        return total / n if n else 1
+
+    def _structure(self):
+        return (tuple(self._checks.items()), self._anycheck, self._required,
+                self._name)
 
     def name(self):
+        if self._name:
+            return self._name
         fields0 = ", ".join("%r: %s" % (k, v.name())
                             for k, v in self._checks.items())
         if self._anycheck:
             fields0 += ", ...: %s" % self._anycheck.name()
         return "{%s}" % fields0
 
+    def _gen_expr(self, g, var):
+        return g.call(self, var)
+
+    def _gen_stmts(self, g, var):
+        g.emit("if not isinstance(%s, dict): return False" % var)
+        if self._required:
+            g.emit("if not %s.issubset(%s): return False"
+                   % (g.ref(self._required), var))
+        preds = g.ref({k: c.compile() for k, c in self._checks.items()})
+        k, x, p = g.newvar(), g.newvar(), g.newvar()
+        if self._anycheck is None:
+            g.emit("if not %s.issuperset(%s): return False"
+                   % (g.ref(self._keys), var))
+            g.emit("for %s, %s in %s.items():" % (k, x, var))
+            g.indent += 1
+            g.emit("if not %s[%s](%s): return False" % (preds, k, x))
+        else:
+            g.emit("for %s, %s in %s.items():" % (k, x, var))
+            g.indent += 1
+            g.emit("%s = %s.get(%s)" % (p, preds, k))
+            g.emit("if (%s is None or not %s(%s)) and not %s: return False"
+                   % (p, p, x, g.expr(self._anycheck, x)))
+        g.indent -= 1
+
     def get_error_msg(self, paramname, value):
         if isinstance(value, dict):
+            for k in self._checks:
+                if k in self._required and k not in value:
+                    return ("%s of type `%s` received a dict without the "
+                            "required key %r" % (paramname, self.name(), k))
             for k, v in value.items():
                 checker = self._checks.get(k, self._anycheck)
                 if checker:
@@ -567,6 +1098,44 @@ class MtDict1(MagicType):
             return super(MtDict1, self).get_error_msg(paramname, value)
 
 
+def _is_typeddict(t):
+    """Return True if class `t` was created with ``TypedDict``."""
+    return (issubclass(t, dict) and hasattr(t, "__total__") and
+            isinstance(getattr(t, "__annotations__", None), dict))
+
+
+def _typeddict_checker(t):
+    """
+    Create checker for the ``TypedDict`` class `t` (either from the typing
+    module, or from typing_extensions).
+
+    The required keys are taken from ``__required_keys__`` (which accounts for
+    the ``total=`` parameter and the ``Required[]`` / ``NotRequired[]``
+    qualifiers). Older versions of the typing module lack this attribute, in
+    which case all keys are required if the class is total.
+
+    The values of the keys whose annotations cannot be resolved (see
+    :func:`_resolve_annotation`) are not checked.
+    """
+    module = sys.modules.get(t.__module__)
+    globalns = getattr(module, "__dict__", {})
+    localns = {t.__name__: t}
+    fields = {}
+    for k, v in t.__annotations__.items():
+        v = _resolve_annotation(v, globalns, localns)
+        if v is None:
+            v = typing.Any
+        # `Required[T]` and `NotRequired[T]` are not types themselves
+        while getattr(getattr(v, "__origin__", None), "_name", None) in \
+                ("Required", "NotRequired"):
+            v = v.__args__[0]
+        fields[k] = v
+    required = getattr(t, "__required_keys__", None)
+    if required is None:
+        required = fields if t.__total__ else ()
+    return MtDict1(fields, required=required, name=t.__name__)
+
+
 
 class MtDict0(MagicType):
     """
@@ -576,16 +1145,25 @@ class MtDict0(MagicType):
     values, but does not allow different types for values depending on the type
     of the key.
     """
+    __slots__ = ("_key", "_val", "_key_types", "_val_types")
 
     def __init__(self, key, val):
         self._key = checker_for_type(key)
         self._val = checker_for_type(val)
+        self._key_types = _exact_types(self._key)
+        self._val_types = _exact_types(self._val)
 
     def check(self, value):
-        kchk = self._key.check
-        vchk = self._val.check
         return (isinstance(value, dict) and
-                all(kchk(k) and vchk(v) for k, v in value.items()))
+                _all_match(self._key, self._key_types, value) and
+                _all_match(self._val, self._val_types, value.values()))
+
+    def check_sampled(self, value, sampling):
+        kchk = self._key.check_sampled
+        vchk = self._val.check_sampled
+        return (isinstance(value, dict) and
+                all(kchk(k, sampling) and vchk(v, sampling)
+                    for k, v in islice(value.items(), sampling.size)))
 
     def fuzzycheck(self, value):
         if not isinstance(value, dict):
@@ -594,9 +1172,31 @@ class MtDict0(MagicType):
         vchk = self._val.fuzzycheck
         return sum(kchk(k) * vchk(v) for k, v in value.items()) / len(value)
 
+    def _structure(self):
+        return (self._key, self._val)
+
     def name(self):
         return "Dict[%s, %s]" % (self._key.name(), self._val.name())
 
+    def _gen_expr(self, g, var):
+        return g.call(self, var)
+
+    def _gen_stmts(self, g, var):
+        g.emit("if not isinstance(%s, dict): return False" % var)
+        anykey = isinstance(self._key, MtAny)
+        anyval = isinstance(self._val, MtAny)
+        if anykey:
+            g.loop(self._val, var + ".values()")
+        elif anyval:
+            g.loop(self._key, var)
+        else:
+            k, x = g.newvar(), g.newvar()
+            g.emit("for %s, %s in %s.items():" % (k, x, var))
+            g.indent += 1
+            g.stmts(self._key, k)
+            g.stmts(self._val, x)
+            g.indent -= 1
+
     def get_error_msg(self, paramname, value):
         if isinstance(value, dict):
             kchk = self._key.check
@@ -615,6 +1215,7 @@ class MtDict0(MagicType):
 
 
 class MtType(MagicType):
+    __slots__ = ("_cls", )
 
     def __init__(self, cls):
         assert isinstance(cls, type)
@@ -623,9 +1224,16 @@ class MtType(MagicType):
     def check(self, val):
         return isinstance(val, type) and issubclass(val, self._cls)
 
+    def _structure(self):
+        return (self._cls, )
+
     def name(self):
         return "Type[%s]" % self._cls.__name__
 
+    def _gen_expr(self, g, var):
+        return ("(isinstance({0}, type) and issubclass({0}, {1}))"
+                .format(var, g.ref(self._cls)))
+
     def get_error_msg(self, paramname, value):
         if isinstance(value, type):
             return ("%s of type `%s` received class %s which is not a subclass "
@@ -637,6 +1245,8 @@ class MtType(MagicType):
 
 
 class MtCallable(MagicType):
+    __slots__ = ("_args", )
+
     def __init__(self, args):
         self._args = args
 
@@ -646,6 +1256,9 @@ class MtCallable(MagicType):
                                   len(self._args) - 1 ==
                                   val.__code__.co_argcount)
 
+    def _structure(self):
+        return (self._args, )
+
     def name(self):
         if self._args is None:
             return "Callable"
@@ -658,6 +1271,887 @@ class MtCallable(MagicType):
 
 
 
+class MtSequence(MagicType):
+    """
+    MagicType corresponding to `Sequence[T]`.
+
+    Any sequence (list, tuple, string, or other object implementing the
+    ``Sequence`` protocol) whose elements are `T` matches this type. In
+    addition, NumPy arrays are accepted based on their dtype and number of
+    dimensions, without examining the data: for example a 1-dimensional array
+    of dtype ``float32`` matches ``Sequence[float]``, and a 2-dimensional
+    array of integers matches ``Sequence[Sequence[int]]``.
+    """
+    __slots__ = ("_elem", "_elem_types")
+
+    def __init__(self, elem_type):
+        self._elem = checker_for_type(elem_type)
+        self._elem_types = _exact_types(self._elem)
+
+    def check(self, v):
+        if isinstance(v, _abc_Sequence):
+            return _all_match(self._elem, self._elem_types, v)
+        return _is_ndarray(v) and self._check_array(v)
+
+    def check_sampled(self, v, sampling):
+        if isinstance(v, _abc_Sequence):
+            chk = self._elem.check_sampled
+            return all(chk(v[i], sampling) for i in sampling.indices(len(v)))
+        return _is_ndarray(v) and self._check_array(v)
+
+    def _structure(self):
+        return (self._elem, )
+
+    def name(self):
+        if isinstance(self._elem, MtAny):
+            return "Sequence"
+        return "Sequence[%s]" % self._elem.name()
+
+    def fuzzycheck(self, value):
+        if not isinstance(value, _abc_Sequence) or not value:
+            return self.check(value)
+        chk = self._elem.fuzzycheck
+        return sum(chk(x) for x in value) / len(value)
+
+    def get_error_msg(self, paramname, value):
+        if isinstance(value, _abc_Sequence):
+            elemchecker = self._elem.check
+            for i, x in enumerate(value):
+                if not elemchecker(x):
+                    nth = _nth_str(i + 1)
+                    sval = _prepare_value(x)
+                    return ("%s of type `%s` received a sequence where %s "
+                            "element is %s" % (paramname, self.name(), nth,
+                                               sval))
+        if _is_ndarray(value):
+            return ("%s of type `%s` received an array of dtype %s and shape "
+                    "%r" % (paramname, self.name(), value.dtype, value.shape))
+        return MagicType.get_error_msg(self, paramname, value)
+
+    def _check_array(self, arr):
+        depth = 1
+        elem = self._elem
+        while isinstance(elem, MtSequence):
+            elem = elem._elem
+            depth += 1
+        if isinstance(elem, MtAny):
+            return arr.ndim >= depth
+        if arr.ndim != depth:
+            return False
+        if arr.dtype.kind == "O":
+            return all(elem.check(x) for x in arr)
+        kinds = _dtype_kinds.get(type(elem))
+        return kinds is not None and arr.dtype.kind in kinds
+
+
+
+class MtIterator(MagicType):
+    """
+    MagicType corresponding to `Iterator[T]`, `Iterable[T]` and
+    `Generator[T, S, R]`.
+
+    An iterator cannot be checked without consuming it, therefore
+    :meth:`check` only verifies that the value is an iterator. When such value
+    is passed to (or returned from) a typed function, it is replaced with a
+    proxy that checks each item lazily as it is consumed (see :meth:`stream`),
+    so the stream never has to be materialized in memory. A type error is
+    raised from the ``next()`` call that produced the offending item.
+
+    For `Iterable[T]`, the values that are not iterators but have a length
+    (lists, tuples, sets, etc.) are checked eagerly, the same way as
+    `List[T]`. Other iterables are accepted without checking their items,
+    since replacing them with a proxy would make them single-use.
+
+    For `Generator[T, S, R]` only the yielded values are checked.
+
+    The async counterparts `AsyncIterator[T]`, `AsyncIterable[T]` and
+    `AsyncGenerator[T, S]` are also represented by this class. Their
+    :meth:`check` verifies only the type of the value itself; the items
+    yielded by an ``async def`` generator function declared with such return
+    type are verified by the function's async wrapper (see
+    :meth:`Signature.make_async_wrapper`).
+    """
+    __slots__ = ("_elem", "_elem_types", "_args", "_kind", "_cls")
+
+    def __init__(self, elem_type=None, *args, **kwargs):
+        kind = kwargs.get("kind", "Iterator")
+        if elem_type is None and not args:
+            elem_type = MtAny()
+        self._elem = checker_for_type(elem_type)
+        self._elem_types = _exact_types(self._elem)
+        self._args = args
+        self._kind = kind
+        self._cls = _iterator_abcs[kind]
+
+    @property
+    def elem(self):
+        """Checker for the items produced by the iterator."""
+        return self._elem
+
+    @property
+    def is_async(self):
+        return self._kind.startswith("Async")
+
+    def check(self, v):
+        if not isinstance(v, self._cls):
+            return False
+        if self._is_collection(v):
+            return _all_match(self._elem, self._elem_types, v)
+        return True
+
+    def check_sampled(self, v, sampling):
+        if not isinstance(v, self._cls):
+            return False
+        if self._is_collection(v):
+            chk = self._elem.check_sampled
+            if isinstance(v, _abc_Sequence):
+                return all(chk(v[i], sampling)
+                           for i in sampling.indices(len(v)))
+            return all(chk(x, sampling) for x in islice(v, sampling.size))
+        return True
+
+    def streams(self):
+        return not (self.is_async or isinstance(self._elem, MtAny))
+
+    def stream(self, value, fail, sampling=None):
+        if not isinstance(value, _abc_Iterator) or not self.streams():
+            return value
+        indices = sampling.stream_indices() if sampling else count()
+        if _abc_Generator and isinstance(value, _abc_Generator):
+            return _CheckedGenerator(value, self, fail, indices)
+        return _CheckedIterator(value, self, fail, indices)
+
+    def _structure(self):
+        return (self._elem, self._args, self._kind)
+
+    def name(self):
+        if isinstance(self._elem, MtAny) and not self._args:
+            return self._kind
+        names = [self._elem.name()]
+        names += [checker_for_type(t).name() for t in self._args]
+        return "%s[%s]" % (self._kind, ", ".join(names))
+
+    def fuzzycheck(self, value):
+        if not isinstance(value, self._cls):
+            return 0
+        if not self._is_collection(value) or not value:
+            return 1
+        chk = self._elem.fuzzycheck
+        return sum(chk(x) for x in value) / len(value)
+
+    def describe_item(self, index, item):
+        """
+        Return description of the `index`-th (0-based) item produced by an
+        iterator, for use in the error messages.
+        """
+        what = {"Generator": "a generator",
+                "AsyncGenerator": "an async generator",
+                "AsyncIterator": "an async iterator",
+                "AsyncIterable": "an async iterator"}.get(self._kind,
+                                                          "an iterator")
+        return ("%s where %s element is %s"
+                % (what, _nth_str(index + 1), _prepare_value(item)))
+
+    def get_error_msg(self, paramname, value):
+        if isinstance(value, self._cls) and self._is_collection(value):
+            elemchecker = self._elem.check
+            for i, x in enumerate(value):
+                if not elemchecker(x):
+                    return ("%s of type `%s` received %s where %s element is "
+                            "%s" % (paramname, self.name(),
+                                    type(value).__name__, _nth_str(i + 1),
+                                    _prepare_value(x)))
+        return MagicType.get_error_msg(self, paramname, value)
+
+    def _is_collection(self, v):
+        return (self._kind == "Iterable" and isinstance(v, _abc_Sized) and
+                not isinstance(v, _abc_Iterator))
+
+
+
+class _CheckedIterator(object):
+    """
+    Proxy for the iterator `it`, verifying the items whose indices are
+    produced by the (increasing) iterator `indices`.
+    """
+    __slots__ = ("_it", "_checker", "_check", "_fail", "_indices",
+                 "_next_index", "_count")
+
+    def __init__(self, it, checker, fail, indices):
+        self._it = it
+        self._checker = checker
+        self._check = checker._elem.check
+        self._fail = fail
+        self._indices = indices
+        self._next_index = next(indices, -1)
+        self._count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self._verify(next(self._it))
+
+    next = __next__  # Python 2
+
+    def _verify(self, item):
+        i = self._count
+        self._count = i + 1
+        if i == self._next_index:
+            self._next_index = next(self._indices, -1)
+            if not self._check(item):
+                self._fail(self._checker, i, item)
+        return item
+
+
+class _CheckedGenerator(_CheckedIterator):
+    """Proxy for a generator, verifying the values that it yields."""
+    __slots__ = ()
+
+    def send(self, value):
+        return self._verify(self._it.send(value))
+
+    def throw(self, *args):
+        return self._verify(self._it.throw(*args))
+
+    def close(self):
+        return self._it.close()
+
+
+
+# ------------------------------------------------------------------------------
+#
+# Checkers for NumPy types
+# ------------------------------------------------------------------------------
+
+class MtNDArray(MagicType):
+    """
+    MagicType for NumPy arrays, declared as ``NDArray[dtype, shape]``.
+
+    The check examines only the array's metadata (dtype and shape), and never
+    its data, so it runs in O(1) time regardless of the array's size. Any
+    subclass of ``numpy.ndarray`` is accepted, including memory-mapped arrays.
+
+    The `dtype` can be:
+
+    - ``None`` or ``Any``: any dtype is accepted;
+    - a Python type such as ``int``, ``float``, ``bool``, ``complex``, ``str``
+      or ``bytes``: the dtype must be of a matching kind (as with the plain
+      values, ``float`` also matches integer arrays);
+    - anything that numpy understands as a dtype, such as ``"float32"`` or
+      ``numpy.int64``: the dtype must be exactly the same;
+    - a dict ``{field: dtype}``: the array must have a structured dtype with
+      exactly these fields;
+    - a tuple of dtypes: the array must have a structured dtype with the fields
+      matching the given dtypes in order. Note that ``NDArray[(int, float)]``
+      is the same as ``NDArray[int, float]`` in Python, so the shape must be
+      given explicitly in this case: ``NDArray[(int, float), ...]``.
+
+    The `shape` can be:
+
+    - ``None`` or ``...``: any shape is accepted;
+    - an integer: the number of dimensions of the array;
+    - a tuple of integers (exact sizes), ``None`` (any size), and at most one
+      ``...`` (any number of dimensions): for example ``(None, 3)`` is a
+      2-dimensional array with 3 columns, and ``(..., 3)`` is an array of any
+      number of dimensions whose last dimension has size 3.
+
+    The ``numpy`` module is never imported by this class: if it was not
+    imported by the user, then no value can be a numpy array.
+    """
+    __slots__ = ("_dtype", "_shape", "_dtype_check")
+
+    def __init__(self, dtype=None, shape=None):
+        if typing and dtype is typing.Any:
+            dtype = None
+        self._dtype = dtype
+        self._shape = _normalize_shape(shape)
+        self._dtype_check = None
+
+    def __getitem__(self, item):
+        if isinstance(item, tuple):
+            if len(item) != 2:
+                raise RuntimeError("NDArray[] expects parameters dtype and "
+                                   "shape: %r" % (item, ))
+            return MtNDArray(*item)
+        return MtNDArray(item)
+
+    def check(self, v):
+        if not _is_ndarray(v):
+            return False
+        if self._dtype is not None:
+            if self._dtype_check is None:
+                self._dtype_check = _make_dtype_check(self._dtype)
+            if not self._dtype_check(v.dtype):
+                return False
+        return self._shape is None or _shape_matches(self._shape, v.shape)
+
+    def _structure(self):
+        return (self._dtype, self._shape)
+
+    def name(self):
+        if self._dtype is None and self._shape is None:
+            return "NDArray"
+        dtype = "Any" if self._dtype is None else _dtype_name(self._dtype)
+        if self._shape is None:
+            return "NDArray[%s]" % dtype
+        shape = ", ".join("..." if d is Ellipsis else str(d)
+                          for d in self._shape)
+        if len(self._shape) == 1:
+            shape += ","
+        return "NDArray[%s, (%s)]" % (dtype, shape)
+
+    def get_error_msg(self, paramname, value):
+        if _is_ndarray(value):
+            return ("%s of type `%s` received an array of dtype %s and shape "
+                    "%r" % (paramname, self.name(), value.dtype, value.shape))
+        return MagicType.get_error_msg(self, paramname, value)
+
+
+# Kinds of numpy dtypes that correspond to the primitive checkers
+_dtype_kinds = {
+    MtBool: "b",
+    MtInt: "iu",
+    MtFloat: "fiu",
+    MtStr: "U",
+}
+
+_pytype_kinds = {
+    bool: "b",
+    int: "iu",
+    float: "fiu",
+    complex: "c",
+    str: "U" if not PY2 else "SU",
+    bytes: "S",
+    object: "O",
+}
+
+
+def _is_ndarray(v):
+    np = sys.modules.get("numpy")
+    return np is not None and isinstance(v, np.ndarray)
+
+
+def _normalize_shape(shape):
+    if shape is None or shape is Ellipsis:
+        return None
+    if isinstance(shape, int):
+        return (None, ) * shape
+    if not isinstance(shape, tuple) or \
+            not all(d is None or d is Ellipsis or isinstance(d, int)
+                    for d in shape) or \
+            sum(d is Ellipsis for d in shape) > 1:
+        raise RuntimeError("Invalid shape for NDArray[]: %r" % (shape, ))
+    return shape
+
+
+def _shape_matches(spec, shape):
+    if Ellipsis in spec:
+        i = spec.index(Ellipsis)
+        head, tail = spec[:i], spec[i + 1:]
+        if len(shape) < len(head) + len(tail):
+            return False
+        return (_shape_matches(head, shape[:len(head)]) and
+                _shape_matches(tail, shape[len(shape) - len(tail):]))
+    return (len(spec) == len(shape) and
+            all(d is None or d == n for d, n in zip(spec, shape)))
+
+
+def _make_dtype_check(spec):
+    """
+    Return a function that verifies whether a numpy dtype matches `spec`. This
+    is called only once a numpy array was observed, so numpy is available.
+    """
+    if spec is None or (typing and spec is typing.Any):
+        return lambda dt: True
+    if isinstance(spec, type) and spec in _pytype_kinds:
+        kinds = _pytype_kinds[spec]
+        return lambda dt: dt.names is None and dt.kind in kinds
+    if isinstance(spec, dict):
+        checks = {k: _make_dtype_check(v) for k, v in spec.items()}
+        return lambda dt: (dt.names is not None and
+                           set(dt.names) == set(checks) and
+                           all(checks[k](dt.fields[k][0]) for k in checks))
+    if isinstance(spec, (tuple, list)):
+        checks = [_make_dtype_check(v) for v in spec]
+        return lambda dt: (dt.names is not None and
+                           len(dt.names) == len(checks) and
+                           all(chk(dt.fields[k][0])
+                               for k, chk in zip(dt.names, checks)))
+    target = sys.modules["numpy"].dtype(spec)
+    return lambda dt: dt == target
+
+
+def _dtype_name(spec):
+    if isinstance(spec, type):
+        return spec.__name__
+    if isinstance(spec, dict):
+        return "{%s}" % ", ".join("%r: %s" % (k, _dtype_name(v))
+                                  for k, v in spec.items())
+    if isinstance(spec, (tuple, list)):
+        return "(%s)" % ", ".join(_dtype_name(v) for v in spec)
+    return str(spec)
+
+
+NDArray = MtNDArray()
+
+
+
+# ------------------------------------------------------------------------------
+#
+# Checkers for records: dataclasses, NamedTuples and attrs classes
+# ------------------------------------------------------------------------------
+
+class MtDeep(MagicType):
+    """
+    Instance of the record class `cls` whose fields match their declared
+    types. The supported classes are dataclasses, ``typing.NamedTuple``
+    classes, and classes created with the ``attrs`` package. For example::
+
+        @dataclass
+        class Point:
+            x: float
+            y: float
+
+        @typed(p=Deep(Point))
+        def norm(p): ...
+
+    Without ``Deep()`` such classes are checked with ``isinstance()`` only.
+
+    The plan of the field checks is built on first use and cached per class
+    (see :func:`_field_plan`). The fields whose declared type is itself a
+    record class, or a union with record classes (such as ``Optional[Point]``)
+    are checked deeply too; records inside containers are checked with
+    ``isinstance()``. Fields without annotations, and fields of
+    type ``Any``, are not checked. The sampled check verifies every field, but
+    with the sampled checks of their types.
+    """
+    __slots__ = ("_cls", )
+
+    def __init__(self, cls):
+        if _record_fields(cls) is None:
+            raise RuntimeError("%r is not a dataclass, NamedTuple or attrs "
+                               "class" % (cls, ))
+        self._cls = cls
+
+    def check(self, var):
+        if not isinstance(var, self._cls):
+            return False
+        for name, exact, check in _field_plan(self._cls):
+            v = getattr(var, name)
+            if type(v) not in exact and not check(v):
+                return False
+        return True
+
+    def check_sampled(self, var, sampling):
+        if not isinstance(var, self._cls):
+            return False
+        checkers = _field_checkers(self._cls)
+        for name, exact, _ in _field_plan(self._cls):
+            v = getattr(var, name)
+            if type(v) not in exact and \
+                    not checkers[name].check_sampled(v, sampling):
+                return False
+        return True
+
+    def fuzzycheck(self, var):
+        if not isinstance(var, self._cls):
+            return 0
+        plan = _field_plan(self._cls)
+        if not plan:
+            return 1
+        return 0.5 + 0.5 * sum(check(getattr(var, name))
+                               for name, _, check in plan) / len(plan)
+
+    def _structure(self):
+        return (self._cls, )
+
+    def name(self):
+        return "Deep[%s]" % self._cls.__name__
+
+    def _gen_expr(self, g, var):
+        return g.call(self, var)
+
+    def _gen_stmts(self, g, var):
+        g.emit("if not isinstance(%s, %s): return False"
+               % (var, g.ref(self._cls)))
+        checkers = _field_checkers(self._cls)
+        for name, _, _ in _field_plan(self._cls):
+            x = g.newvar()
+            g.emit("%s = %s.%s" % (x, var, name))
+            if isinstance(checkers[name], MtDeep):
+                # Call the helper function, since the records may be recursive
+                g.emit("if not %s: return False" % g.expr(checkers[name], x))
+            else:
+                g.stmts(checkers[name], x)
+
+    def get_error_msg(self, paramname, value):
+        if isinstance(value, self._cls):
+            for name, _, check in _field_plan(self._cls):
+                v = getattr(value, name)
+                if not check(v):
+                    return ("%s of type `%s` received an instance whose field "
+                            "%r is %s"
+                            % (paramname, self.name(), name,
+                               _prepare_value(v)))
+        return super(MtDeep, self).get_error_msg(paramname, value)
+
+
+# Attributes of the record classes that hold the checkers of their fields,
+# and the plans of the checks. They are stored on the classes themselves
+# (rather than in a table keyed by the classes), since the checkers of
+# recursive records refer back to their classes.
+_CHECKERS_ATTR = "_typesentry_checkers_"
+_PLAN_ATTR = "_typesentry_plan_"
+
+
+def _set_class_attr(cls, name, value):
+    try:
+        setattr(cls, name, value)
+    except (AttributeError, TypeError):  # pragma: no cover
+        pass
+
+
+def _record_fields(cls):
+    """
+    Return list of pairs (field name, declared type) for the dataclass,
+    NamedTuple or attrs class `cls`; or None if `cls` is not such a class.
+    The type is None for the fields that are not annotated, and for those
+    whose annotations cannot be resolved (see :func:`_resolve_annotation`).
+    """
+    if not isinstance(cls, type):
+        return None
+    if hasattr(cls, "__dataclass_fields__"):
+        import dataclasses
+        names = [f.name for f in dataclasses.fields(cls)]
+        declared = {f.name: f.type for f in dataclasses.fields(cls)}
+    elif issubclass(cls, tuple) and hasattr(cls, "_fields"):
+        names = list(cls._fields)
+        declared = dict(getattr(cls, "__annotations__", {}))
+    elif hasattr(cls, "__attrs_attrs__"):
+        names = [a.name for a in cls.__attrs_attrs__]
+        declared = {a.name: a.type for a in cls.__attrs_attrs__}
+    else:
+        return None
+    # Resolve the annotations given as strings, each in the module of the
+    # class where the field was declared
+    localns = {cls.__name__: cls}
+    for name, t in declared.items():
+        if t is not None:
+            owner = next((c for c in cls.__mro__
+                          if name in vars(c).get("__annotations__", ())), cls)
+            module = sys.modules.get(owner.__module__)
+            declared[name] = _resolve_annotation(
+                t, getattr(module, "__dict__", {}), localns)
+    return [(name, declared.get(name)) for name in names]
+
+
+def _field_checkers(cls):
+    """Return dict of the checkers of the annotated fields of class `cls`."""
+    checkers = vars(cls).get(_CHECKERS_ATTR)
+    if checkers is None:
+        checkers = {}
+        for name, t in _record_fields(cls):
+            if t is None or typing and t is typing.Any:
+                continue
+            if isinstance(t, type) and _record_fields(t) is not None:
+                checkers[name] = checker_for_type(MtDeep(t))
+            else:
+                checkers[name] = _deep_members(checker_for_type(t))
+        _set_class_attr(cls, _CHECKERS_ATTR, checkers)
+    return checkers
+
+
+def _deep_members(checker):
+    """
+    Return `checker`, where the members of a union that are record classes
+    are replaced with their :class:`MtDeep` checkers.
+    """
+    if type(checker) is MtClass and _record_fields(checker._cls) is not None:
+        return checker_for_type(MtDeep(checker._cls))
+    if type(checker) is MtUnion:
+        members = [_deep_members(c) for c in checker._declared]
+        if any(m is not c for m, c in zip(members, checker._declared)):
+            return checker_for_type(MtUnion(*members))
+    return checker
+
+
+def _field_plan(cls):
+    """
+    Return the plan of checking the fields of record class `cls`: tuple of
+    triples (field name, exact types, check method) for the annotated fields,
+    where the exact types of the field's checker (see
+    :meth:`MagicType.exact_types`) allow to skip calling the check method.
+    """
+    plan = vars(cls).get(_PLAN_ATTR)
+    if plan is None:
+        checkers = _field_checkers(cls)
+        plan = tuple((name, _exact_types(checkers[name]),
+                      checkers[name].check)
+                     for name, _ in _record_fields(cls) if name in checkers)
+        _set_class_attr(cls, _PLAN_ATTR, plan)
+    return plan
+
+
+
+# ------------------------------------------------------------------------------
+#
+# Checkers for pandas types
+# ------------------------------------------------------------------------------
+
+class MtFrame(MagicType):
+    """
+    MagicType for pandas DataFrames with a given schema.
+
+    The `columns` are given as a dict ``{name: dtype}``, following the same
+    convention as the dict literals (see :class:`MtDict1`): key ``...`` stands
+    for all the columns not listed explicitly. All listed columns must be
+    present in the frame, and if key ``...`` is absent then no other columns
+    are allowed. For example::
+
+        Frame({"ts": "datetime64[ns]", "price": float, ...: Any})
+
+    The dtypes can be given as Python types (``int``, ``float``, ``bool``,
+    ``str``, ``datetime.datetime``, etc.), which match columns of the
+    corresponding dtype kinds; as ``Any`` (or ``None``), which matches any
+    column; or as anything that compares equal to a pandas dtype, such as
+    ``"category"`` or ``numpy.int32``. The strings ``"datetime64[...]"`` and
+    ``"timedelta64[...]"`` match columns of any resolution (but the time zone,
+    if given, must match); pass a dtype object, such as
+    ``numpy.dtype("datetime64[ns]")``, to require a particular resolution.
+
+    The `index` is either a subclass of ``pandas.Index`` (for example
+    ``pandas.DatetimeIndex``), or a dtype of the index in the same format as
+    the column dtypes.
+
+    If `nullable` is False, then the listed columns must not contain any
+    missing values. This is the only check that looks at the data (though
+    without iterating over the rows in Python).
+
+    All checks other than the `nullable` check take time proportional to the
+    number of columns, independent of the number of rows. The ``pandas``
+    module is never imported by this class.
+    """
+    __slots__ = ("_columns", "_anycolumn", "_anytype", "_anyname", "_extra",
+                 "_checks", "_index", "_nullable")
+
+    def __init__(self, columns=None, index=None, nullable=True):
+        self._columns = {}
+        self._anycolumn = None
+        self._anytype = None
+        self._extra = columns is None
+        for k, v in (columns or {}).items():
+            if k is Ellipsis:
+                self._anycolumn = _make_pandas_dtype_check(v)
+                self._anytype = v
+                self._anyname = _pandas_dtype_name(v)
+                self._extra = True
+            else:
+                self._columns[k] = v
+        self._checks = {k: _make_pandas_dtype_check(v)
+                        for k, v in self._columns.items()}
+        self._index = index
+        self._nullable = nullable
+
+    def check(self, v):
+        return _is_pandas(v, "DataFrame") and self._find_problem(v) is None
+
+    def _structure(self):
+        return (tuple(self._columns.items()), self._extra, self._anytype,
+                self._index, self._nullable)
+
+    def name(self):
+        params = []
+        if not self._extra or self._columns:
+            fields = ["%r: %s" % (k, _pandas_dtype_name(v))
+                      for k, v in self._columns.items()]
+            if self._anycolumn:
+                fields.append("...: %s" % self._anyname)
+            params.append("{%s}" % ", ".join(fields))
+        if self._index is not None:
+            params.append("index=%s" % _pandas_dtype_name(self._index))
+        if not self._nullable:
+            params.append("nullable=False")
+        return "Frame[%s]" % ", ".join(params) if params else "Frame"
+
+    def get_error_msg(self, paramname, value):
+        if _is_pandas(value, "DataFrame"):
+            return ("%s of type `%s` received a frame %s"
+                    % (paramname, self.name(), self._find_problem(value)))
+        return MagicType.get_error_msg(self, paramname, value)
+
+    def _find_problem(self, df):
+        """
+        Return description of why the frame `df` doesn't match this type, or
+        None if it does.
+        """
+        npresent = 0
+        for col, dtype in zip(df.columns, df.dtypes):
+            if col in self._checks:
+                check = self._checks[col]
+                npresent += 1
+            elif not self._extra:
+                return "with an unknown column %r" % (col, )
+            else:
+                check = self._anycolumn
+            if check and not check(dtype):
+                return "where column %r has dtype %s" % (col, dtype)
+        if npresent < len(self._checks):
+            present = set(df.columns)
+            for col in self._columns:
+                if col not in present:
+                    return "without column %r" % (col, )
+        problem = _index_problem(self._index, df.index)
+        if problem:
+            return problem
+        if not self._nullable:
+            cols = list(self._columns) or list(df.columns)
+            nulls = df[cols].isna().any()
+            if nulls.any():
+                return ("where column %r contains missing values"
+                        % (nulls[nulls].index[0], ))
+        return None
+
+
+
+class MtSeries(MagicType):
+    """
+    MagicType for pandas Series with the given `dtype` and `index`. See
+    :class:`MtFrame` for the description of parameters.
+    """
+    __slots__ = ("_dtype", "_check", "_index", "_nullable")
+
+    def __init__(self, dtype=None, index=None, nullable=True):
+        self._dtype = dtype
+        self._check = _make_pandas_dtype_check(dtype)
+        self._index = index
+        self._nullable = nullable
+
+    def check(self, v):
+        return _is_pandas(v, "Series") and self._find_problem(v) is None
+
+    def _structure(self):
+        return (self._dtype, self._index, self._nullable)
+
+    def name(self):
+        params = []
+        if self._dtype is not None:
+            params.append(_pandas_dtype_name(self._dtype))
+        if self._index is not None:
+            params.append("index=%s" % _pandas_dtype_name(self._index))
+        if not self._nullable:
+            params.append("nullable=False")
+        return "Series[%s]" % ", ".join(params) if params else "Series"
+
+    def get_error_msg(self, paramname, value):
+        if _is_pandas(value, "Series"):
+            return ("%s of type `%s` received a series %s"
+                    % (paramname, self.name(), self._find_problem(value)))
+        return MagicType.get_error_msg(self, paramname, value)
+
+    def _find_problem(self, series):
+        if not self._check(series.dtype):
+            return "of dtype %s" % series.dtype
+        problem = _index_problem(self._index, series.index)
+        if problem:
+            return problem
+        if not self._nullable and series.isna().any():
+            return "containing missing values"
+        return None
+
+
+def _is_pandas(v, clsname):
+    pd = sys.modules.get("pandas")
+    return pd is not None and isinstance(v, getattr(pd, clsname))
+
+
+def _index_problem(spec, index):
+    if spec is None:
+        return None
+    pd = sys.modules.get("pandas")
+    if isinstance(spec, type) and pd and issubclass(spec, pd.Index):
+        ok = isinstance(index, spec)
+    else:
+        ok = _make_pandas_dtype_check(spec)(index.dtype)
+    if ok:
+        return None
+    return "with index %s of dtype %s" % (type(index).__name__, index.dtype)
+
+
+def _make_pandas_dtype_check(spec):
+    """
+    Return a function that verifies whether a pandas dtype matches `spec`.
+    """
+    if spec is None or (typing and spec is typing.Any):
+        return lambda dt: True
+    if spec is str:
+        return lambda dt: dt.kind in "OSU" and dt.name != "category"
+    if isinstance(spec, type) and spec in _get_pandas_kinds():
+        kinds = _get_pandas_kinds()[spec]
+        return lambda dt: dt.kind in kinds
+    if isinstance(spec, str) and spec.startswith(("datetime64",
+                                                  "timedelta64")):
+        return _make_datetime_dtype_check(spec)
+
+    def _check(dt):
+        try:
+            return bool(dt == spec)
+        except TypeError:
+            return False
+    return _check
+
+
+def _pandas_dtype_name(spec):
+    if spec is None or (typing and spec is typing.Any):
+        return "Any"
+    if isinstance(spec, type):
+        return spec.__name__
+    return str(spec)
+
+
+def _make_datetime_dtype_check(spec):
+    """
+    Return a function that verifies whether a pandas dtype matches the string
+    `spec` such as ``"datetime64[ns]"``, ``"datetime64[ns, UTC]"`` or
+    ``"timedelta64"``. The resolution given in the spec is ignored, since it
+    depends on how the data was created (e.g. pandas 3 produces
+    ``datetime64[us]`` where earlier versions produced ``datetime64[ns]``).
+    The time zone, if given, must match. In order to require a particular
+    resolution, give the dtype object instead, e.g.
+    ``numpy.dtype("datetime64[ns]")``.
+    """
+    import re
+    mm = re.match(r"^(datetime|timedelta)64(?:\[\w+(?:,\s*(.+))?\])?$", spec)
+    if not mm:
+        raise RuntimeError("Invalid dtype %r" % spec)
+    kind = "M" if mm.group(1) == "datetime" else "m"
+    tz = mm.group(2)
+
+    def _check(dt):
+        if dt.kind != kind:
+            return False
+        dttz = getattr(dt, "tz", None)
+        return dttz is None if tz is None else str(dttz) == tz
+    return _check
+
+
+# Kinds of pandas dtypes that correspond to the Python types, see
+# :func:`_get_pandas_kinds`
+_pandas_kinds = None
+
+
+def _get_pandas_kinds():
+    global _pandas_kinds
+    if _pandas_kinds is None:
+        import datetime
+        kinds = dict(_pytype_kinds)
+        kinds[datetime.datetime] = "M"
+        kinds[datetime.timedelta] = "m"
+        _pandas_kinds = kinds
+    return _pandas_kinds
+
+
+
 # ------------------------------------------------------------------------------
 #
 # Set operations with checkers
@@ -676,22 +2170,106 @@ class MtUnion(MagicType):
     example, if type T is a union `Union[int, str, List[int], List[str]]` and
     the value `[0, 1, "a"]` is supplied, then the error message will be
     displayed as if T was `List[int]`.
+
+    Nested unions are flattened: a union is equal to the flat union of the
+    same members, so :func:`checker_for_type` interns them as one checker.
+    Only the name keeps the nesting as declared (e.g. ``Union[int,
+    Optional[str]]``), for display; an interned checker has the name of the
+    union that was created first.
+
+    In order to make checks of wide unions fast, the value is first tested
+    against the set of types whose instances match some branch of the union
+    (see :meth:`MagicType.exact_types`), and then all branches that are plain
+    classes are tested with a single ``isinstance()`` call. Only if both of
+    these fail, the remaining branches are checked one by one.
+
+    With ``U(..., adaptive=True)`` the union counts how often each branch
+    matches, and periodically reorders the remaining branches so that the
+    most frequently matching ones are tried first (see :class:`BranchStats`).
+    The value of `adaptive` may also be the number of checks between the
+    reorderings (1000 by default). The counts are available via
+    :meth:`branch_hits`.
     """
+    __slots__ = ("_checkers", "_declared", "_exact", "_classes", "_rest")
 
-    def __init__(self, *types):
+    def __new__(cls, *types, **kwargs):
+        if kwargs.get("adaptive") and cls is MtUnion:
+            cls = _AdaptiveUnion
+        return MagicType.__new__(cls)
+
+    def __init__(self, *types, **kwargs):
+        adaptive = _adaptive_interval(kwargs)
         if len(types) <= 1:
             raise RuntimeError("More than one type is expected for Union "
                                "constructor: %r" % types)
-        self._checkers = [checker_for_type(t) for t in types]
+        # The checkers of `types` as given, and with nested unions flattened
+        self._declared = [checker_for_type(t) for t in types]
+        checkers = []
+        for chk in self._declared:
+            if isinstance(chk, MtUnion):
+                checkers.extend(chk._checkers)
+            else:
+                checkers.append(chk)
+        self._checkers = checkers
+        self._exact = frozenset().union(*[_exact_types(c) for c in checkers])
+        self._classes = tuple(c._cls for c in checkers if type(c) is MtClass)
+        # Branches not fully covered by the exact types and the classes
+        rest = [i for i, c in enumerate(checkers)
+                if type(c) not in (MtClass, MtNone, MtBool)]
+        self._rest = tuple(checkers[i] for i in rest)
+        if adaptive:
+            self._stats = BranchStats(checkers, rest, adaptive)
+            self._dispatch = {}
 
     def check(self, var):
-        return any(c.check(var) for c in self._checkers)
+        if type(var) in self._exact:
+            return True
+        if self._classes and isinstance(var, self._classes):
+            return True
+        for c in self._rest:
+            if c.check(var):
+                return True
+        return False
+
+    def exact_types(self):
+        return self._exact
+
+    def check_sampled(self, var, sampling):
+        if type(var) in self._exact:
+            return True
+        if self._classes and isinstance(var, self._classes):
+            return True
+        for c in self._rest:
+            if c.check_sampled(var, sampling):
+                return True
+        return False
+
+    def streams(self):
+        return any(c.streams() for c in self._checkers)
+
+    def stream(self, value, fail, sampling=None):
+        for c in self._checkers:
+            if c.check(value):
+                return c.stream(value, fail, sampling)
+        return value
 
     def fuzzycheck(self, v):
         return max(c.fuzzycheck(v) for c in self._checkers)
 
+    def _gen_expr(self, g, var):
+        parts = []
+        if self._exact:
+            parts.append("type(%s) in %s" % (var, g.ref(self._exact)))
+        if self._classes:
+            parts.append("isinstance(%s, %s)" % (var, g.ref(self._classes)))
+        parts.extend(g.expr(c, var) for c in self._rest)
+        return "(%s)" % " or ".join(parts)
+
+    def _structure(self):
+        return tuple(self._checkers)
+
     def name(self):
-        res = [c.name() for c in self._checkers]
+        res = [c.name() for c in self._declared]
         if len(res) == 2 and "None" in res:
             return "Optional[%s]" % (res[0] if res[1] == "None" else res[1])
         else:
@@ -704,6 +2282,7 @@ class MtUnion(MagicType):
             msg = best.get_error_msg(paramname, value)
             # Slightly modify the message, to hint that the provided type is not
             # THE type of the argument, but just one of its possible types
+            import re
             mm = re.match(r"^(.*) of type (`[^`]+`) received ?a? ?(.*)$", msg)
             if mm:
                 msg = "%s expects type %s but received a %s" % mm.groups()
@@ -719,20 +2298,50 @@ class MtIntersection(MagicType):
 
     We say that ``x`` is of type ``I(type1, ..., typeN)`` if type of ``x`` is
     all of ``type1``, ..., ``typeN``.
+
+    With ``I(..., adaptive=True)`` the branches that most often fail are
+    tested first (see :class:`MtUnion`).
     """
+    __slots__ = ("_checkers", )
+
+    def __new__(cls, *types, **kwargs):
+        if kwargs.get("adaptive") and cls is MtIntersection:
+            cls = _AdaptiveIntersection
+        return MagicType.__new__(cls)
 
-    def __init__(self, *types):
+    def __init__(self, *types, **kwargs):
+        adaptive = _adaptive_interval(kwargs)
         if len(types) <= 1:
             raise RuntimeError("More than one type is expected for Intersection"
                                " constructor: %r" % types)
         self._checkers = [checker_for_type(t) for t in types]
+        if adaptive:
+            self._stats = BranchStats(self._checkers,
+                                      range(len(self._checkers)), adaptive)
 
     def check(self, var):
         return all(c.check(var) for c in self._checkers)
 
+    def exact_types(self):
+        return frozenset.intersection(*[_exact_types(c)
+                                        for c in self._checkers])
+
+    def check_sampled(self, var, sampling):
+        return all(c.check_sampled(var, sampling) for c in self._checkers)
+
+    def _structure(self):
+        return tuple(self._checkers)
+
     def name(self):
         return "Intersection[%s]" % ", ".join(c.name() for c in self._checkers)
 
+    def _gen_expr(self, g, var):
+        return "(%s)" % " and ".join(g.expr(c, var) for c in self._checkers)
+
+    def _gen_stmts(self, g, var):
+        for c in self._checkers:
+            g.stmts(c, var)
+
 
 class MtNot(MagicType):
     """
@@ -740,37 +2349,741 @@ class MtNot(MagicType):
 
     This type matches if and only if the variable is *not* of any of the
     provided types.
+
+    With ``Not(..., adaptive=True)`` the types that most often match are
+    tested first (see :class:`MtUnion`).
     """
+    __slots__ = ("_checkers", )
 
-    def __init__(self, *types):
+    def __new__(cls, *types, **kwargs):
+        if kwargs.get("adaptive") and cls is MtNot:
+            cls = _AdaptiveNot
+        return MagicType.__new__(cls)
+
+    def __init__(self, *types, **kwargs):
+        adaptive = _adaptive_interval(kwargs)
         assert len(types) >= 1
         self._checkers = [checker_for_type(t) for t in types]
+        if adaptive:
+            self._stats = BranchStats(self._checkers,
+                                      range(len(self._checkers)), adaptive)
 
     def check(self, var):
         return not any(c.check(var) for c in self._checkers)
 
+    def _structure(self):
+        return tuple(self._checkers)
+
     def name(self):
         return "Not[%s]" % ", ".join(ch.name() for ch in self._checkers)
 
+    def _gen_expr(self, g, var):
+        return "(not (%s))" % " or ".join(g.expr(c, var)
+                                          for c in self._checkers)
+
+
+class BranchStats(object):
+    """
+    Counters of the branches of an adaptive union, intersection or negation:
+    how many times each branch has decided the outcome of the check (i.e.
+    matched for a union, or failed for an intersection).
+
+    Once every `interval` decisions the `candidates` (the indices of the
+    branches that are tested one by one) are reordered by the number of
+    recent decisions, so that the branches most likely to decide are tested
+    first. The recent counts are then halved, so that the order follows the
+    changes in the data. Reordering only affects the order of evaluation: the
+    results of the checks, the names of the types and the error messages do
+    not change.
+
+    The counters are updated without locking. In multi-threaded programs some
+    increments may be lost, which only makes the order slightly less optimal.
+
+    :param branches: the list of all branches (checkers), in declared order.
+    :param candidates: indices of the branches that can be reordered.
+    :param interval: number of decisions between the reorderings.
+    """
+    __slots__ = ("branches", "order", "recent", "totals", "interval",
+                 "_countdown")
+
+    def __init__(self, branches, candidates, interval):
+        self.branches = tuple(branches)
+        # Pairs (index, checker) in the current order of evaluation
+        self.order = tuple((i, self.branches[i]) for i in candidates)
+        self.recent = [0] * len(self.branches)
+        self.totals = [0] * len(self.branches)
+        self.interval = interval
+        self._countdown = interval
+
+    def hit(self, index):
+        """Record that branch `index` has decided the outcome of a check."""
+        self.recent[index] += 1
+        self.totals[index] += 1
+        self._countdown -= 1
+        if self._countdown <= 0:
+            self._countdown = self.interval
+            self.reorder()
+
+    def reorder(self):
+        """Sort the candidate branches by the number of recent decisions."""
+        recent = self.recent
+        self.order = tuple(sorted(self.order, key=lambda ic: -recent[ic[0]]))
+        self.recent = [n // 2 for n in recent]
+
+    def hits(self):
+        """Return list of pairs (name of branch, total number of decisions)."""
+        return [(c.name(), n) for c, n in zip(self.branches, self.totals)]
+
+
+def _adaptive_interval(kwargs):
+    """Pop parameter `adaptive` from `kwargs`, and return the interval."""
+    adaptive = kwargs.pop("adaptive", False)
+    if kwargs:
+        raise RuntimeError("Unexpected parameters: %s"
+                           % ", ".join(sorted(kwargs)))
+    if adaptive is True:
+        return 1000
+    if adaptive is not False and (not isinstance(adaptive, _int_type) or
+                                  adaptive < 0):
+        raise RuntimeError("Parameter `adaptive` should be a boolean or a "
+                           "positive integer, got %r" % (adaptive, ))
+    return adaptive
+
+
+class _Adaptive(object):
+    """Common methods of the adaptive unions, intersections and negations."""
+    __slots__ = ()
+
+    def branch_hits(self):
+        """
+        Return list of pairs (name of branch, number of times the branch has
+        decided the outcome of the check), in the declared order.
+        """
+        return self._stats.hits()
+
+    def _structure(self):
+        # Each adaptive checker keeps its own counters, so it is never
+        # replaced with an equal checker
+        return None
+
+    def _gen_expr(self, g, var):
+        # The compiled predicates call :meth:`check`, so that the branches
+        # are still counted and reordered.
+        return "%s(%s)" % (g.ref(self.check), var)
+
+    def _gen_stmts(self, g, var):
+        g.emit("if not %s: return False" % g.expr(self, var))
+
+
+class _AdaptiveUnion(_Adaptive, MtUnion):
+    __slots__ = ("_stats", "_dispatch")
+
+    def check(self, var):
+        return self._match(var, None)
+
+    def check_sampled(self, var, sampling):
+        return self._match(var, sampling)
+
+    def exact_types(self):
+        return self._exact
+
+    def _match(self, var, sampling):
+        stats = self._stats
+        tv = type(var)
+        if tv in self._exact or self._classes and \
+                isinstance(var, self._classes):
+            # The branch that matched is determined by the type of `var`
+            i = self._dispatch.get(tv)
+            if i is None:
+                i = self._dispatch[tv] = self._fast_branch(var)
+            stats.hit(i)
+            return True
+        for i, c in stats.order:
+            if (c.check(var) if sampling is None else
+                    c.check_sampled(var, sampling)):
+                stats.hit(i)
+                return True
+        return False
+
+    def _fast_branch(self, var):
+        for i, c in enumerate(self._checkers):
+            if (type(var) in _exact_types(c) or
+                    type(c) is MtClass and isinstance(var, c._cls)):
+                return i
+        return 0  # pragma: no cover
+
+
+class _AdaptiveIntersection(_Adaptive, MtIntersection):
+    __slots__ = ("_stats", )
+
+    def check(self, var):
+        stats = self._stats
+        for i, c in stats.order:
+            if not c.check(var):
+                stats.hit(i)
+                return False
+        return True
+
+    def check_sampled(self, var, sampling):
+        stats = self._stats
+        for i, c in stats.order:
+            if not c.check_sampled(var, sampling):
+                stats.hit(i)
+                return False
+        return True
+
+    def exact_types(self):
+        return MtIntersection.exact_types(self)
+
+
+class _AdaptiveNot(_Adaptive, MtNot):
+    __slots__ = ("_stats", )
+
+    def check(self, var):
+        stats = self._stats
+        for i, c in stats.order:
+            if c.check(var):
+                stats.hit(i)
+                return False
+        return True
+
+
+# ------------------------------------------------------------------------------
+#
+# Sampling
+# ------------------------------------------------------------------------------
+
+class Sampling(object):
+    """
+    Policy for checking only a subset of elements of large containers.
+
+    For a sequence (list or tuple) of length ``n`` the policy selects the first
+    `head` elements, the last `tail` elements, and `samples` elements spaced
+    evenly in between. If `random` is True, then the positions of the spaced
+    elements are shifted by a random offset on each check, so that repeated
+    checks of the same container eventually cover all of its elements. For
+    unordered containers (sets and dicts) the first ``head + tail + samples``
+    elements in the iteration order are checked.
+
+    Containers with at most ``head + tail + samples`` elements are checked
+    fully. Thus, larger values of the parameters give higher confidence that
+    the value matches the type, at the expense of the time spent checking.
+    """
+    __slots__ = ("head", "tail", "samples", "size", "_randrange")
+
+    def __init__(self, head=10, tail=10, samples=20, random=False):
+        if head < 0 or tail < 0 or samples < 0:
+            raise RuntimeError("Sampling parameters must be non-negative")
+        self.head = head
+        self.tail = tail
+        self.samples = samples
+        self.size = head + tail + samples
+        if random:
+            import random as _random
+            self._randrange = _random.randrange
+        else:
+            self._randrange = None
+
+    def indices(self, n):
+        """Return iterable of indices to check in a sequence of length `n`."""
+        if n <= self.size:
+            return range(n)
+        end = n - self.tail
+        if not self.samples:
+            return chain(range(self.head), range(end, n))
+        stride = (end - self.head) // self.samples
+        offset = self._randrange(stride) if self._randrange else stride // 2
+        return chain(range(self.head),
+                     range(self.head + offset, end, stride),
+                     range(end, n))
+
+    def stream_indices(self):
+        """
+        Return iterator of indices to check in a stream of unknown length.
+
+        The first `head` items are checked, followed by batches of `samples`
+        items spaced with a stride that doubles after each batch. Thus the
+        number of items checked in a stream of length ``n`` grows only as
+        ``O(log n)``. The `tail` and `random` parameters do not apply to
+        streams.
+        """
+        for i in range(self.head):
+            yield i
+        i = self.head
+        stride = 1
+        while self.samples:
+            for _ in range(self.samples):
+                yield i
+                i += stride
+            stride *= 2
+
+    def __repr__(self):
+        return ("Sampling(head=%d, tail=%d, samples=%d, random=%r)"
+                % (self.head, self.tail, self.samples,
+                   self._randrange is not None))
+
+
+
+class MtSampled(MagicType):
+    """
+    Type `t` checked according to the given sampling policy (see
+    :class:`Sampling`). For example, ``Sampled(List[int])`` verifies only
+    some of the elements of the list, making the check O(1) instead of O(n).
+    """
+    __slots__ = ("_checker", "_sampling")
+
+    def __init__(self, t, sampling=None):
+        self._checker = checker_for_type(t)
+        self._sampling = sampling or Sampling()
+
+    def check(self, var):
+        return self._checker.check_sampled(var, self._sampling)
+
+    def check_sampled(self, var, sampling):
+        return self._checker.check_sampled(var, self._sampling)
+
+    def stream(self, value, fail, sampling=None):
+        return self._checker.stream(value, fail, self._sampling)
+
+    def fuzzycheck(self, var):
+        return self._checker.fuzzycheck(var)
+
+    def streams(self):
+        return self._checker.streams()
+
+    def _structure(self):
+        return (self._checker, self._sampling)
+
+    def name(self):
+        return self._checker.name()
+
+    def get_error_msg(self, paramname, value):
+        return self._checker.get_error_msg(paramname, value)
+
+
+def supports_sampling(checker):
+    """Return True if `checker` overrides :meth:`MagicType.check_sampled`."""
+    return _owner(type(checker), "check_sampled") is not MagicType
+
+
+
+# ------------------------------------------------------------------------------
+#
+# Verdict cache
+# ------------------------------------------------------------------------------
+
+class VerdictCache(object):
+    """
+    Bounded LRU cache of the values that have passed the type checks.
+
+    Only immutable containers (tuples and frozensets) are cached, since the
+    verdict for a mutable container may change after it is modified. Values
+    are remembered in two ways:
+
+    - tuples consisting of primitive values (strings, numbers, etc) are keyed
+      by their value, together with the types of their elements. Thus an equal
+      tuple passed again is accepted without re-checking, even if it is a
+      different object;
+    - other values are keyed by their identity, provided that they are
+      recursively immutable: all their elements are primitive values, or
+      tuples and frozensets of such (see :func:`_is_immutable`). Containers
+      holding mutable objects (e.g. a tuple of lists) are always checked in
+      full. If the value supports weak references, then the entry is removed
+      from the cache as soon as the value is garbage-collected; otherwise the
+      cache holds a reference to the value (ensuring that its id cannot be
+      reused) until the entry is evicted.
+
+    :param maxsize: maximum number of entries in the cache.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def check(self, checker, value):
+        """Equivalent to ``checker.check(value)``, but using the cache."""
+        tv = type(value)
+        if tv is not tuple and tv is not frozenset:
+            return checker.check(value)
+        entries = self._entries
+        if tv is tuple:
+            types = tuple(map(type, value))
+            if _atomic_types.issuperset(types):
+                key = (checker, value, types)
+                if key in entries:
+                    self.hits += 1
+                    self._touch(key)
+                    return True
+                return self._store(key, True, checker, value)
+        key = (checker, id(value))
+        ref = entries.get(key)
+        if ref is not None and (ref is value or
+                                type(ref) is weakref.ref and ref() is value):
+            self.hits += 1
+            self._touch(key)
+            return True
+        if not _is_immutable(value):
+            return checker.check(value)
+        try:
+            ref = weakref.ref(value, lambda _: entries.pop(key, None))
+        except TypeError:
+            ref = value
+        return self._store(key, ref, checker, value)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _store(self, key, entry, checker, value):
+        self.misses += 1
+        if not checker.check(value):
+            return False
+        entries = self._entries
+        entries[key] = entry
+        while len(entries) > self.maxsize:
+            try:
+                entries.popitem(last=False)
+            except KeyError:  # pragma: no cover
+                break
+        return True
+
+    def _touch(self, key):
+        try:
+            entries = self._entries
+            entries[key] = entries.pop(key)
+        except KeyError:  # pragma: no cover
+            # Another thread has evicted the key
+            pass
+
+
+
+def _is_immutable(value):
+    """
+    Return True if the tuple or frozenset `value` contains only primitive
+    values, and tuples or frozensets that are themselves immutable.
+    """
+    types = set(map(type, value))
+    if _atomic_types.issuperset(types):
+        return True
+    if not _immutable_types.issuperset(types):
+        return False
+    return all(_is_immutable(x) for x in value
+               if type(x) is tuple or type(x) is frozenset)
+
+
+_immutable_types = _atomic_types | frozenset([tuple, frozenset])
+
+
+
+class MtCached(MagicType):
+    """
+    Checker `checker` whose positive verdicts are cached in the
+    :class:`VerdictCache` `cache`.
+    """
+    __slots__ = ("_checker", "_cache")
+
+    def __init__(self, checker, cache):
+        self._checker = checker
+        self._cache = cache
+
+    def check(self, var):
+        return self._cache.check(self._checker, var)
+
+    def stream(self, value, fail, sampling=None):
+        return self._checker.stream(value, fail, sampling)
+
+    def fuzzycheck(self, var):
+        return self._checker.fuzzycheck(var)
+
+    def streams(self):
+        return self._checker.streams()
+
+    def _structure(self):
+        return (self._checker, self._cache)
+
+    def name(self):
+        return self._checker.name()
+
+    def get_error_msg(self, paramname, value):
+        return self._checker.get_error_msg(paramname, value)
+
+
 
 # ------------------------------------------------------------------------------
 #
 # Other
 # ------------------------------------------------------------------------------
 
-memoized_type_checkers = {
+class CheckerMemo(object):
+    """
+    Table of the checkers created by :func:`checker_for_type`, keyed by the
+    type specifications (and by the checkers themselves, for interning).
+
+    The table is a bounded LRU cache: once it holds more than `maxsize`
+    entries, the least recently used ones are evicted (and will be re-created
+    if needed again). The checkers for the basic types given as `pinned` are
+    never evicted, and do not count towards the `maxsize`. On Python 2 the
+    entries are evicted in the order of insertion, rather than of use.
+
+    Classes (other than the `pinned` ones) are not stored in the LRU table:
+    their checkers are referenced weakly, and can be found for as long as they
+    are in use elsewhere (e.g. in a :class:`Signature`). Thus the table never
+    prevents a class from being garbage-collected, which matters for programs
+    that create classes at runtime.
+
+    The counters :attr:`hits`, :attr:`misses` and :attr:`evictions` (see
+    :meth:`stats`) help to choose the appropriate `maxsize`. The table is
+    available as ``typesentry.checks.memoized_type_checkers``; it can be
+    resized by assigning to its :attr:`maxsize`.
+    """
+
+    def __init__(self, maxsize=4096, pinned=None):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._pinned = dict(pinned or {})
+        self._entries = OrderedDict(self._pinned)
+        self._move_to_end = getattr(self._entries, "move_to_end", None)
+        # Map of class => weak reference to its checker
+        self._classes = weakref.WeakKeyDictionary()
+
+    def get(self, key):
+        """Return the checker stored under `key`, or None."""
+        checker = self._entries.get(key)
+        if checker is None:
+            checker = self._get_class_checker(key)
+            if checker is None:
+                self.misses += 1
+                return None
+        elif self._move_to_end:
+            try:
+                self._move_to_end(key)
+            except KeyError:  # pragma: no cover
+                pass  # Another thread has evicted the key
+        self.hits += 1
+        return checker
+
+    def setdefault(self, key, checker):
+        """
+        Return the checker stored under `key`; if there is none, then store
+        and return `checker`. This doesn't affect the hit/miss counters.
+        """
+        existing = self._entries.get(key) or self._get_class_checker(key)
+        if existing is not None:
+            return existing
+        self[key] = checker
+        return checker
+
+    def __setitem__(self, key, checker):
+        if isinstance(key, type) and key not in self._pinned:
+            try:
+                self._classes[key] = weakref.ref(checker)
+                return
+            except TypeError:  # pragma: no cover
+                pass
+        entries = self._entries
+        entries[key] = checker
+        while len(entries) > self.maxsize + len(self._pinned):
+            try:
+                key, checker = entries.popitem(last=False)
+            except KeyError:  # pragma: no cover
+                break
+            if key in self._pinned:
+                entries[key] = checker
+            else:
+                self.evictions += 1
+
+    def __contains__(self, key):
+        return (key in self._entries or
+                self._get_class_checker(key) is not None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        """Remove all entries (except the pinned ones), and reset counters."""
+        self._entries.clear()
+        self._entries.update(self._pinned)
+        self._classes.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Return dictionary with the current ``size`` of the table, its
+        ``maxsize``, and the number of ``hits``, ``misses`` and
+        ``evictions``.
+        """
+        return {"size": len(self), "maxsize": self.maxsize, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
+
+    def _get_class_checker(self, key):
+        if not isinstance(key, type):
+            return None
+        ref = self._classes.get(key)
+        return ref() if ref is not None else None
+
+    def __repr__(self):
+        return "CheckerMemo(maxsize=%d)" % self.maxsize
+
+
+memoized_type_checkers = CheckerMemo(pinned={
     None: MtNone(),
     type(None): MtNone(),
     bool: MtBool(),
     int: MtInt(),
     float: MtFloat(),
     str: MtStr(),
-}
+})
 
 true_checker = MtLiteral(True)
 false_checker = MtLiteral(False)
 
 
+
+class _CheckerCompiler(object):
+    """
+    Code generator used by :meth:`MagicType.compile`.
+
+    Each checker contributes to the generated source via its methods
+    ``_gen_expr()`` / ``_gen_stmts()``. Checkers that cannot be expressed as a
+    single expression (such as containers) are compiled into separate helper
+    functions within the same generated module. Objects referenced from the
+    generated code (classes, literals, etc) are stored in :attr:`namespace`.
+    """
+
+    def __init__(self):
+        self.namespace = {}
+        self.indent = 0
+        self._refs = {}
+        self._funcs = {}
+        self._sources = []
+        self._lines = None
+        self._nvars = 0
+
+    def compile(self, checker):
+        name = self.function(checker)
+        src = "\n\n".join(self._sources) + "\n"
+        filename = "<typesentry:%s>" % checker.name()
+        exec(compile(src, filename, "exec"), self.namespace)
+        fn = self.namespace[name]
+        fn.source = src
+        return fn
+
+    def emit(self, line):
+        self._lines.append("    " * self.indent + line)
+
+    def ref(self, obj):
+        """Return name under which `obj` is visible to the generated code."""
+        name = self._refs.get(id(obj))
+        if name is None:
+            name = "_k%d" % len(self._refs)
+            self._refs[id(obj)] = name
+            self.namespace[name] = obj
+        return name
+
+    def newvar(self):
+        self._nvars += 1
+        return "v%d" % self._nvars
+
+    def call(self, checker, var):
+        """Return an expression calling helper function for the `checker`."""
+        return "%s(%s)" % (self.function(checker), var)
+
+    def function(self, checker):
+        """Generate helper function for the `checker`, return its name."""
+        name = self._funcs.get(id(checker))
+        if name is None:
+            name = "_f%d" % len(self._funcs)
+            self._funcs[id(checker)] = name
+            saved = (self._lines, self.indent)
+            self._lines = ["def %s(v):" % name]
+            self.indent = 1
+            self.stmts(checker, "v")
+            self.emit("return True")
+            self._sources.append("\n".join(self._lines))
+            self._lines, self.indent = saved
+        return name
+
+    def expr(self, checker, var):
+        if self._native(checker):
+            return checker._gen_expr(self, var)
+        return MagicType._gen_expr(checker, self, var)
+
+    def stmts(self, checker, var):
+        if self._native(checker):
+            checker._gen_stmts(self, var)
+        else:
+            MagicType._gen_stmts(checker, self, var)
+
+    def loop(self, checker, iterable):
+        """Emit a loop checking all elements of `iterable` with `checker`."""
+        if not isinstance(checker, MtAny):
+            exact = _exact_types(checker)
+            if exact:
+                # Skip the loop if all elements have "exact" types
+                self.emit("if not %s.issuperset(map(type, %s)):"
+                          % (self.ref(exact), iterable))
+                self.indent += 1
+            x = self.newvar()
+            self.emit("for %s in %s:" % (x, iterable))
+            self.indent += 1
+            self.stmts(checker, x)
+            self.indent -= 1 + bool(exact)
+
+    @staticmethod
+    def _native(checker):
+        """
+        Return True if the code generated by `checker` can be trusted, i.e. its
+        ``.check()`` method was not overridden in a subclass.
+        """
+        cls = type(checker)
+        owner_check = _owner(cls, "check")
+        owner_stmts = _owner(cls, "_gen_stmts")
+        return (issubclass(_owner(cls, "_gen_expr"), owner_check) and
+                (owner_stmts is MagicType or
+                 issubclass(owner_stmts, owner_check)))
+
+
+def _exact_types(checker):
+    """
+    Return ``checker.exact_types()``, unless the checker's class overrides
+    method ``.check()`` without overriding ``.exact_types()``.
+    """
+    cls = type(checker)
+    if issubclass(_owner(cls, "exact_types"), _owner(cls, "check")):
+        return checker.exact_types()
+    return frozenset()
+
+
+def _all_match(checker, exact, values):
+    """
+    Return True if all `values` match the `checker`. Here `exact` is the set of
+    types whose instances are known to match the checker (see
+    :meth:`MagicType.exact_types`): the types of all elements are collected
+    at C speed, and only the elements of other types are checked one-by-one.
+    """
+    if exact:
+        extra = set(map(type, values)) - exact
+        if not extra:
+            return True
+        chk = checker.check
+        return all(chk(x) for x in values if type(x) in extra)
+    chk = checker.check
+    return all(chk(x) for x in values)
+
+
+def _owner(cls, attr):
+    """Return the class in the MRO of `cls` where `attr` is defined."""
+    for klass in cls.__mro__:
+        if attr in klass.__dict__:
+            return klass
+
+
 def _prepare_value(val, maxlen=50, notype=False):
     """
     Stringify value `val`, ensuring that it is not too long.
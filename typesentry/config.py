@@ -1,18 +1,20 @@
 #!/usr/bin/env python
 # Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
 from __future__ import division, print_function
+import contextlib
 import functools
-import re
+import inspect
 import sys
-import traceback
+import time
+import weakref
 
-import colorama
-
-from typesentry.checks import checker_for_type
+from typesentry.checks import checker_for_type, Sampling, VerdictCache, PY37
 from typesentry.checks import MtUnion as U
-from typesentry.signature import Signature
+from typesentry.policy import Policy
+from typesentry.signature import (Signature, make_switchable,
+                                  passthrough_code)
 
-__all__ = ("Config", )
+__all__ = ("Config", "CallSampling")
 
 
 # Derive from the builtin TypeError
@@ -61,7 +63,10 @@ class Config(object):
     """
 
     def __init__(self, type_error=TsTypeError, value_error=TsValueError,
-                 disabled=False, soft_exceptions=True):
+                 disabled=False, soft_exceptions=True, compiled=False,
+                 sampling=None, call_sampling=None, verdict_cache=0,
+                 stats=False, profiler=None, policy=None, debug_only=False,
+                 lazy=False):
         """
         Create new type-checking configuration.
 
@@ -71,15 +76,87 @@ class Config(object):
         :param value_error: exception class that should be used when a value
             error occurs. It is recommended that this class derives from the
             standard ``ValueError``.
-        :param disabled: if True, then all type-checking will be disabled.
+        :param disabled: if True, then all type-checking will be disabled:
+            the ``typed`` decorator will return the functions unchanged. This
+            is the same as ``policy="off"``, and is kept for backward
+            compatibility. In order to switch the checks off and on at
+            runtime, use methods :meth:`disable` and :meth:`enable` instead.
         :param soft_exceptions: if True, then a custom exceptions handler will
             be installed at the console level, which will catch any exception
             with method ``._handle_()`` and use that method to report the
             error.
+        :param compiled: if True, then the decorated functions will be wrapped
+            into functions generated specifically for their signatures (see
+            :meth:`Signature.make_compiled_wrapper`). Such wrappers are
+            significantly faster, however errors in the number of arguments
+            passed are reported by Python itself.
+        :param sampling: a :class:`Sampling` policy to use for checking
+            arguments that are containers: only a subset of elements selected
+            by the policy will be verified. This can also be set for individual
+            parameters by declaring them as ``Sampled(type, sampling)``.
+        :param call_sampling: a :class:`CallSampling` policy; if given, then
+            each decorated function will check its arguments only on some of
+            the calls, as determined by the policy. This option takes
+            precedence over `compiled`.
+        :param verdict_cache: if positive, then the immutable containers
+            (tuples and frozensets which do not contain mutable objects, even
+            nested ones) that passed the type check will be
+            remembered, so that subsequent checks of the same values take O(1)
+            time. This parameter is the maximum number of values remembered
+            (see :class:`VerdictCache`).
+        :param stats: if True, then the number of calls, the number of checks,
+            the time spent in checks and in the function itself, and the
+            number of failures will be collected for each decorated function.
+            These statistics are available via :meth:`stats`. Since the
+            checks must be timed separately from the function, this option
+            takes precedence over `compiled`.
+        :param profiler: a :class:`Profiler` which will periodically time the
+            checks of the decorated functions. This option also takes
+            precedence over `compiled`.
+        :param policy: a :class:`Policy` that determines the level of checks
+            (``"off"``, ``"sample"``, ``"shallow"`` or ``"full"``) for each
+            decorated function, based on its module and name. A string is
+            interpreted as the mode for all functions. If not given, the policy
+            is read from the environment variables ``TYPESENTRY_MODE``,
+            ``TYPESENTRY_POLICY`` and ``TYPESENTRY_POLICY_FILE`` (see
+            :meth:`Policy.from_env`).
+        :param debug_only: if True, then under ``python -O`` (i.e. when
+            ``__debug__`` is False) the ``typed`` decorator will return the
+            functions unchanged.
+        :param lazy: if True, then the inspection of the signatures and the
+            construction of the checkers will be deferred until the first call
+            of each decorated function, which makes decorating cheaper (and
+            thus speeds up importing modules with many decorated functions).
+            The downside is that errors in the type declarations are reported
+            only when the function is called, unless :meth:`resolve` is
+            invoked. Coroutine functions and async generators are always
+            decorated eagerly.
         """
         self.TypeError = type_error
         self.ValueError = value_error
-        self.typed = self._make_typed(disabled)
+        self.compiled = compiled
+        self.sampling = sampling
+        self.call_sampling = call_sampling
+        self.verdict_cache = VerdictCache(verdict_cache) if verdict_cache \
+            else None
+        self._stats = {} if stats else None
+        self.profiler = profiler
+        # All wrappers created by this config, to support :meth:`disable`
+        self._wrappers = weakref.WeakSet()
+        self._enabled = True
+        self.lazy = lazy
+        # Lazy wrappers that were not called yet, see :meth:`resolve`
+        self._pending = weakref.WeakSet()
+        if disabled:
+            policy = Policy("off")
+        elif policy is None:
+            policy = Policy.from_env()
+        elif not isinstance(policy, Policy):
+            policy = Policy(policy)
+        self.policy = policy
+        self.typed = self._make_typed(policy.all_off or
+                                      (debug_only and not __debug__))
+        self.Typed = self._make_typed_base()
         self.supply_src = False
         if soft_exceptions:
             global system_except_hook
@@ -88,7 +165,7 @@ class Config(object):
             assert callable(getattr(value_error, "_handle_")), \
                 "Class %s missing method ._handle_()" % value_error.__name__
             try:
-                s = Signature(func=traceback.print_tb, types=tuple(),
+                s = Signature(func=_handle_tc_error, types=tuple(),
                               typesentry_config=self)
                 type_error("test type_error", src=s)
                 self.supply_src = True
@@ -121,10 +198,238 @@ class Config(object):
         return checker.name()
 
 
+    @staticmethod
+    def compile_type(*types):
+        """
+        Return a predicate function that checks whether its argument is of
+        type ``types[0]``, or of any type among ``types`` (if more than one
+        type is given). See :meth:`MagicType.compile`.
+        """
+        if len(types) == 1:
+            return checker_for_type(types[0], compiled=True)
+        else:
+            return checker_for_type(U(*types), compiled=True)
+
+
+    @property
+    def enabled(self):
+        """False if the checks were turned off with :meth:`disable`."""
+        return self._enabled
+
+    def disable(self):
+        """
+        Turn off the type checks in all functions decorated with this config,
+        including those decorated in the future (until :meth:`enable` is
+        called).
+
+        The checking code of each wrapper is swapped for the code that simply
+        calls the original function, so the disabled wrappers do not spend
+        any time testing whether they are enabled. Functions whose wrapper
+        could not be made switchable remain checked.
+        """
+        self._enabled = False
+        for w in list(self._wrappers):
+            code = passthrough_code(w)
+            if code is not None:
+                w.__code__ = code
+
+    def enable(self):
+        """Turn the type checks back on after :meth:`disable`."""
+        self._enabled = True
+        for w in list(self._wrappers):
+            w.__code__ = w._checked_code_
+
+    @contextlib.contextmanager
+    def suspended(self):
+        """
+        Context manager that disables the checks within its scope::
+
+            with tc.suspended():
+                hot_loop()
+
+        Note that the checks are disabled for all threads, not only for the
+        current one.
+        """
+        was_enabled = self._enabled
+        self.disable()
+        try:
+            yield self
+        finally:
+            if was_enabled:
+                self.enable()
+
+
+    def resolve(self, func=None):
+        """
+        Complete the decoration of the functions deferred with ``lazy=True``:
+        inspect their signatures and build the checkers now, rather than on
+        the first call. This raises the errors in the type declarations, if
+        any.
+
+        :param func: the decorated function to resolve; if not given, then all
+            pending functions of this config are resolved.
+        :returns: the wrapper that performs the checks for `func`, or None
+            if `func` is not given.
+        """
+        if func is not None:
+            resolve = getattr(func, "_resolve_", None)
+            return resolve() if resolve else func
+        for flazy in list(self._pending):
+            flazy._resolve_()
+
+
+    def stats(self):
+        """
+        Return the statistics collected for the decorated functions (when
+        the config was created with ``stats=True``).
+
+        :returns: dictionary mapping the qualified names of the functions to
+            dictionaries of their statistics (see
+            :meth:`FunctionStats.as_dict`). The statistics of distinct
+            functions with the same name are combined.
+        """
+        if self._stats is None:
+            return {}
+        return {name: st.as_dict() for name, st in self._stats.items()}
+
+
     #---------------------------------------------------------------------------
     # Private
     #---------------------------------------------------------------------------
 
+    def _make_wrapper(self, f, sig, call, mode="full"):
+        """
+        Create the checking wrapper for function `f` with signature `sig`.
+        Here `call` is the function that the wrapper should invoke (either `f`
+        itself, or its instrumented version), and `mode` is the checking mode
+        from the :class:`Policy`.
+
+        The wrappers refer to the wrapped function via variable `call`, `f` or
+        `_ts_f` (see :func:`make_switchable`).
+        """
+        call_sampling = self.call_sampling
+        if mode == "sample" and not call_sampling:
+            call_sampling = CallSampling()
+        fdecorated = sig.make_async_wrapper(call_sampling)
+        if fdecorated is not None:
+            return fdecorated
+        if (self.compiled and not call_sampling and
+                self._stats is None and self.profiler is None):
+            fdecorated = sig.make_compiled_wrapper()
+            if fdecorated is not None:
+                return fdecorated
+
+        check_params = sig.params_checker
+        check_retval = sig.return_checker
+        if call_sampling:
+            return call_sampling.wrap(call, sig)
+
+        if sig.streams:
+            stream_args = sig.stream_args
+            stream_retval = sig.stream_retval \
+                if sig.retval.streams else (lambda ret: ret)
+
+            def fdecorated(*args, **kws):
+                check_params(*args, **kws)
+                args, kws = stream_args(args, kws)
+                ret = call(*args, **kws)
+                check_retval(ret)
+                return stream_retval(ret)
+        else:
+            fdecorated = _make_checking_wrapper(call, check_params,
+                                                check_retval)
+
+        return fdecorated
+
+
+    def _decorate(self, f, types, mode, method=False, localns=None):
+        """
+        Return the checking wrapper for `f` declared with `types`. If `method`
+        is True, then the first parameter of `f` is ``self`` (or ``cls``) and
+        is not checked, whatever its name. The namespace `localns` is used for
+        resolving the forward references in the annotations.
+        """
+        sig = Signature(f, types, self,
+                        _SHALLOW if mode == "shallow" else None, method,
+                        localns)
+        call = f
+        if self.profiler is not None:
+            self.profiler.instrument(sig)
+        if self._stats is not None:
+            key = "%s.%s" % (f.__module__,
+                             getattr(f, "__qualname__", f.__name__))
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = FunctionStats()
+            call = stats.instrument(sig)
+        fdecorated = self._make_wrapper(f, sig, call, mode)
+        functools.update_wrapper(fdecorated, f)
+        fdecorated._signature_ = sig
+        if make_switchable(fdecorated):
+            self._wrappers.add(fdecorated)
+            code = None if self._enabled else passthrough_code(fdecorated)
+            if code is not None:
+                fdecorated.__code__ = code
+        return fdecorated
+
+
+    def _make_lazy_wrapper(self, f, types, mode, method=False, localns=None):
+        """
+        Return a stand-in for the checking wrapper of `f`, which creates the
+        actual wrapper (via :meth:`_decorate`) when called for the first time.
+
+        The stand-in has the shape of the wrapper made by
+        :func:`_make_checking_wrapper`, but runs the pass-through code (see
+        :func:`passthrough_code`) calling `resolve`. Once the actual wrapper
+        is created, the stand-in takes over its code and closure if they have
+        the same shape, or otherwise calls it directly (see :meth:`_adopt`).
+        """
+        config = self
+        # The actual wrapper, once created
+        wrapper = [None]
+
+        def resolve():
+            if wrapper[0] is None:
+                wrapper[0] = config._decorate(f, types, mode, method,
+                                              localns)
+                flazy._signature_ = wrapper[0]._signature_
+                config._pending.discard(flazy)
+                config._adopt(flazy, wrapper[0])
+            return wrapper[0]
+
+        def call(*args, **kws):
+            return (wrapper[0] or resolve())(*args, **kws)
+
+        flazy = _make_checking_wrapper(call, _ignore, _ignore)
+        flazy._checked_code_ = flazy.__code__
+        flazy.__code__ = passthrough_code(flazy)
+        functools.update_wrapper(flazy, f)
+        flazy._resolve_ = resolve
+        self._pending.add(flazy)
+        return flazy
+
+
+    def _adopt(self, flazy, wrapper):
+        """
+        Make the lazy stand-in `flazy` behave as its resolved `wrapper`, so
+        that calling it no longer goes through the resolution check. This
+        requires writable closure cells (Python 3.7+); in older versions the
+        stand-in keeps forwarding the calls to the `wrapper`.
+        """
+        if not PY37:  # pragma: no cover
+            return
+        cells = flazy.__closure__
+        code = flazy._checked_code_
+        if getattr(wrapper, "_checked_code_", None) is code:
+            # Same code, hence same free variables: become the wrapper
+            for cell, wcell in zip(cells, wrapper.__closure__):
+                cell.cell_contents = wcell.cell_contents
+            flazy.__code__ = wrapper.__code__
+            self._wrappers.add(flazy)
+        else:
+            cells[code.co_freevars.index("call")].cell_contents = wrapper
+
+
     def _make_typed(self, disabled):
         if disabled:
             # Return a factory producing noop decorators
@@ -139,31 +444,346 @@ class Config(object):
                 @typed(x=int, msg=Optional[str])
                 def foo(x, msg=None):
                     pass
+
+            When applied to a class as ``@typed()``, all annotated methods of
+            the class are decorated (see :meth:`_decorate_class`).
             """
             # `typed(...)` is called as a decorator factory, and therefore must
             # return a decorator object.
             def prepared_decorator(f):
-                sig = Signature(f, types, self)
-                check_params = sig.params_checker
-                check_retval = sig.return_checker
-
-                @functools.wraps(f)
-                def fdecorated(*args, **kws):
-                    check_params(*args, **kws)
-                    ret = f(*args, **kws)
-                    check_retval(ret)
-                    return ret
-
-                fdecorated._signature_ = sig
-                return fdecorated
+                if isinstance(f, type):
+                    if types:
+                        raise RuntimeError(
+                            "Parameter types cannot be given when decorating "
+                            "class %s" % f.__name__)
+                    return self._decorate_class(f)
+                return self._wrap(f, types)
 
             return prepared_decorator
 
         return typed
 
 
+    def _wrap(self, f, types, method=False, localns=None):
+        """
+        Return `f` decorated according to the policy for `f`. The forward
+        references in the annotations of `f` are resolved in its globals and
+        in `localns`.
+        """
+        mode = self.policy.mode_for(f)
+        if mode == "off":
+            return f
+        if self.lazy and not _is_async(f):
+            return self._make_lazy_wrapper(f, types, mode, method, localns)
+        return self._decorate(f, types, mode, method, localns)
+
+
+    def _decorate_class(self, cls):
+        """
+        Decorate the methods, classmethods, staticmethods and property
+        accessors defined in class `cls` that have type annotations. The
+        first parameter of the methods, classmethods and accessors is not
+        checked.
+
+        Only the members defined in `cls` itself are decorated: the inherited
+        members are either already decorated in the base class (whose wrappers
+        and signatures are thus shared with the subclasses), or are not meant
+        to be checked. Members that were already decorated are left as is.
+
+        The annotations of the members may refer to `cls` itself and to the
+        other names defined in the class, also when given as strings (or with
+        ``from __future__ import annotations``).
+        """
+        localns = dict(vars(cls))
+        localns[cls.__name__] = cls
+        for name, attr in list(vars(cls).items()):
+            wrapped = self._wrap_member(attr, localns)
+            if wrapped is not attr:
+                setattr(cls, name, wrapped)
+        return cls
+
+
+    def _wrap_member(self, attr, localns):
+        """
+        Return class member `attr` with its functions decorated; `localns` is
+        the namespace of the class.
+        """
+        if isinstance(attr, staticmethod):
+            f = self._wrap_method(attr.__func__, False, localns)
+            return attr if f is attr.__func__ else staticmethod(f)
+        if isinstance(attr, classmethod):
+            f = self._wrap_method(attr.__func__, True, localns)
+            return attr if f is attr.__func__ else classmethod(f)
+        if type(attr) is property:
+            accessors = (attr.fget, attr.fset, attr.fdel)
+            wrapped = tuple(f and self._wrap_method(f, True, localns)
+                            for f in accessors)
+            if wrapped == accessors:
+                return attr
+            return property(*wrapped, doc=attr.__doc__)
+        if inspect.isfunction(attr):
+            return self._wrap_method(attr, True, localns)
+        return attr
+
+
+    def _wrap_method(self, f, method, localns):
+        if (not getattr(f, "__annotations__", None) or
+                hasattr(f, "_signature_") or hasattr(f, "_resolve_")):
+            return f
+        return self._wrap(f, {}, method, localns)
+
+
+    def _make_typed_base(self):
+        config = self
+
+        class Typed(object):
+            """
+            Base class whose subclasses have their annotated methods decorated
+            by :meth:`Config.typed` automatically (Python 3.6+).
+            """
+            __slots__ = ()
+
+            def __init_subclass__(cls, **kwargs):
+                super(Typed, cls).__init_subclass__(**kwargs)
+                config.typed()(cls)
+
+        return Typed
+
+
+
+class CallSampling(object):
+    """
+    Policy for checking the arguments only on some calls of a function.
+
+    Initially each call is checked. After `streak` consecutive successful
+    checks the interval between the checks is multiplied by `growth` (up to
+    `max_interval`), i.e. only 1 in N calls will be checked, with N growing
+    over time. Any failed check resets the function back to checking every
+    call. The state is maintained separately for each decorated function.
+
+    Usage::
+
+        typed = typesentry.Config(call_sampling=CallSampling()).typed
+    """
+
+    def __init__(self, max_interval=1000, streak=100, growth=2):
+        if max_interval < 1 or streak < 1 or growth < 1:
+            raise RuntimeError("CallSampling parameters must be positive")
+        self.max_interval = max_interval
+        self.streak = streak
+        self.growth = growth
+
+    def gate(self):
+        """
+        Return a new sampling state, together with functions operating on it:
+
+        - ``skip()`` returns True if the current call should not be checked;
+        - ``fail()`` is called when a check fails;
+        - ``succeed()`` is called when all checks of a call have passed.
+
+        This is used by the async wrappers, whose checks are spread across the
+        coroutine (see :meth:`Signature.make_async_wrapper`).
+        """
+        max_interval = self.max_interval
+        streak = self.streak
+        growth = self.growth
+        # [calls to skip, current interval, consecutive successful checks]
+        state = [0, 1, 0]
+
+        def skip():
+            if state[0]:
+                state[0] -= 1
+                return True
+            return False
+
+        def fail():
+            state[:] = [0, 1, 0]
+
+        def succeed():
+            state[2] += 1
+            if state[2] >= streak:
+                state[1] = min(state[1] * growth, max_interval)
+                state[2] = 0
+            state[0] = state[1] - 1
+
+        return state, skip, fail, succeed
+
+    def wrap(self, f, sig):
+        """Return wrapper for `f` that checks signature `sig` on some calls."""
+        max_interval = self.max_interval
+        streak = self.streak
+        growth = self.growth
+        check_params = sig.params_checker
+        check_retval = sig.return_checker
+        streams = sig.streams
+        # [calls to skip, current interval, consecutive successful checks]
+        state = [0, 1, 0]
+
+        def fsampled(*args, **kws):
+            if state[0]:
+                state[0] -= 1
+                return f(*args, **kws)
+            try:
+                check_params(*args, **kws)
+            except Exception:
+                state[:] = [0, 1, 0]
+                raise
+            if streams:
+                args, kws = sig.stream_args(args, kws)
+            ret = f(*args, **kws)
+            try:
+                check_retval(ret)
+            except Exception:
+                state[:] = [0, 1, 0]
+                raise
+            state[2] += 1
+            if state[2] >= streak:
+                state[1] = min(state[1] * growth, max_interval)
+                state[2] = 0
+            state[0] = state[1] - 1
+            if sig.retval.streams:
+                ret = sig.stream_retval(ret)
+            return ret
+
+        fsampled._call_sampling_state_ = state
+        return fsampled
+
+    def __repr__(self):
+        return ("CallSampling(max_interval=%d, streak=%d, growth=%r)"
+                % (self.max_interval, self.streak, self.growth))
+
+
+
+class FunctionStats(object):
+    """
+    Counters of the checking overhead for a decorated function (see parameter
+    `stats` of :class:`Config`).
+
+    The counters are plain attributes incremented without locking, so in a
+    multi-threaded program some increments may occasionally be lost. This is
+    acceptable since the statistics serve only to estimate the overhead.
+    """
+    __slots__ = ("calls", "checks", "check_time", "call_time", "failures")
+
+    def __init__(self):
+        self.calls = 0
+        self.checks = 0
+        self.check_time = 0.0
+        self.call_time = 0.0
+        self.failures = {}
+
+    def instrument(self, sig):
+        """
+        Replace the checkers of signature `sig` with timed versions, and
+        return a timed version of the function.
+
+        For ``async def`` functions the time spent in the function is not
+        measured (it would include the time the coroutine is suspended), and
+        every check is counted as a call.
+        """
+        stats = self
+        check_params = sig.params_checker
+        check_retval = sig.return_checker
+        func = sig.function
+        is_async = _is_async(func)
+
+        def params_checker(*args, **kws):
+            t0 = _clock()
+            try:
+                check_params(*args, **kws)
+            except Exception:
+                stats._fail(sig.failed_param(args, kws) or "<call>")
+                raise
+            finally:
+                stats.check_time += _clock() - t0
+                stats.checks += 1
+                if is_async:
+                    stats.calls += 1
+
+        def return_checker(value):
+            t0 = _clock()
+            try:
+                check_retval(value)
+            except Exception:
+                stats._fail("_return")
+                raise
+            finally:
+                stats.check_time += _clock() - t0
+
+        def timed(*args, **kws):
+            t0 = _clock()
+            try:
+                return func(*args, **kws)
+            finally:
+                stats.call_time += _clock() - t0
+                stats.calls += 1
+
+        sig.params_checker = params_checker
+        sig.return_checker = return_checker
+        return func if is_async else timed
+
+    def as_dict(self):
+        """
+        Return the statistics as a dictionary with keys:
+
+        - ``calls``: number of calls of the function;
+        - ``checks``: number of calls where the arguments were checked (this
+          may be less than ``calls`` when `call_sampling` is used);
+        - ``check_time``: total time (in seconds) spent in the checks of the
+          arguments and of the return value;
+        - ``call_time``: total time (in seconds) spent in the function itself;
+        - ``failures``: dictionary of the number of failed checks for each
+          parameter; the failures of the return value are listed under
+          ``"_return"``, and calls where the arguments could not be matched to
+          the parameters under ``"<call>"``.
+        """
+        return {"calls": self.calls, "checks": self.checks,
+                "check_time": self.check_time, "call_time": self.call_time,
+                "failures": dict(self.failures)}
+
+    def _fail(self, name):
+        self.failures[name] = self.failures.get(name, 0) + 1
+
+
+# Monotonic clock with the highest available resolution
+_clock = getattr(time, "perf_counter", time.time)
+
+# Sampling policy of the "shallow" mode: no elements of containers are checked
+_SHALLOW = Sampling(head=0, tail=0, samples=0)
+
+
+
+def _never(func):
+    return False
+
+
+def _ignore(*args, **kws):
+    pass
+
+
+def _make_checking_wrapper(call, check_params, check_retval):
+    """Return the basic checking wrapper (see :meth:`Config._make_wrapper`)."""
+    def fdecorated(*args, **kws):
+        check_params(*args, **kws)
+        ret = call(*args, **kws)
+        check_retval(ret)
+        return ret
+    return fdecorated
+
+
+def _is_async(func):
+    return (getattr(inspect, "iscoroutinefunction", _never)(func) or
+            getattr(inspect, "isasyncgenfunction", _never)(func))
+
+
 
 def _handle_tc_error(exc, exc_type, exc_value, exc_tb):
+    # These modules are imported here, since they are only needed to display
+    # the errors
+    import re
+    import traceback
+    import colorama
+
     white = colorama.Fore.WHITE + colorama.Style.BRIGHT
     darkred = colorama.Fore.RED
     red = colorama.Fore.LIGHTRED_EX + colorama.Style.NORMAL
@@ -196,7 +816,8 @@ def _handle_tc_error(exc, exc_type, exc_value, exc_tb):
             lineno = frame.lineno
             fnname = frame.name
             line = frame.line
-        if filename.endswith("typesentry/config.py"):
+        if (filename.endswith("typesentry/config.py") or
+                filename.startswith("<typesentry:")):
             break
         if filename == "<stdin>" and fnname == "<module>":
             continue
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+from __future__ import division, print_function
+import os
+
+__all__ = ("Policy", )
+
+MODES = ("off", "sample", "shallow", "full")
+
+
+class Policy(object):
+    """
+    Checking policy: the level of checks to apply to each decorated function.
+
+    The available modes are:
+
+    - ``"off"``: the function is not decorated at all;
+    - ``"sample"``: the arguments are checked only on some of the calls (see
+      :class:`CallSampling`);
+    - ``"shallow"``: the arguments are checked on every call, but the
+      elements of containers are not examined (e.g. for ``List[int]`` only
+      the fact that the value is a list is verified);
+    - ``"full"``: the checks are performed as configured by the
+      :class:`Config`.
+
+    The `mode` applies to all functions, except those matching one of the
+    `overrides`. Overrides is a list of ``(pattern, mode)`` pairs (or a dict),
+    where pattern is a glob matched against the name of the module of the
+    function, and against the full name of the function (module name +
+    qualified name, e.g. ``"pkg.mod.Class.method"``). When several patterns
+    match a function, the last one wins.
+
+    The mode is resolved once, when the function is decorated, so the
+    policy has no cost at the time the function is called.
+    """
+
+    def __init__(self, mode="full", overrides=None):
+        self.mode = _check_mode(mode)
+        if isinstance(overrides, dict):
+            overrides = list(overrides.items())
+        self.overrides = [(pattern, _check_mode(m))
+                          for pattern, m in overrides or []]
+
+    def mode_for(self, func):
+        """Return the checking mode for function `func`."""
+        if not self.overrides:
+            return self.mode
+        import fnmatch
+        module = getattr(func, "__module__", None) or ""
+        fullname = "%s.%s" % (module, getattr(func, "__qualname__",
+                                              func.__name__))
+        mode = self.mode
+        for pattern, m in self.overrides:
+            if (fnmatch.fnmatchcase(fullname, pattern) or
+                    fnmatch.fnmatchcase(module, pattern)):
+                mode = m
+        return mode
+
+    @property
+    def all_off(self):
+        """True if this policy disables all checks."""
+        return self.mode == "off" and all(m == "off"
+                                          for _, m in self.overrides)
+
+    @classmethod
+    def from_env(cls, environ=None, mode="full"):
+        """
+        Create policy from the environment variables:
+
+        - ``TYPESENTRY_MODE``: the default mode (`mode` if not set);
+        - ``TYPESENTRY_POLICY_FILE``: name of the file with the overrides, in
+          the format described in :meth:`from_file`;
+        - ``TYPESENTRY_POLICY``: comma-separated list of overrides of the
+          form ``pattern=mode``. These are applied after the overrides from
+          the file.
+        """
+        if environ is None:
+            environ = os.environ
+        mode = environ.get("TYPESENTRY_MODE") or mode
+        overrides = []
+        filename = environ.get("TYPESENTRY_POLICY_FILE")
+        if filename:
+            policy = cls.from_file(filename, mode)
+            mode = policy.mode
+            overrides = policy.overrides
+        spec = environ.get("TYPESENTRY_POLICY")
+        if spec:
+            overrides += _parse_overrides(spec.split(","),
+                                          "TYPESENTRY_POLICY")
+        return cls(mode, overrides)
+
+    @classmethod
+    def from_file(cls, filename, mode="full"):
+        """
+        Create policy from a file. Each line of the file has the form
+        ``pattern = mode``; empty lines and lines starting with ``#`` are
+        ignored. Pattern ``*`` sets the default mode. For example::
+
+            # Check everything in our own packages, nothing elsewhere
+            * = off
+            mypkg.* = full
+            mypkg.ingest.parse_row = sample
+        """
+        with open(filename) as inp:
+            lines = [line.strip() for line in inp]
+        overrides = _parse_overrides(
+            [line for line in lines if line and not line.startswith("#")],
+            filename)
+        while overrides and overrides[0][0] == "*":
+            mode = overrides.pop(0)[1]
+        return cls(mode, overrides)
+
+    def __repr__(self):
+        return "Policy(%r, %r)" % (self.mode, self.overrides)
+
+
+def _check_mode(mode):
+    if mode not in MODES:
+        raise RuntimeError("Invalid checking mode %r: expected one of %s"
+                           % (mode, ", ".join(MODES)))
+    return mode
+
+
+def _parse_overrides(items, source):
+    overrides = []
+    for item in items:
+        item = item.strip()
+        if not item:
+            continue
+        pattern, eq, mode = item.partition("=")
+        if not eq or not pattern.strip():
+            raise RuntimeError("Invalid policy entry %r in %s: expected "
+                               "`pattern=mode`" % (item, source))
+        overrides.append((pattern.strip(), _check_mode(mode.strip())))
+    return overrides
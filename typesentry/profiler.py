@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# Copyright 2017 H2O.ai; Apache License Version 2.0;  -*- encoding: utf-8 -*-
+from __future__ import division, print_function
+import random
+import time
+import weakref
+
+__all__ = ("Profiler", )
+
+
+class Profiler(object):
+    """
+    Sampling profiler of the time spent in type checks.
+
+    On average once every `interval` checks (counted across all functions
+    that use the profiler), the wrapper performs the checks of the call's
+    arguments one by one, timing the check of each parameter separately; the
+    check of the return value is timed in the same way. The time is
+    attributed to the pair (function, parameter) together with the declared
+    type of that parameter. The gaps between the timed checks are random
+    (uniformly distributed between 1 and ``2 * interval - 1``), so that the
+    samples do not alias with periodic call patterns. Since only a small
+    fraction of calls is timed, the profiler is cheap enough to be left on in
+    production-like environments.
+
+    Usage::
+
+        profiler = typesentry.Profiler(interval=100)
+        typed = typesentry.Config(profiler=profiler).typed
+        ...
+        print(profiler.format_report())
+
+    The same profiler may be shared by several :class:`Config` objects, in
+    which case it covers all functions decorated by any of them. Compiled
+    wrappers (see ``Config(compiled=True)``) inline the checks and cannot be
+    profiled, so the `profiler` option takes precedence over `compiled`.
+
+    :param interval: the average number of checks per one timed check.
+    :param seed: optional seed for the random gaps between the timed checks.
+    """
+
+    def __init__(self, interval=100, seed=None):
+        if interval < 1:
+            raise RuntimeError("Profiler interval must be positive")
+        self.interval = interval
+        self.samples = 0
+        self._randint = random.Random(seed).randint
+        self._countdown = self._next_gap()
+        # Map of signature => {parameter: [samples, total time]}. Signatures
+        # are held weakly, so that the profiler does not keep the functions
+        # alive.
+        self._entries = weakref.WeakKeyDictionary()
+
+    def instrument(self, sig):
+        """
+        Replace the checkers of signature `sig` with versions that time the
+        checks once every :attr:`interval` checks on average.
+        """
+        prof = self
+        check_params = sig.params_checker
+        check_retval = sig.return_checker
+        plans = sig._call_plans
+
+        def params_checker(*args, **kws):
+            prof._countdown -= 1
+            if prof._countdown > 0:
+                return check_params(*args, **kws)
+            plan = plans.get((len(args), tuple(kws)) if kws else len(args))
+            if plan is None:
+                # The first call of this shape resolves the binding of the
+                # arguments; a later call will be timed instead
+                return check_params(*args, **kws)
+            prof._countdown = prof._next_gap()
+            prof._check_args(sig, plan, args, kws)
+
+        def return_checker(value):
+            prof._countdown -= 1
+            if prof._countdown > 0:
+                return check_retval(value)
+            prof._countdown = prof._next_gap()
+            t0 = _clock()
+            check_retval(value)
+            prof._record(sig, [(sig.retval, _clock() - t0)])
+
+        sig.params_checker = params_checker
+        if sig.retval.checker is not None:
+            sig.return_checker = return_checker
+
+    def report(self, top=None):
+        """
+        Return the ranked list of places where the time in type checks is
+        spent, most expensive first. Each entry is a dictionary with keys:
+
+        - ``function``: name of the function;
+        - ``param``: name of the parameter (``"_return"`` for the return
+          value);
+        - ``type``: name of the declared type of the parameter;
+        - ``samples``: number of times the check was timed;
+        - ``time``: estimated total time (in seconds) spent in this check,
+          i.e. the measured time multiplied by the sampling interval;
+        - ``share``: fraction of the total estimated time of all checks.
+
+        :param top: if given, then only this many entries are returned.
+        """
+        rows = []
+        total = 0
+        for sig, params in list(self._entries.items()):
+            for param, (samples, t) in params.items():
+                rows.append({"function": sig.function.__name__,
+                             "param": param.name,
+                             "type": param.checker.name(),
+                             "samples": samples,
+                             "time": t * self.interval})
+                total += t
+        total *= self.interval
+        for row in rows:
+            row["share"] = row["time"] / total if total else 0
+        rows.sort(key=lambda row: -row["time"])
+        return rows[:top] if top else rows
+
+    def format_report(self, top=10):
+        """Return the :meth:`report` as a human-readable string."""
+        lines = []
+        for row in self.report(top):
+            lines.append("%5.1f%%  `%s` on `%s(%s)`  [%d samples, ~%.3gs]"
+                         % (row["share"] * 100, row["type"], row["function"],
+                            row["param"], row["samples"], row["time"]))
+        return "\n".join(lines)
+
+    def reset(self):
+        """Discard all collected samples."""
+        self._entries.clear()
+        self.samples = 0
+
+    def __repr__(self):
+        return "Profiler(interval=%d)" % self.interval
+
+    def _next_gap(self):
+        return self._randint(1, 2 * self.interval - 1)
+
+    def _check_args(self, sig, plan, args, kws):
+        """
+        Check the arguments of a call according to its `plan` (see
+        :meth:`Signature._make_call_plan`), timing each check. These are the
+        actual checks of the call: a failed check raises the usual error (and
+        then the timings of the call are discarded).
+        """
+        posplan, kwplan = plan
+        timings = []
+        for i, chk, param in posplan:
+            value = args[i]
+            t0 = _clock()
+            ok = chk(value)
+            timings.append((param, _clock() - t0))
+            if not ok and not param.is_default_value(value):
+                raise sig._param_type_error(param, param.name, value)
+        for name, chk, param in kwplan:
+            value = kws[name]
+            t0 = _clock()
+            ok = chk(value)
+            timings.append((param, _clock() - t0))
+            if not ok and not param.is_default_value(value):
+                raise sig._param_type_error(param, name, value)
+        self._record(sig, timings)
+
+    def _record(self, sig, timings):
+        params = self._entries.get(sig)
+        if params is None:
+            params = self._entries[sig] = {}
+        for param, t in timings:
+            entry = params.get(param)
+            if entry is None:
+                params[param] = [1, t]
+            else:
+                entry[0] += 1
+                entry[1] += t
+            self.samples += 1
+
+
+# Monotonic clock with the highest available resolution
+_clock = getattr(time, "perf_counter", time.time)
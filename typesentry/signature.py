@@ -2,23 +2,205 @@
 from __future__ import division, print_function
 
 import inspect
+import weakref
+
+from .checks import (checker_for_type, MagicType, MtAny, MtCached, MtIterator,
+                     MtSampled, PY2, supports_sampling, _resolve_annotation)
+
+# Maximum number of distinct call shapes remembered for each signature. Calls
+# with shapes beyond this limit are still checked, only without caching.
+MAX_CALL_PLANS = 32
+
+# Sources of the wrappers for ``async def`` functions (see
+# :meth:`Signature.make_async_wrapper`). They are compiled only when needed,
+# since this syntax is not available in Python 2.
+_COROUTINE_WRAPPER = """
+async def fdecorated(*args, **kws):
+    %(skip)s
+    _ts_check_params(*args, **kws)
+    %(stream_args)s
+    ret = await _ts_f(*args, **kws)
+    _ts_check_retval(ret)
+    return %(retval)s
+"""
+
+_ASYNCGEN_WRAPPER = """
+async def fdecorated(%(params)s):
+    %(skip)s
+    %(check_params)s
+    %(stream_args)s
+    agen = _ts_f(%(args)s)
+    index = 0
+    try:
+        item = await agen.__anext__()
+        while True:
+            %(check_item)s
+            index += 1
+            try:
+                sent = yield item
+            except GeneratorExit:
+                await agen.aclose()
+                raise
+            except BaseException as e:
+                item = await agen.athrow(e)
+            else:
+                if sent is None:
+                    item = await agen.__anext__()
+                else:
+                    item = await agen.asend(sent)
+    except StopAsyncIteration:
+        return
+"""
+
+
+def _resolve_annotations(annotations, func, localns=None):
+    """
+    Return the `annotations` of function `func` with the forward references
+    resolved in the globals of `func` and in `localns` (the namespace of the
+    class, for methods). Annotations that cannot be resolved are omitted, so
+    that their parameters are not checked.
+    """
+    globalns = getattr(func, "__globals__", {})
+    resolved = {}
+    for name, t in annotations.items():
+        rt = _resolve_annotation(t, globalns, localns)
+        if rt is not None or t is None:
+            resolved[name] = rt
+    return resolved
+
+
+def make_switchable(wrapper):
+    """
+    Prepare the `wrapper` function to be switched between checking and
+    pass-through modes, by replacing its ``__code__``.
+
+    The pass-through code has the same parameters (and for closures, the same
+    free variables) as the wrapper's own code, and simply calls the wrapped
+    function, which must be available to the wrapper as variable `call`, `f`
+    or `_ts_f`. The wrapper's own code is stored in attribute
+    ``_checked_code_``, and the pass-through code is returned by
+    :func:`passthrough_code`.
+
+    :returns: True if the wrapper can be switched, or False if its code
+        doesn't match the expected pattern.
+    """
+    code = wrapper.__code__
+    if _switch_target(code) is None:
+        return False
+    wrapper._checked_code_ = code
+    return True
+
+
+def passthrough_code(wrapper):
+    """
+    Return the pass-through code for the `wrapper` prepared with
+    :func:`make_switchable`, or None if it cannot be created.
+
+    The code is generated when first requested (i.e. when the checks are
+    disabled for the first time), so decorating functions stays cheap. It is
+    cached by the wrapper's code object: the wrappers created from the same
+    closure share their code, and thus the pass-through code as well.
+    """
+    code = wrapper._checked_code_
+    passthrough = _passthrough_codes.get(code)
+    if passthrough is None:
+        passthrough = _make_passthrough_code(code)
+        if passthrough is None:  # pragma: no cover
+            return None
+        _passthrough_codes[code] = passthrough
+    return passthrough
+
+
+# Pass-through code for each wrapper code, see :func:`passthrough_code`
+_passthrough_codes = weakref.WeakKeyDictionary()
+
+
+def _switch_target(code):
+    """Return name of the variable holding the function called by `code`."""
+    names = code.co_names + code.co_freevars
+    target = next((v for v in ("call", "f", "_ts_f") if v in names), None)
+    if getattr(code, "co_posonlyargcount", 0):
+        return None
+    return target
+
+
+def _make_passthrough_code(code):
+    freevars = code.co_freevars
+    target = _switch_target(code)
+
+    # Reconstruct the list of parameters of the wrapper
+    nargs = code.co_argcount
+    nkwonly = getattr(code, "co_kwonlyargcount", 0)
+    varnames = code.co_varnames
+    decl = list(varnames[:nargs])
+    args = list(decl)
+    i = nargs + nkwonly
+    if code.co_flags & inspect.CO_VARARGS:
+        decl.append("*" + varnames[i])
+        args.append("*" + varnames[i])
+        i += 1
+    elif nkwonly:
+        decl.append("*")
+    for name in varnames[nargs:nargs + nkwonly]:
+        decl.append(name)
+        args.append("%s=%s" % (name, name))
+    if code.co_flags & inspect.CO_VARKEYWORDS:
+        decl.append("**" + varnames[i])
+        args.append("**" + varnames[i])
+
+    if code.co_flags & getattr(inspect, "CO_ASYNC_GENERATOR", 0):
+        body = _ASYNCGEN_WRAPPER % {
+            "params": ", ".join(decl), "args": ", ".join(args),
+            "skip": "pass", "check_params": "pass", "stream_args": "pass",
+            "check_item": "pass"}
+    else:
+        body = "def fdecorated(%s):\n    return %s(%s)\n" % \
+            (", ".join(decl), target, ", ".join(args))
+        if code.co_flags & getattr(inspect, "CO_COROUTINE", 0):
+            body = "async " + body.replace("return ", "return await ")
+    body = body.strip("\n") + "\n"
+    if freevars:
+        # Mention the free variables in the dead code, so that the compiler
+        # makes them free variables of the pass-through function too
+        body = body.replace("\n", "\n    if False:\n        (%s, )\n" %
+                            ", ".join(freevars), 1)
+    src = "def _ts_outer(%s):\n%s    return fdecorated\n" % \
+          (", ".join(freevars),
+           "".join("    " + line + "\n" for line in body.splitlines()))
+    ns = {}
+    exec(compile(src, code.co_filename, "exec"), ns)
+    passthrough = ns["_ts_outer"](*freevars).__code__
+    if passthrough.co_freevars != freevars:  # pragma: no cover
+        return None
+    return passthrough
+
+
+
+def _no_check(value):
+    """Checker of the return value for functions without declared type."""
 
-from .checks import checker_for_type, MagicType
 
 
 class Signature(object):
     """
     Function signature record.
     """
-
-    def __init__(self, func, types, typesentry_config):
+    __slots__ = ("_tc", "function", "params", "retval", "_ivararg", "_ivarkws",
+                 "_iargs", "_call_plans", "_max_positional_args",
+                 "_min_positional_args", "_required_kwonly_args",
+                 "_num_self_args", "streams", "return_checker",
+                 "params_checker", "__weakref__")
+
+    def __init__(self, func, types, typesentry_config, sampling=None,
+                 method=False, localns=None):
         # The Config object
         self._tc = typesentry_config
 
         # The original function that was inspected
         self.function = func
 
-        # List of all parameters (Parameter objects), positional and keyword
+        # All parameters (Parameter objects), positional and keyword. This is
+        # a list while the signature is being filled, and a tuple afterwards.
         self.params = []
 
         # Parameter object for the return value
@@ -32,6 +214,10 @@ class Signature(object):
 
         self._iargs = dict()
 
+        # Cache of resolved call plans, keyed by the call shape (see
+        # :meth:`_make_args_checker`)
+        self._call_plans = dict()
+
         # Maximum number of positional parameters (without varargs)
         self._max_positional_args = 0
 
@@ -49,7 +235,24 @@ class Signature(object):
 
         #--------------------------------------------------------
         # This will initialize all of the arguments defined above
-        self._fill_from_inspection_spec(types)
+        self._fill_from_inspection_spec(types, method, localns)
+
+        # Apply the default sampling policy for the containers' checks (unless
+        # the caller overrides it, see :class:`Policy`)
+        sampling = sampling or getattr(typesentry_config, "sampling", None)
+        if sampling:
+            for p in self.params + (self.retval, ):
+                p.use_sampling(sampling)
+
+        # Cache the verdicts for immutable containers passed as arguments
+        verdict_cache = getattr(typesentry_config, "verdict_cache", None)
+        if verdict_cache is not None:
+            for p in self.params:
+                p.use_verdict_cache(verdict_cache)
+
+        # True if some of the arguments or the return value are iterators whose
+        # items are checked lazily (see :meth:`stream_args`)
+        self.streams = any(p.streams for p in self.params + (self.retval, ))
 
         # Function that can be invoked to check the type of the return value
         self.return_checker = self._make_retval_checker()
@@ -60,7 +263,7 @@ class Signature(object):
 
 
 
-    def _fill_from_inspection_spec(self, types):
+    def _fill_from_inspection_spec(self, types, method=False, localns=None):
         srcfun = self.function
         while hasattr(srcfun, "__wrapped__"):
             srcfun = srcfun.__wrapped__
@@ -69,17 +272,24 @@ class Signature(object):
         else:
             fspec = inspect.getargspec(srcfun)
         fann = getattr(fspec, "annotations", None)
+        if fann:
+            fann = _resolve_annotations(fann, srcfun, localns)
 
         if fspec.args:
             self._max_positional_args = len(fspec.args)
             self._min_positional_args = len(fspec.args)
             for arg in fspec.args:
                 p = Parameter(arg)
-                if arg == "self" and len(self.params) == 0:
+                if len(self.params) == 0 and (arg == "self" or method):
                     self._num_self_args = 1
-                    p = Parameter("self", kind="POSITIONAL_ONLY")
-                    if "self" in types:
-                        raise RuntimeError("`self` parameter must not be typed")
+                    p = Parameter(arg, kind="POSITIONAL_ONLY")
+                    if arg in types:
+                        raise RuntimeError("`%s` parameter must not be typed"
+                                           % arg)
+                    if method:
+                        # The annotation of `self`/`cls` is not checked
+                        self.params.append(p)
+                        continue
                 if arg in types:
                     p.type = types.pop(arg)
                 if fann and arg in fann:
@@ -165,6 +375,8 @@ class Signature(object):
             raise RuntimeError("Invalid function argument(s): %s" %
                                ", ".join(types.keys()))
 
+        self.params = tuple(self.params)
+        self._required_kwonly_args = frozenset(self._required_kwonly_args)
         self._iargs = {param.name: i for i, param in enumerate(self.params)}
 
 
@@ -181,14 +393,77 @@ class Signature(object):
                          checker_for_type(type(value)).name())
                     )
         else:
-            def _checker(value):
-                pass
+            _checker = _no_check
         return _checker
 
 
     def _make_args_checker(self):
         """
         Create a function that checks signature of the source function.
+
+        The first call with any particular "call shape" (the number of
+        positional arguments and the names of keyword arguments) goes through
+        the full binding logic, which verifies that the arguments can be
+        matched to the parameters. The resolved plan -- which checker applies
+        to which argument -- is then stored in :attr:`_call_plans`, so that the
+        subsequent calls of the same shape only run the type checks.
+        """
+        full_checker = self._make_full_args_checker()
+        plans = self._call_plans
+        make_plan = self._make_call_plan
+        is_default = Parameter.is_default_value
+
+        def _checker(*args, **kws):
+            key = (len(args), tuple(kws)) if kws else len(args)
+            plan = plans.get(key)
+            if plan is None:
+                full_checker(*args, **kws)
+                if len(plans) < MAX_CALL_PLANS:
+                    plans[key] = make_plan(len(args), kws)
+                return
+            posplan, kwplan = plan
+            for i, chk, param in posplan:
+                value = args[i]
+                if not chk(value) and not is_default(param, value):
+                    raise self._param_type_error(param, param.name, value)
+            for name, chk, param in kwplan:
+                value = kws[name]
+                if not chk(value) and not is_default(param, value):
+                    raise self._param_type_error(param, name, value)
+
+        return _checker
+
+
+    def _make_call_plan(self, nargs, kws):
+        """
+        Resolve which parameters receive the arguments of a call with `nargs`
+        positional arguments and keyword arguments `kws`. The call is assumed
+        to be valid (i.e. already verified by the full args checker).
+
+        :returns: tuple ``(posplan, kwplan)``, where ``posplan`` is a tuple of
+            ``(index, check, param)`` triples for the positional arguments, and
+            ``kwplan`` is a tuple of ``(name, check, param)`` triples for the
+            keyword arguments. Only typed parameters are included.
+        """
+        posplan = []
+        for i in range(nargs):
+            param = self.params[i if i < self._max_positional_args else
+                                self._ivararg]
+            if param.checker:
+                posplan.append((i, param.checker.check, param))
+        kwplan = []
+        for name in kws:
+            index = self._iargs.get(name)
+            param = self.params[self._ivarkws if index is None else index]
+            if param.checker:
+                kwplan.append((name, param.checker.check, param))
+        return tuple(posplan), tuple(kwplan)
+
+
+    def _make_full_args_checker(self):
+        """
+        Create a function that verifies both the binding of arguments to the
+        parameters of the source function, and the types of those arguments.
         """
         def _checker(*args, **kws):
             # Check if too many arguments are provided
@@ -221,8 +496,7 @@ class Signature(object):
                                     self._ivararg]
                 if param.checker and not (
                     param.checker.check(argvalue) or
-                    param.has_default and
-                        (argvalue is param.default or argvalue == param.default)
+                    param.is_default_value(argvalue)
                 ):
                     raise self._param_type_error(param, param.name, argvalue)
 
@@ -241,14 +515,303 @@ class Signature(object):
                 param = self.params[index]
                 if param.checker and not (
                     param.checker.check(argvalue) or
-                    param.has_default and
-                        (argvalue is param.default or argvalue == param.default)
+                    param.is_default_value(argvalue)
                 ):
                     raise self._param_type_error(param, argname, argvalue)
 
         return _checker
 
 
+    def failed_param(self, args, kws):
+        """
+        Return the name of the (first) parameter whose type check fails for
+        the call with arguments `args`, `kws`. If the arguments cannot be
+        bound to the parameters, or all checks pass, return None.
+        """
+        try:
+            posplan, kwplan = self._make_call_plan(len(args), kws)
+        except (IndexError, TypeError):
+            return None
+        for i, chk, param in posplan:
+            if not chk(args[i]) and not param.is_default_value(args[i]):
+                return param.name
+        for name, chk, param in kwplan:
+            if not chk(kws[name]) and not param.is_default_value(kws[name]):
+                return param.name
+        return None
+
+
+    def stream_args(self, args, kws):
+        """
+        Replace the iterators among arguments `args`, `kws` with proxies that
+        check their items lazily (see :meth:`MagicType.stream`). The arguments
+        are assumed to have already passed the :attr:`params_checker`.
+
+        :returns: tuple ``(args, kws)`` of the new arguments.
+        """
+        args = list(args)
+        for i, value in enumerate(args):
+            param = self.params[i if i < self._max_positional_args else
+                                self._ivararg]
+            if param.streams:
+                args[i] = self.stream_arg(param, param.name, value)
+        for name, value in kws.items():
+            index = self._iargs.get(name)
+            param = self.params[self._ivarkws if index is None else index]
+            if param.streams:
+                kws[name] = self.stream_arg(param, name, value)
+        return args, kws
+
+
+    def stream_arg(self, param, argname, value):
+        """Return `value` of the argument `argname` wrapped for checking."""
+        def fail(checker, index, item):
+            raise self._type_error(
+                "%s of type `%s` received %s" %
+                (self._param_desc(param, argname), checker.name(),
+                 checker.describe_item(index, item)))
+
+        return param.checker.stream(value, fail)
+
+
+    def stream_retval(self, value):
+        """Return the return `value` wrapped for checking."""
+        def fail(checker, index, item):
+            raise self._retval_item_error(checker, index, item)
+
+        return self.retval.checker.stream(value, fail)
+
+
+    def make_async_wrapper(self, call_sampling=None):
+        """
+        Generate a native ``async def`` wrapper around the inspected function,
+        if it is a coroutine function or an async generator function.
+
+        For a coroutine function, the wrapper checks the arguments, awaits the
+        original coroutine directly (thus no extra task or event loop
+        iteration is involved), and checks the awaited result against the
+        return type.
+
+        For an async generator function, the return type must be declared as
+        `AsyncIterator[T]`, `AsyncIterable[T]` or `AsyncGenerator[T, S]`. The
+        wrapper re-yields the items of the original generator, checking each
+        of them against `T`; the values sent to the wrapper and the exceptions
+        thrown into it are forwarded to the original generator.
+
+        In both cases the arguments are checked when the wrapper starts
+        running, i.e. when the coroutine is first awaited (or the generator is
+        first iterated), and not at the time of the call.
+
+        :param call_sampling: optional :class:`CallSampling` policy. If given,
+            then the coroutine or the async generator is checked only on some
+            of the calls; on the other calls the wrapper awaits the original
+            coroutine directly (or re-yields the items without checking them).
+        :returns: the wrapper function, or None if the function is not async.
+        """
+        func = self.function
+        ns = {"_ts_f": func,
+              "_ts_check_params": self.params_checker,
+              "_ts_check_retval": self.return_checker,
+              "_ts_stream_args": self.stream_args,
+              "_ts_stream_retval": self.stream_retval}
+        parts = {"skip": "pass", "stream_args": "pass", "retval": "ret",
+                 "params": "*args, **kws", "args": "*args, **kws",
+                 "check_params": "_ts_check_params(*args, **kws)",
+                 "check_item": "if not _ts_check_item(item):\n"
+                               "                raise _ts_item_error(index, "
+                               "item)"}
+        if any(p.streams for p in self.params):
+            parts["stream_args"] = "args, kws = _ts_stream_args(args, kws)"
+        isasyncgen = getattr(inspect, "isasyncgenfunction", None)
+        iscoroutine = getattr(inspect, "iscoroutinefunction", None)
+        if isasyncgen and isasyncgen(func):
+            rvchk = self.retval.checker
+            if isinstance(rvchk, MtSampled):
+                rvchk = rvchk._checker
+            if rvchk is None or isinstance(rvchk, MtAny):
+                ns["_ts_check_item"] = lambda item: True
+            elif isinstance(rvchk, MtIterator) and rvchk.is_async:
+                ns["_ts_check_item"] = rvchk.elem.check
+                ns["_ts_item_error"] = lambda index, item: \
+                    self._retval_item_error(rvchk, index, item)
+            else:
+                raise RuntimeError(
+                    "Return type of async generator %s should be declared as "
+                    "AsyncIterator[T], AsyncIterable[T] or AsyncGenerator[T, "
+                    "S], got %s" % (self.name_bt, rvchk.name()))
+            # The wrapper yields the items itself, so the return value (an
+            # async generator object) must not be checked
+            src = _ASYNCGEN_WRAPPER % parts
+        elif iscoroutine and iscoroutine(func):
+            if self.retval.streams:
+                parts["retval"] = "_ts_stream_retval(ret)"
+            src = _COROUTINE_WRAPPER % parts
+        else:
+            return None
+        state = None
+        if call_sampling:
+            state = self._sample_async_checks(ns, parts, call_sampling,
+                                              isasyncgen(func))
+            src = (_ASYNCGEN_WRAPPER if isasyncgen(func) else
+                   _COROUTINE_WRAPPER) % parts
+        filename = "<typesentry:%s>" % func.__name__
+        exec(compile(src, filename, "exec"), ns)
+        wrapper = ns["fdecorated"]
+        wrapper._source_ = src
+        if state is not None:
+            wrapper._call_sampling_state_ = state
+        return wrapper
+
+
+    def _sample_async_checks(self, ns, parts, call_sampling, isasyncgen):
+        """
+        Modify the namespace `ns` and the source `parts` of an async wrapper
+        (see :meth:`make_async_wrapper`), so that the checks are performed
+        only on the calls selected by `call_sampling`.
+
+        :returns: the sampling state of the wrapper.
+        """
+        state, skip, fail, succeed = call_sampling.gate()
+        check_params = ns["_ts_check_params"]
+        check_retval = ns["_ts_check_retval"]
+
+        def _check_params(*args, **kws):
+            try:
+                check_params(*args, **kws)
+            except BaseException:
+                fail()
+                raise
+            if isasyncgen:
+                succeed()
+
+        def _check_retval(ret):
+            try:
+                check_retval(ret)
+            except BaseException:
+                fail()
+                raise
+            succeed()
+
+        ns["_ts_skip"] = skip
+        ns["_ts_check_params"] = _check_params
+        ns["_ts_check_retval"] = _check_retval
+        if isasyncgen:
+            parts["skip"] = "checked = not _ts_skip()"
+            parts["check_params"] = "if checked: " + parts["check_params"]
+            parts["check_item"] = "if checked and " + \
+                parts["check_item"][len("if "):]
+            item_error = ns.get("_ts_item_error")
+            if item_error:
+                def _item_error(index, item):
+                    fail()
+                    return item_error(index, item)
+                ns["_ts_item_error"] = _item_error
+        else:
+            parts["skip"] = "if _ts_skip(): return await _ts_f(*args, **kws)"
+        return state
+
+
+    def make_compiled_wrapper(self):
+        """
+        Generate a wrapper around the inspected function, with type checks
+        inlined.
+
+        The wrapper is produced from Python source generated for this
+        particular signature: its parameter list mirrors the parameter list of
+        the original function (including the defaults), and each typed
+        parameter is verified with a direct call to its compiled checker (see
+        :meth:`MagicType.compile`). Thus the wrapper doesn't need to re-bind
+        ``*args, **kws`` on every call, and the cost of the call is reduced to
+        the cost of the checks themselves.
+
+        Since the binding of arguments is done by Python itself, errors such as
+        "too many arguments" or "missing argument" are reported by the
+        interpreter, and not by typesentry.
+
+        :returns: the wrapper function, or None if this signature cannot be
+            mirrored (for example, when ``_kwonly`` parameters are mixed with
+            varargs, or when the varargs are streamed iterators).
+        """
+        ns = {"_ts_f": self.function, "_ts_sig": self}
+        sig_parts = []
+        call_parts = []
+        checks = []
+        star = False
+        for i, p in enumerate(self.params):
+            name = p.name.lstrip("*")
+            if name.startswith("_ts_"):
+                return None
+            if p.kind in ("POSITIONAL_ONLY", "POSITIONAL_OR_KEYWORD"):
+                decl = call = name
+            elif p.kind == "VAR_POSITIONAL":
+                star = True
+                decl = call = "*" + name
+            elif p.kind == "KEYWORD_ONLY":
+                # Keyword-only parameters require Python3 syntax; also they
+                # cannot precede the vararg (which happens with `_kwonly`)
+                if PY2 or (self._ivararg is not None and i < self._ivararg):
+                    return None
+                if not star:
+                    sig_parts.append("*")
+                    star = True
+                decl = name
+                call = "%s=%s" % (name, name)
+            else:
+                decl = call = "**" + name
+            if p.has_default:
+                ns["_ts_d%d" % i] = p.default
+                decl += "=_ts_d%d" % i
+            sig_parts.append(decl)
+            call_parts.append(call)
+            if not p.checker:
+                continue
+            ns["_ts_c%d" % i] = p.checker.compile()
+            ns["_ts_p%d" % i] = p
+            if p.streams and p.kind.startswith("VAR_"):
+                return None
+            if p.kind == "VAR_POSITIONAL":
+                checks += ["for _ts_v in %s:" % name,
+                           "    if not _ts_c%d(_ts_v):" % i,
+                           "        raise _ts_sig._param_type_error("
+                           "_ts_p%d, %r, _ts_v)" % (i, p.name)]
+            elif p.kind == "VAR_KEYWORD":
+                checks += ["for _ts_k, _ts_v in %s.items():" % name,
+                           "    if not _ts_c%d(_ts_v):" % i,
+                           "        raise _ts_sig._param_type_error("
+                           "_ts_p%d, _ts_k, _ts_v)" % i]
+            else:
+                cond = "_ts_c%d(%s)" % (i, name)
+                if p.has_default:
+                    cond += (" or %s is _ts_d%d or _ts_p%d.is_default_value"
+                             "(%s)" % (name, i, i, name))
+                checks += ["if not (%s):" % cond,
+                           "    raise _ts_sig._param_type_error("
+                           "_ts_p%d, %r, %s)" % (i, name, name)]
+                if p.streams:
+                    checks.append("%s = _ts_sig.stream_arg(_ts_p%d, %r, %s)"
+                                  % (name, i, name, name))
+
+        call = "_ts_f(%s)" % ", ".join(call_parts)
+        if self.retval.checker:
+            ns["_ts_rc"] = self.retval.checker.compile()
+            checks += ["_ts_ret = " + call,
+                       "if not _ts_rc(_ts_ret):",
+                       "    _ts_sig.return_checker(_ts_ret)"]
+            if self.retval.streams:
+                checks.append("return _ts_sig.stream_retval(_ts_ret)")
+            else:
+                checks.append("return _ts_ret")
+        else:
+            checks.append("return " + call)
+        src = "def fdecorated(%s):\n    %s\n" % \
+              (", ".join(sig_parts), "\n    ".join(checks))
+        filename = "<typesentry:%s>" % self.function.__name__
+        exec(compile(src, filename, "exec"), ns)
+        wrapper = ns["fdecorated"]
+        wrapper._source_ = src
+        return wrapper
+
+
     @property
     def name_bt(self):
         return "`%s()`" % self.function.__name__
@@ -290,12 +853,23 @@ class Signature(object):
 
 
     def _param_type_error(self, param, argname, argvalue):
-        paramname = "Vararg parameter" if param.kind == "VAR_POSITIONAL" else \
-                    "Parameter `%s`" % argname
+        paramname = self._param_desc(param, argname)
         msg = param.checker.get_error_msg(paramname, argvalue)
         return self._type_error(msg)
 
 
+    def _retval_item_error(self, checker, index, item):
+        return self._type_error(
+            "Incorrect return type in %s: expected %s got %s" %
+            (self.name_bt, checker.name(), checker.describe_item(index, item)))
+
+
+    @staticmethod
+    def _param_desc(param, argname):
+        return "Vararg parameter" if param.kind == "VAR_POSITIONAL" else \
+               "Parameter `%s`" % argname
+
+
     def _type_error(self, msg):
         if self._tc.supply_src:
             return self._tc.TypeError(msg, src=self)
@@ -334,6 +908,7 @@ class Parameter(object):
 
     The interface closely resembles that of ``inspect.Parameter``.
     """
+    __slots__ = ("_checker", "_default", "_has_default", "kind", "name")
     SHORT_POSITIONAL_NAME = {
         "POSITIONAL_ONLY": "P",
         "POSITIONAL_OR_KEYWORD": "PK",
@@ -346,7 +921,6 @@ class Parameter(object):
         self._checker = None  # type: MagicType
         self._default = None
         self._has_default = False
-        self._type = None
         self.kind = kind
         self.name = name
         if kind == "VAR_POSITIONAL":
@@ -356,18 +930,57 @@ class Parameter(object):
 
 
     @property
-    def type(self):  # pragma: no cover
-        return self._type
+    def type(self):
+        """The declared type of the parameter, as a :class:`MagicType`."""
+        return self._checker
 
     @type.setter
     def type(self, t):
-        self._type = t
         self._checker = checker_for_type(t)
 
     @property
     def checker(self):
         return self._checker
 
+    def use_sampling(self, sampling):
+        """
+        Make the parameter's checker verify only a sample of elements of
+        container values, according to the `sampling` policy. Parameters whose
+        type was already declared as ``Sampled(...)`` are not affected.
+        """
+        chk = self._checker
+        if (chk and supports_sampling(chk) and
+                not isinstance(chk, MtSampled)):
+            self._checker = MtSampled(chk, sampling)
+
+    def use_verdict_cache(self, cache):
+        """
+        Make the parameter's checker remember the values that passed the check
+        in the :class:`VerdictCache` `cache`. Only checkers that examine the
+        elements of containers are affected.
+        """
+        chk = self._checker
+        if chk and supports_sampling(chk):
+            self._checker = MtCached(chk, cache)
+
+    def is_default_value(self, value):
+        """Return True if `value` is the default value of this parameter."""
+        if not self._has_default:
+            return False
+        if value is self._default:
+            return True
+        try:
+            # Comparing array-like objects may produce an array instead of a
+            # bool, whose truth value is ambiguous.
+            return bool(value == self._default)
+        except (TypeError, ValueError):
+            return False
+
+    @property
+    def streams(self):
+        """True if the values of this parameter are checked lazily."""
+        return bool(self._checker and self._checker.streams())
+
     @property
     def is_required(self):
         return not self._has_default